@@ -0,0 +1,187 @@
+import json
+import multiprocessing
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.process import BaseProcess
+from types import TracebackType
+
+from pydantic import BaseModel
+
+
+class FakeServerConfig(BaseModel):
+    """Behaviour knobs of the fake chat-completions server."""
+
+    # Seconds before the response headers are sent
+    latency: float = 0.05
+    # Extra delay drawn uniformly from [0, jitter] for every request
+    jitter: float = 0.0
+    # Share of requests answered with 500 and 429 respectively
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # Retry-After seconds sent with every 429
+    retry_after: float = 0.0
+    # Completion tokens per answer; one token is sent as one short word
+    response_tokens: int = 50
+    # Tokens per server-sent event and delay between events when streaming
+    stream_chunk_tokens: int = 5
+    stream_chunk_delay: float = 0.0
+    # Seed of the outcome and jitter draws; None for a random seed
+    seed: int | None = 0
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    """OpenRouter-compatible chat-completions server that never leaves the host."""
+
+    daemon_threads = True
+    # The default backlog of 5 drops connections when a client opens many at
+    # once, adding a one-second SYN retransmit to the measured latency
+    request_queue_size = 1024
+
+    def __init__(self, config: FakeServerConfig, port: int = 0) -> None:
+        """
+        Args:
+            config: The server's behaviour knobs.
+            port: Port to listen on; 0 picks a free port.
+        """
+        super().__init__(("127.0.0.1", port), _FakeChatHandler)
+        self.config = config
+        self.random = random.Random(config.seed)  # noqa: S311
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """The chat-completions URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v1/chat/completions"
+
+    def draw(self) -> tuple[str, float]:
+        """
+        Draws the outcome and delay of the next request.
+
+        Returns:
+            One of "ok", "error" or "rate_limited", and the delay in seconds.
+        """
+        config = self.config
+        with self.lock:
+            roll = self.random.random()
+            delay = config.latency + self.random.uniform(0, config.jitter)
+        if roll < config.rate_limit_rate:
+            return "rate_limited", delay
+        if roll < config.rate_limit_rate + config.error_rate:
+            return "error", delay
+        return "ok", delay
+
+
+class _FakeChatHandler(BaseHTTPRequestHandler):
+    server: FakeChatServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        payload = json.loads(body)
+        outcome, delay = self.server.draw()
+        time.sleep(delay)
+        if outcome != "ok":
+            self.send_response(429 if outcome == "rate_limited" else 500)
+            if outcome == "rate_limited":
+                self.send_header("Retry-After", str(self.server.config.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        config = self.server.config
+        usage = {
+            "prompt_tokens": len(body) // 4,
+            "completion_tokens": config.response_tokens,
+            "total_tokens": len(body) // 4 + config.response_tokens,
+            "cost": config.response_tokens * 1e-6,
+        }
+        if payload.get("stream"):
+            self._send_stream(usage)
+            return
+        content = "word " * config.response_tokens
+        encoded = json.dumps(
+            {
+                "model": payload.get("model"),
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+                "usage": usage,
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def _send_stream(self, usage: dict) -> None:
+        config = self.server.config
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        remaining = config.response_tokens
+        while remaining > 0:
+            tokens = min(config.stream_chunk_tokens, remaining)
+            remaining -= tokens
+            delta = {"choices": [{"delta": {"content": "word " * tokens}}]}
+            self._write_event(json.dumps(delta))
+            time.sleep(config.stream_chunk_delay)
+        self._write_event(json.dumps({"choices": [], "usage": usage}))
+        self._write_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_event(self, data: str) -> None:
+        event = f"data: {data}\n\n".encode()
+        self.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+        self.wfile.flush()
+
+
+def _serve(config: FakeServerConfig, urls: "multiprocessing.Queue[str]") -> None:
+    server = FakeChatServer(config)
+    urls.put(server.url)
+    server.serve_forever()
+
+
+class FakeServerProcess:
+    """
+    Runs a FakeChatServer in a child process, so its CPU time and memory do
+    not show up in the measurements of the client under test.
+    """
+
+    def __init__(self, config: FakeServerConfig) -> None:
+        """
+        Args:
+            config: The server's behaviour knobs.
+        """
+        self.config = config
+        self.url = ""
+        self._process: BaseProcess | None = None
+
+    def __enter__(self) -> "FakeServerProcess":
+        context = multiprocessing.get_context("spawn")
+        urls: multiprocessing.Queue[str] = context.Queue()
+        self._process = context.Process(
+            target=_serve, args=(self.config, urls), daemon=True
+        )
+        self._process.start()
+        self.url = urls.get(timeout=30)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
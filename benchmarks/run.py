@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the LLM services against a local fake server.
+
+Example:
+    python -m benchmarks.run --requests 200 --concurrency 16 \
+        --output .benchmarks/head.json --baseline .benchmarks/main.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from benchmarks.fake_server import FakeServerConfig, FakeServerProcess
+from src.llm.async_service import AsyncLLMService
+from src.llm.rate_limit import RetryPolicy
+from src.llm.registry import LLMRegistry
+from src.llm.service import LLMService
+from src.llm.stats import percentile
+from src.models.llm_config import LLMConfig
+
+MODES = ("sequential", "threaded", "async")
+BENCH_MODEL = "bench-model"
+
+
+class BenchmarkOptions(BaseModel):
+    """Client-side settings of a benchmark run."""
+
+    requests: int = 100
+    concurrency: int = 16
+    stream: bool = False
+    max_retries: int = 3
+
+
+class BenchmarkResult(BaseModel):
+    """Measurements of one mode."""
+
+    mode: str
+    requests: int
+    errors: int
+    seconds: float
+    throughput: float
+    p50_latency: float | None = None
+    p99_latency: float | None = None
+    p50_time_to_first_token: float | None = None
+    cpu_seconds: float
+    peak_rss_mb: float
+
+
+def _messages(index: int) -> list[dict[str, Any]]:
+    # Unique per request so coalescing never merges benchmark requests
+    return [{"role": "user", "content": f"Benchmark request {index}: say hello."}]
+
+
+def _timed(
+    call: Callable[[], tuple[bool, float | None]],
+) -> tuple[bool, float, float | None]:
+    started_at = time.perf_counter()
+    ok, first_token = call()
+    return ok, time.perf_counter() - started_at, first_token
+
+
+def _sync_call(
+    service: LLMService, index: int, stream: bool
+) -> Callable[[], tuple[bool, float | None]]:
+    def call() -> tuple[bool, float | None]:
+        if not stream:
+            return service.send_llm_request(
+                BENCH_MODEL, _messages(index)
+            ) is not None, None
+        llm_stream = service.stream_llm_request(BENCH_MODEL, _messages(index))
+        if llm_stream is None:
+            return False, None
+        for _ in llm_stream:
+            pass
+        return llm_stream.error is None, llm_stream.time_to_first_token
+
+    return call
+
+
+def _run_sync(
+    options: BenchmarkOptions, retry_policy: RetryPolicy, workers: int
+) -> list[tuple[bool, float, float | None]]:
+    service = LLMService(retry_policy=retry_policy)
+    calls = [_sync_call(service, i, options.stream) for i in range(options.requests)]
+    if workers == 1:
+        return [_timed(call) for call in calls]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_timed, calls))
+
+
+async def _run_async(
+    options: BenchmarkOptions, retry_policy: RetryPolicy
+) -> list[tuple[bool, float, float | None]]:
+    async with AsyncLLMService(
+        max_concurrency=options.concurrency, retry_policy=retry_policy
+    ) as service:
+        # Latency is timed from the moment a slot is free, as in threaded mode
+        slots = asyncio.Semaphore(options.concurrency)
+
+        async def timed(index: int) -> tuple[bool, float, float | None]:
+            async with slots:
+                started_at = time.perf_counter()
+                content = await service.send_llm_request(BENCH_MODEL, _messages(index))
+                return content is not None, time.perf_counter() - started_at, None
+
+        return await asyncio.gather(*(timed(i) for i in range(options.requests)))
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_mode(mode: str, url: str, options: BenchmarkOptions) -> BenchmarkResult:
+    """
+    Runs one mode against the fake server. Call it in a fresh process so CPU
+    time and peak RSS belong to this mode only.
+
+    Args:
+        mode: One of `MODES`.
+        url: The fake server's chat-completions URL.
+        options: Client-side settings.
+
+    Returns:
+        The mode's BenchmarkResult.
+    """
+    logging.getLogger("llm_service").setLevel(logging.WARNING)
+    LLMRegistry.MODELS[BENCH_MODEL] = LLMConfig(
+        name=BENCH_MODEL,
+        provider="bench",
+        endpoint=url,
+        api_key_env="BENCH_API_KEY",
+        max_tokens=256,
+    )
+    retry_policy = RetryPolicy(max_retries=options.max_retries, base_delay=0.01)
+
+    cpu_started_at = time.process_time()
+    started_at = time.perf_counter()
+    if mode == "async":
+        outcomes = asyncio.run(_run_async(options, retry_policy))
+    else:
+        workers = 1 if mode == "sequential" else options.concurrency
+        outcomes = _run_sync(options, retry_policy, workers)
+    seconds = time.perf_counter() - started_at
+
+    latencies = [latency for ok, latency, _ in outcomes if ok]
+    first_tokens = [ttft for ok, _, ttft in outcomes if ok and ttft is not None]
+    return BenchmarkResult(
+        mode=mode,
+        requests=len(outcomes),
+        errors=len(outcomes) - len(latencies),
+        seconds=seconds,
+        throughput=len(latencies) / seconds if seconds > 0 else 0.0,
+        p50_latency=percentile(latencies, 50),
+        p99_latency=percentile(latencies, 99),
+        p50_time_to_first_token=percentile(first_tokens, 50),
+        cpu_seconds=time.process_time() - cpu_started_at,
+        peak_rss_mb=_peak_rss_mb(),
+    )
+
+
+def run_benchmarks(
+    modes: list[str], server_config: FakeServerConfig, options: BenchmarkOptions
+) -> dict[str, Any]:
+    """
+    Runs each mode in its own process against one fake server process.
+
+    Args:
+        modes: The modes to run, in order.
+        server_config: The fake server's behaviour knobs.
+        options: Client-side settings.
+
+    Returns:
+        The JSON-serialisable report with run metadata and one result per mode.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with FakeServerProcess(server_config) as server:
+        for mode in modes:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_mode, (mode, server.url, options))
+            results.append(result.model_dump())
+    return {
+        "metadata": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "server": server_config.model_dump(),
+            "options": options.model_dump(),
+        },
+        "results": results,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        completed = subprocess.run(  # noqa: S603
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip()
+
+
+def compare(
+    report: dict[str, Any], baseline: dict[str, Any], max_regression: float
+) -> list[str]:
+    """
+    Compares a report with a baseline report of the same modes.
+
+    Args:
+        report: The report of the current run.
+        baseline: The report to compare against.
+        max_regression: Allowed relative drop in throughput or rise in p99
+            latency, e.g. 0.1 for 10%.
+
+    Returns:
+        One message per regression beyond `max_regression`.
+    """
+    previous = {result["mode"]: result for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get(result["mode"])
+        if before is None:
+            continue
+        if before["throughput"] and result["throughput"] < before["throughput"] * (
+            1 - max_regression
+        ):
+            regressions.append(
+                f"{result['mode']}: throughput {before['throughput']:.1f} -> "
+                f"{result['throughput']:.1f} req/s"
+            )
+        if (
+            before["p99_latency"]
+            and result["p99_latency"]
+            and result["p99_latency"] > before["p99_latency"] * (1 + max_regression)
+        ):
+            regressions.append(
+                f"{result['mode']}: p99 latency {before['p99_latency']:.3f} -> "
+                f"{result['p99_latency']:.3f} s"
+            )
+    return regressions
+
+
+def parser() -> argparse.ArgumentParser:
+    """
+    Builds the command-line parser of the benchmark.
+
+    Returns:
+        The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        description="Offline benchmark of the LLM services against a fake server."
+    )
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--stream", action="store_true", help="Stream answers (sync modes only)."
+    )
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--response-tokens", type=int, default=50)
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    parser.add_argument("--baseline", help="JSON report to compare against.")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.1,
+        help="Relative regression against the baseline that fails the run.",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Runs the benchmark from the command line.
+
+    Args:
+        argv: Command-line arguments; defaults to `sys.argv`.
+
+    Returns:
+        The exit code: 1 if the run regressed against the baseline, else 0.
+    """
+    args = parser().parse_args(argv)
+    modes = args.modes
+    if args.stream and "async" in modes:
+        modes = [mode for mode in modes if mode != "async"]
+        print("Skipping async mode: AsyncLLMService does not stream.")  # noqa: T201
+
+    server_config = FakeServerConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        response_tokens=args.response_tokens,
+        stream_chunk_delay=args.stream_chunk_delay,
+        seed=args.seed,
+    )
+    options = BenchmarkOptions(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        stream=args.stream,
+        max_retries=args.max_retries,
+    )
+    report = run_benchmarks(modes, server_config, options)
+    print(json.dumps(report["results"], indent=2))  # noqa: T201
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(report, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"Regression: {regression}")  # noqa: T201
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Startup time of the `main.py` entry point.
+
+Times complete `python main.py` runs in fresh interpreters and lists the
+slowest imports reported by `python -X importtime`.
+
+Example:
+    python -m benchmarks.startup --runs 20 --budget 0.25 -- --name Ada
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+ROOT = Path(__file__).resolve().parent.parent
+# Median wall time allowed for `python main.py --name ...`, in seconds
+STARTUP_BUDGET_SECONDS = 0.25
+# Modules a run that never calls an LLM must not import
+HEAVY_MODULES = ("src.llm.service", "src.llm.registry", "requests", "pydantic")
+
+
+class ImportTime(BaseModel):
+    """Cumulative import time of one module."""
+
+    module: str
+    seconds: float
+
+
+class StartupReport(BaseModel):
+    """Measurements of the entry point's startup."""
+
+    argv: list[str]
+    runs: int
+    median_seconds: float
+    max_seconds: float
+    slowest_imports: list[ImportTime]
+    heavy_modules: list[str]
+
+
+def time_runs(argv: list[str], runs: int) -> list[float]:
+    """
+    Times complete runs of the entry point in fresh interpreters.
+
+    Args:
+        argv: Arguments passed to `main.py`.
+        runs: Number of runs.
+
+    Returns:
+        The wall time of every run in seconds.
+    """
+    timings = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        subprocess.run(  # noqa: S603
+            [sys.executable, "main.py", *argv],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+        )
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+
+def parse_importtime(output: str) -> list[ImportTime]:
+    """
+    Parses the report of `python -X importtime`.
+
+    Args:
+        output: The interpreter's stderr.
+
+    Returns:
+        The cumulative time of every imported module, slowest first.
+    """
+    times = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split(":", 1)[1].split("|")
+        times.append(
+            ImportTime(module=module.strip(), seconds=int(cumulative) / 1_000_000)
+        )
+    return sorted(times, key=lambda t: t.seconds, reverse=True)
+
+
+def import_report(module: str = "main") -> tuple[list[ImportTime], list[str]]:
+    """
+    Imports a module in a fresh interpreter and reports what it loaded.
+
+    Args:
+        module: The module to import.
+
+    Returns:
+        The import times, slowest first, and the `HEAVY_MODULES` it loaded.
+    """
+    code = (
+        f"import json, sys, {module}; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return parse_importtime(result.stderr), json.loads(result.stdout)
+
+
+def measure_startup(argv: list[str], runs: int, top: int = 10) -> StartupReport:
+    """
+    Measures the startup of `main.py`.
+
+    Args:
+        argv: Arguments passed to `main.py`.
+        runs: Number of timed runs.
+        top: Number of slowest imports to report.
+
+    Returns:
+        The startup report.
+    """
+    timings = time_runs(argv, runs)
+    imports, heavy = import_report()
+    return StartupReport(
+        argv=argv,
+        runs=runs,
+        median_seconds=statistics.median(timings),
+        max_seconds=max(timings),
+        slowest_imports=imports[:top],
+        heavy_modules=heavy,
+    )
+
+
+def parser() -> argparse.ArgumentParser:
+    """
+    Builds the command-line parser.
+
+    Returns:
+        The argument parser.
+    """
+    parser = argparse.ArgumentParser(description="Measure main.py startup time.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS)
+    parser.add_argument(
+        "argv",
+        nargs="*",
+        default=["--name", "benchmark"],
+        help="Arguments for main.py after `--` (default: --name benchmark).",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Runs the startup benchmark from the command line.
+
+    Args:
+        argv: Command-line arguments; defaults to `sys.argv`.
+
+    Returns:
+        The exit code: 1 if the median run exceeded the budget, else 0.
+    """
+    args = parser().parse_args(argv)
+    report = measure_startup(args.argv, args.runs, args.top)
+    print(report.model_dump_json(indent=2))  # noqa: T201
+    if report.median_seconds > args.budget:
+        print(  # noqa: T201
+            f"Startup {report.median_seconds:.3f}s exceeds the "
+            f"{args.budget:.3f}s budget"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 
 import argparse
+import sys
+from typing import TYPE_CHECKING
 
-from dotenv import load_dotenv
-
-from src.llm.service import LLMService
 from src.starter.hello import hello_world
 from src.utils.logging import setup_logging
 
-load_dotenv()
+if TYPE_CHECKING:
+    from src.models.batch import BatchProgress
+
+# The LLM stack and python-dotenv are imported on first use, so runs that
+# never call an LLM start without them; see benchmarks/startup.py
 logger = setup_logging("main")
 
 
@@ -32,46 +35,166 @@ def parser() -> argparse.Namespace:
         action="store_true",
         help="Generate a random pet name using the LLM service.",
     )
+    commands = parser.add_subparsers(dest="command")
+    batch = commands.add_parser(
+        "batch",
+        help="Send every line of a JSONL file to an LLM, resuming if interrupted.",
+    )
+    batch.add_argument("--input", required=True, help="JSONL file of requests.")
+    batch.add_argument(
+        "--output",
+        required=True,
+        help="JSONL file answers are appended to; also the resume checkpoint.",
+    )
+    batch.add_argument(
+        "--model",
+        default="gemini-flash-2.5",
+        help="Model for lines that do not name one (default: gemini-flash-2.5)",
+    )
+    batch.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of requests in flight (default: 8)",
+    )
+    gateway = commands.add_parser(
+        "gateway",
+        help="Serve LLM requests from other processes over one shared service.",
+    )
+    gateway.add_argument(
+        "--host", default="127.0.0.1", help="Interface (default: 127.0.0.1)"
+    )
+    gateway.add_argument("--port", type=int, default=8765, help="Port (default: 8765)")
+    gateway.add_argument(
+        "--socket", help="Listen on this Unix socket instead of localhost HTTP."
+    )
+    gateway.add_argument(
+        "--cache", help="SQLite file to keep cached responses in across restarts."
+    )
+    gateway.add_argument(
+        "--concurrency",
+        type=int,
+        default=32,
+        help="Maximum number of requests in flight (default: 32)",
+    )
     return parser.parse_args()
 
 
-def handle_name_generation() -> str:
+def handle_name_generation() -> str | None:
     """
     Handles the generation of a name using the LLM service.
 
-    Args:
-        name: The name to generate.
-
     Returns:
-        The generated name.
+        The generated name, or None if the LLM request failed.
     """
+    from dotenv import load_dotenv
+
+    from src.llm.service import LLMService
+    from src.models.conversation import Conversation
+
+    load_dotenv()
     logger.info("Generating a name using LLM service.")
     llm_service = LLMService()
-    prompt = "Give me a random pet English nameReturn only the name, nothing else."
-    messages = [
-        {
-            "role": "user",
-            "content": prompt,
-        }
-    ]
+    conversation = Conversation()
+    conversation.add_user(
+        "Give me a random pet English name. Return only the name, nothing else."
+    )
     generated_name = llm_service.send_llm_request(
-        model_name="gemini-flash-2.5", messages=messages
+        model_name="gemini-flash-2.5", messages=conversation.messages
     )
-    if generated_name:
-        # Clean up the generated name, remove quotes or extra text
-        name_to_greet = generated_name.strip().strip('"')
-        logger.info(f"Generated name: {name_to_greet}")
-    else:
+    if not generated_name:
         logger.warning("Failed to generate name, using default.")
+        return None
+    # Clean up the generated name, remove quotes or extra text
+    name_to_greet = generated_name.strip().strip('"')
+    logger.info("Generated name: %s", name_to_greet)
     return name_to_greet
 
 
+def _print_progress(progress: "BatchProgress") -> None:
+    """Prints a one-line batch progress report over the previous one."""
+    eta = "--:--"
+    if progress.eta is not None:
+        minutes, seconds = divmod(int(progress.eta), 60)
+        eta = f"{minutes:02d}:{seconds:02d}"
+    finished = progress.skipped + progress.completed + progress.failed
+    print(  # noqa: T201
+        f"\r{finished}/{progress.total} done, {progress.failed} failed, "
+        f"{progress.throughput:.1f} req/s, ETA {eta}",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def handle_batch(args: argparse.Namespace) -> None:
+    """
+    Runs a batch of requests from a JSONL file.
+
+    Args:
+        args: The parsed `batch` command-line arguments.
+    """
+    from dotenv import load_dotenv
+
+    from src.llm.batch import BatchRunner
+
+    load_dotenv()
+    runner = BatchRunner(
+        args.model, max_workers=args.concurrency, progress=_print_progress
+    )
+    progress = runner.run(args.input, args.output)
+    print(file=sys.stderr)  # noqa: T201
+    logger.info(
+        "Batch finished: %d answered, %d skipped, %d failed in %.1fs",
+        progress.completed,
+        progress.skipped,
+        progress.failed,
+        progress.elapsed,
+    )
+
+
+def handle_gateway(args: argparse.Namespace) -> None:
+    """
+    Runs the LLM gateway until interrupted.
+
+    Args:
+        args: The parsed `gateway` command-line arguments.
+    """
+    from dotenv import load_dotenv
+
+    from src.llm.cache import ResponseCache
+    from src.llm.gateway import LLMGateway
+    from src.llm.service import LLMService
+
+    load_dotenv()
+    llm_service = LLMService(cache=ResponseCache(path=args.cache))
+    gateway = LLMGateway(
+        llm_service,
+        host=args.host,
+        port=args.port,
+        socket_path=args.socket,
+        max_workers=args.concurrency,
+    )
+    try:
+        gateway.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping the LLM gateway.")
+    finally:
+        gateway.close()
+
+
 def main() -> None:
     """
     Main function to set up logging, parse arguments, and print a greeting.
     """
 
     args = parser()
+    if args.command == "batch":
+        handle_batch(args)
+        return
+    if args.command == "gateway":
+        handle_gateway(args)
+        return
     logger.info("Starting the greeting script.")
 
     name_to_greet = args.name
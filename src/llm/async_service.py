@@ -0,0 +1,515 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Iterable
+from types import TracebackType
+from typing import Any
+
+import httpx
+
+from src.llm.cache import payload_cache_key
+from src.llm.circuit_breaker import CircuitBreakerPolicy
+from src.llm.deadline import Deadline
+from src.llm.hedging import HedgePolicy
+from src.llm.metrics import LLMMetrics, llm_metrics
+from src.llm.multimodal import StreamingJSONBody
+from src.llm.rate_limit import RateLimiterRegistry, RetryPolicy
+from src.llm.registry import LLMRegistry
+from src.llm.service import BaseLLMService
+from src.llm.singleflight import AsyncSingleFlight
+from src.models.llm_config import LLMConfig
+from src.models.llm_response import LLMResponse
+from src.models.request_timeout import RequestTimeout
+
+
+class AsyncLLMService(BaseLLMService):
+    """
+    Asyncio-native counterpart of `LLMService`.
+
+    Requests share one pooled `httpx.AsyncClient` and are capped by a
+    per-service semaphore, so hundreds of prompts can be in flight from a
+    single event loop without overrunning the provider or the connection pool.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        client: httpx.AsyncClient | None = None,
+        coalesce_requests: bool = True,
+        retry_policy: RetryPolicy | None = None,
+        hedge_policy: HedgePolicy | None = None,
+        stats_path: str | None = None,
+        metrics: LLMMetrics | None = None,
+        circuit_breaker: CircuitBreakerPolicy | None = None,
+        timeout: RequestTimeout | None = None,
+    ) -> None:
+        """
+        Args:
+            max_concurrency: Maximum number of requests in flight at once.
+            client: HTTP client to send requests with. A pooled client sized to
+                `max_concurrency` is created if not given.
+            coalesce_requests: Whether callers sending a payload identical to
+                one already in flight await its result instead of sending
+                their own request.
+            retry_policy: Backoff policy for throttled, transient and
+                connection failures. Defaults to `RetryPolicy()`.
+            hedge_policy: Optional policy sending slow requests to a backup
+                model as well, keeping the first successful answer.
+            stats_path: Optional JSON file the registry's model statistics are
+                loaded from now and saved to at exit.
+            metrics: Metrics to record timings and usage in. Defaults to the
+                process-wide `llm_metrics`.
+            circuit_breaker: Optional policy failing fast, or diverting to a
+                fallback model, while a model's endpoint keeps failing.
+            timeout: Default time limits of a call. Defaults to
+                `RequestTimeout()`, which has no total limit.
+        """
+        self.max_concurrency = max_concurrency
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.hedge_policy = hedge_policy
+        self.circuit_breaker = circuit_breaker
+        self.timeout = timeout or RequestTimeout()
+        self.metrics = metrics or llm_metrics
+        if stats_path:
+            self._persist_stats(stats_path)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = client or httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            )
+        )
+        self._in_flight: AsyncSingleFlight[LLMResponse] | None = (
+            AsyncSingleFlight() if coalesce_requests else None
+        )
+
+    async def __aenter__(self) -> "AsyncLLMService":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Closes the underlying HTTP client and its pooled connections."""
+        await self._client.aclose()
+
+    async def send_llm_request(
+        self,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        timeout: RequestTimeout | float | None = None,
+    ) -> str | None:
+        """
+        Sends a request to the LLM via OpenRouter.
+
+        Waits for a free concurrency slot first. Cancelling the calling task,
+        or running out of time, aborts the request and releases its slot.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            messages: The list of messages for the LLM.
+            timeout: Time limits of this call, or its total in seconds.
+                Defaults to the service's `timeout`.
+
+        Returns:
+            The content of the LLM's response, or None if an error occurred
+            or the deadline ran out.
+        """
+        deadline = Deadline.start(timeout, self.timeout)
+        try:
+            model_config: LLMConfig = LLMRegistry.get_model_config(model_name)
+        except ValueError as e:
+            self.logger.error("Invalid model name: %s", e)
+            return None
+
+        build_started_at = time.perf_counter()
+        headers = self._get_llm_headers(model_config.api_key_env)
+        payload = self._prepare_llm_payload(model_config, messages)
+        self.metrics.payload_build_seconds.observe(
+            time.perf_counter() - build_started_at, model_name
+        )
+
+        if self._in_flight is None:
+            llm_response = await self._request(
+                model_name, model_config, headers, payload, deadline
+            )
+            return llm_response.content
+
+        def request() -> Awaitable[LLMResponse]:
+            return self._request(model_name, model_config, headers, payload, deadline)
+
+        try:
+            llm_response, shared = await self._in_flight.do(
+                payload_cache_key(payload), request, deadline.remaining()
+            )
+        except TimeoutError:
+            return self._deadline_exceeded_response(model_name).content
+        if shared and llm_response.deadline_exceeded and not deadline.expired():
+            # The leader ran out of its own time; this caller still has some
+            llm_response = await request()
+        elif shared:
+            self.logger.info("Coalesced duplicate in-flight request for %s", model_name)
+        return llm_response.content
+
+    async def _request(
+        self,
+        model_name: str,
+        model_config: LLMConfig,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        deadline: Deadline,
+    ) -> LLMResponse:
+        """
+        Sends a prepared request, hedging it if the model has a backup.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            model_config: The configuration for the LLM model.
+            headers: The request headers.
+            payload: The request payload.
+            deadline: The call's deadline.
+
+        Returns:
+            The LLM response, with `error` set if the request failed.
+        """
+        policy = self.hedge_policy
+        if policy is None or model_name not in policy.backups:
+            return await self._post(
+                model_name, model_config, headers, payload, deadline
+            )
+        return await self._send_hedged(
+            policy, model_name, model_config, headers, payload, deadline
+        )
+
+    async def _send_hedged(
+        self,
+        policy: HedgePolicy,
+        model_name: str,
+        model_config: LLMConfig,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        deadline: Deadline,
+    ) -> LLMResponse:
+        """
+        Sends a request to the primary model and, if it is slower than its
+        hedge delay or fails, the same messages to the backup model.
+
+        The first successful answer is returned and the other request is
+        cancelled. Both requests share the call's deadline.
+
+        Args:
+            policy: The hedging policy to apply.
+            model_name: The name of the primary model.
+            model_config: The configuration for the primary model.
+            headers: The request headers for the primary model.
+            payload: The request payload for the primary model.
+            deadline: The call's deadline.
+
+        Returns:
+            The winning LLM response, or the primary's failure if both failed.
+        """
+        backup_name = policy.backups[model_name]
+        primary = asyncio.ensure_future(
+            self._post(model_name, model_config, headers, payload, deadline)
+        )
+        tasks = {primary}
+        hedge_delay = policy.hedge_delay(model_name)
+        remaining = deadline.remaining()
+        if remaining is not None:
+            hedge_delay = min(hedge_delay, remaining)
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done and primary.result().ok:
+                policy.record_outcome(model_name, hedged=False, backup_won=False)
+                return primary.result()
+
+            try:
+                backup_config = LLMRegistry.get_model_config(backup_name)
+            except ValueError as e:
+                self.logger.error("Invalid backup model name: %s", e)
+                llm_response = await primary
+                policy.record_outcome(
+                    model_name,
+                    hedged=False,
+                    backup_won=False if llm_response.ok else None,
+                )
+                return llm_response
+
+            self.logger.info("Hedging %s request with %s", model_name, backup_name)
+            backup = asyncio.ensure_future(
+                self._post(
+                    backup_name,
+                    backup_config,
+                    self._get_llm_headers(backup_config.api_key_env),
+                    self._prepare_llm_payload(backup_config, payload["messages"]),
+                    deadline,
+                )
+            )
+            tasks.add(backup)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.result().ok:
+                        policy.record_outcome(
+                            model_name, hedged=True, backup_won=task is backup
+                        )
+                        return task.result()
+            policy.record_outcome(model_name, hedged=True, backup_won=None)
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _post(
+        self,
+        model_name: str,
+        model_config: LLMConfig,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        deadline: Deadline,
+        divert: bool = True,
+    ) -> LLMResponse:
+        """
+        Posts a prepared payload and records the outcome in the model's
+        statistics and circuit breaker.
+
+        Nothing is sent once the deadline has run out. While the model's
+        circuit is open the request goes to the fallback model if `divert` is
+        set and one is configured, and otherwise fails fast.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            model_config: The configuration for the LLM model.
+            headers: The request headers.
+            payload: The request payload.
+            deadline: The call's deadline.
+            divert: Whether an open circuit sends the request to the fallback.
+
+        Returns:
+            The LLM response, with `error` set if the request failed.
+        """
+        if deadline.expired():
+            return self._deadline_exceeded_response(model_name)
+        breaker, allowed = self._admit(model_name, model_config)
+        if not allowed:
+            fallback = self._fallback(model_name) if divert else None
+            if fallback is None:
+                return self._circuit_open_response(model_name)
+            fallback_name, fallback_config = fallback
+            self.logger.warning(
+                "Circuit open for %s; diverting to %s", model_name, fallback_name
+            )
+            return await self._post(
+                fallback_name,
+                fallback_config,
+                self._get_llm_headers(fallback_config.api_key_env),
+                self._prepare_llm_payload(fallback_config, payload["messages"]),
+                deadline,
+                divert=False,
+            )
+        started_at = time.perf_counter()
+        try:
+            llm_response, sent = await self._post_with_retries(
+                model_name, model_config, headers, payload, deadline
+            )
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.release()
+            raise
+        seconds = time.perf_counter() - started_at
+        self._record_outcome(model_name, llm_response, seconds)
+        if breaker is not None:
+            self._record_circuit(breaker, llm_response, sent, seconds)
+        return llm_response
+
+    async def _post_with_retries(
+        self,
+        model_name: str,
+        model_config: LLMConfig,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        deadline: Deadline,
+    ) -> tuple[LLMResponse, bool]:
+        """
+        Posts a prepared payload to the model endpoint once a concurrency slot
+        is free. Errors are logged and returned, never raised.
+
+        Every attempt first reserves budget from the provider's shared rate
+        limiter. Retryable status codes and transport failures are retried
+        with jittered exponential backoff, honouring `Retry-After`; the
+        concurrency slot is released while waiting. An attempt still waiting
+        for a slot or an answer when the deadline runs out is cancelled, and
+        a retry whose backoff or rate-limit wait would outlast it is not made.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            model_config: The configuration for the LLM model.
+            headers: The request headers.
+            payload: The request payload.
+            deadline: The call's deadline.
+
+        Returns:
+            The LLM response, with `error` set if the request failed, and
+            whether any attempt was sent to the provider.
+        """
+        limiter = RateLimiterRegistry.get_rate_limiter(model_config)
+        reserved = self._reserve_tokens(payload)
+        body = self._encode_body(payload)
+        attempt = 0
+        sent = False
+        while True:
+            if not await limiter.acquire_async(reserved, deadline.remaining()):
+                return self._deadline_exceeded_response(model_name), sent
+            try:
+                async with asyncio.timeout(deadline.remaining()), self._semaphore:
+                    sent = True
+                    outcome = await self._attempt(
+                        model_name,
+                        model_config,
+                        headers,
+                        payload,
+                        body,
+                        deadline,
+                        attempt,
+                    )
+            except TimeoutError:
+                limiter.settle(reserved, 0)
+                return self._deadline_exceeded_response(model_name), sent
+            except asyncio.CancelledError:
+                # E.g. the losing hedge, or the caller gave up
+                limiter.settle(reserved, 0)
+                raise
+            if isinstance(outcome, LLMResponse):
+                used = self._used_tokens(outcome.usage) if outcome.ok else 0
+                limiter.settle(reserved, used)
+                return outcome, sent
+            limiter.settle(reserved, 0)
+            if not deadline.allows(outcome):
+                return self._deadline_exceeded_response(model_name), sent
+            await asyncio.sleep(outcome)
+            attempt += 1
+
+    async def _attempt(
+        self,
+        model_name: str,
+        model_config: LLMConfig,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        body: StreamingJSONBody | None,
+        deadline: Deadline,
+        attempt: int,
+    ) -> LLMResponse | float:
+        """
+        Makes one attempt at posting a prepared payload, never raising.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            model_config: The configuration for the LLM model.
+            headers: The request headers.
+            payload: The request payload.
+            body: The streamed body for payloads carrying images, if any.
+            deadline: The call's deadline.
+            attempt: Zero-based number of this attempt.
+
+        Returns:
+            The LLM response, or the seconds to wait before retrying.
+        """
+        limiter = RateLimiterRegistry.get_rate_limiter(model_config)
+        try:
+            self.logger.info(
+                "API request with %s to %s", model_name, model_config.endpoint
+            )
+            connect, read = deadline.limits()
+            response = await self._client.post(
+                model_config.endpoint,
+                **self._body_kwargs(headers, payload, body),
+                timeout=httpx.Timeout(read, connect=connect),
+            )
+            delay = self._retry_delay(
+                model_name, attempt, response.status_code, response.headers, limiter
+            )
+            if delay is not None:
+                return delay
+            limiter.update_from_headers(response.headers)
+            response.raise_for_status()
+            return self._build_llm_response(
+                model_name, self._decode_json(model_name, response)
+            )
+        except httpx.TransportError as e:
+            if deadline.expired():
+                return self._deadline_exceeded_response(model_name)
+            retry_delay = self._retry_after_error(model_name, attempt, e)
+            if retry_delay is None or not deadline.allows(retry_delay):
+                self.logger.error("Error sending LLM request: %s", e)
+                return LLMResponse(model_name=model_name, error=str(e))
+            return retry_delay
+        except httpx.HTTPStatusError as e:
+            self.logger.error("Error sending LLM request: %s", e)
+            return LLMResponse(
+                model_name=model_name,
+                error=str(e),
+                status_code=e.response.status_code,
+            )
+        except httpx.HTTPError as e:
+            self.logger.error("Error sending LLM request: %s", e)
+            return LLMResponse(model_name=model_name, error=str(e))
+        except Exception as e:
+            self.logger.error("Unexpected error during LLM request: %s", e)
+            return LLMResponse(model_name=model_name, error=str(e))
+
+    def _body_kwargs(
+        self,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        body: StreamingJSONBody | None,
+    ) -> dict[str, Any]:
+        """
+        Get the `AsyncClient.post` keyword arguments for one attempt.
+
+        Args:
+            headers: The request headers.
+            payload: The request payload.
+            body: The streamed body for payloads carrying images, if any.
+
+        Returns:
+            `json` for plain payloads, or `content` with a fresh async
+            iterator over the streamed body.
+        """
+        if body is None:
+            return {"headers": headers, "json": payload}
+        # httpx sends async iterables chunked unless told the length
+        return {
+            "headers": {**headers, "Content-Length": str(len(body))},
+            "content": body.aiter_chunks(),
+        }
+
+    async def gather(
+        self,
+        jobs: Iterable[tuple[str, list[dict[str, Any]]]],
+        timeout: RequestTimeout | float | None = None,
+    ) -> list[str | None]:
+        """
+        Sends many requests concurrently, bounded by the service semaphore.
+
+        Args:
+            jobs: `(model_name, messages)` pairs to send.
+            timeout: Time limits of each request, or their total in seconds,
+                counted from this call.
+
+        Returns:
+            The response contents in the same order as `jobs`, with None for
+            requests that failed.
+        """
+        return await asyncio.gather(
+            *(
+                self.send_llm_request(model_name, messages, timeout)
+                for model_name, messages in jobs
+            )
+        )
@@ -0,0 +1,238 @@
+import json
+import os
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from pathlib import Path
+from typing import IO, Any
+
+from src.llm.scheduler import Priority, RequestScheduler
+from src.models.batch import BatchProgress, BatchRecord
+from src.models.llm_response import LLMResponse
+from src.utils.logging import setup_logging
+
+
+def _count_lines(path: Path) -> int:
+    """Counts the non-empty lines of a file without holding it in memory."""
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                count += 1
+    return count
+
+
+def _parse_item(
+    line: str, index: int, model_name: str
+) -> tuple[str, str, list[dict[str, Any]]]:
+    """
+    Parses one input line into its id, model and messages.
+
+    A line is a JSON object with either `messages` or a `prompt` string, and
+    optionally an `id` (default: the line number) and a `model`.
+    """
+    item = json.loads(line)
+    if not isinstance(item, dict):
+        raise ValueError("Expected a JSON object")
+    messages = item.get("messages")
+    if messages is None:
+        if not isinstance(item.get("prompt"), str):
+            raise ValueError("Expected 'messages' or a 'prompt' string")
+        messages = [{"role": "user", "content": item["prompt"]}]
+    elif not isinstance(messages, list):
+        raise ValueError("Expected 'messages' to be a list")
+    model = item.get("model", model_name)
+    if not isinstance(model, str):
+        raise ValueError("Expected 'model' to be a string")
+    return str(item.get("id", index)), model, messages
+
+
+class BatchRunner:
+    """
+    Sends every line of a JSONL file through a RequestScheduler and appends
+    the answers to a JSONL output file.
+
+    Input is read lazily and at most `2 * max_workers` items are in flight,
+    so memory stays flat however large the file is. Every answer is flushed
+    as soon as it arrives, in completion order, tagged with its input line.
+    The output file doubles as the checkpoint: a rerun skips the lines it
+    already answers and drops a partly written last record, so an
+    interrupted run resumes without resending completed items. Failed items
+    are logged and not written, so a rerun retries them.
+    """
+
+    logger = setup_logging("llm_batch")
+
+    def __init__(
+        self,
+        model_name: str,
+        scheduler: RequestScheduler | None = None,
+        max_workers: int = 8,
+        progress: Callable[[BatchProgress], None] | None = None,
+        progress_interval: float = 1.0,
+    ) -> None:
+        """
+        Args:
+            model_name: The LLM model for lines that do not name one.
+            scheduler: Scheduler to send requests with. One with `max_workers`
+                workers is created, and closed after the run, if not given.
+            max_workers: Maximum number of requests in flight at once.
+            progress: Called with the progress at most every
+                `progress_interval` seconds and once at the end.
+            progress_interval: Seconds between progress reports.
+        """
+        self.model_name = model_name
+        self.scheduler = scheduler
+        self.max_workers = max_workers
+        self.progress = progress
+        self.progress_interval = progress_interval
+
+    def run(self, input_path: str | Path, output_path: str | Path) -> BatchProgress:
+        """
+        Runs the batch, resuming from the output file if it exists.
+
+        Args:
+            input_path: JSONL file of requests.
+            output_path: JSONL file the BatchRecords are appended to.
+
+        Returns:
+            The final progress.
+        """
+        input_path, output_path = Path(input_path), Path(output_path)
+        done = self._completed_lines(output_path)
+        progress = BatchProgress(total=_count_lines(input_path))
+        scheduler = self.scheduler or RequestScheduler(max_workers=self.max_workers)
+        started_at = time.monotonic()
+        last_report = started_at
+
+        def report(force: bool = False) -> None:
+            nonlocal last_report
+            now = time.monotonic()
+            progress.elapsed = now - started_at
+            if self.progress and (force or now - last_report >= self.progress_interval):
+                self.progress(progress.model_copy())
+                last_report = now
+
+        pending: dict[Future[LLMResponse], tuple[int, str]] = {}
+        try:
+            with open(output_path, "a", encoding="utf-8") as output:
+                try:
+                    for index, item_id, model_name, messages in self._items(
+                        input_path, done, progress
+                    ):
+                        while len(pending) >= 2 * self.max_workers:
+                            self._collect(pending, output, progress)
+                            report()
+                        future = scheduler.submit(model_name, messages, Priority.BULK)
+                        pending[future] = (index, item_id)
+                    while pending:
+                        self._collect(pending, output, progress)
+                        report()
+                except BaseException:
+                    self._drain(pending, output, progress)
+                    raise
+        finally:
+            if self.scheduler is None:
+                scheduler.close(wait=not pending)
+        report(force=True)
+        return progress
+
+    def _items(
+        self, input_path: Path, done: bytearray, progress: BatchProgress
+    ) -> Iterator[tuple[int, str, str, list[dict[str, Any]]]]:
+        """Yields the parsed input lines not answered yet, skipping bad ones."""
+        with open(input_path, encoding="utf-8") as f:
+            index = -1
+            for line in f:
+                if not line.strip():
+                    continue
+                index += 1
+                if index < len(done) and done[index]:
+                    progress.skipped += 1
+                    continue
+                try:
+                    yield (index, *_parse_item(line, index, self.model_name))
+                except ValueError as e:
+                    self.logger.error("Invalid batch input on line %d: %s", index, e)
+                    progress.failed += 1
+
+    def _drain(
+        self,
+        pending: dict[Future[LLMResponse], tuple[int, str]],
+        output: IO[str],
+        progress: BatchProgress,
+    ) -> None:
+        """
+        Stops an interrupted batch without paying for answers it throws away.
+
+        Queued requests are cancelled before they are sent, to be sent on
+        resume instead, and the answers of requests already sent are waited
+        for and written.
+        """
+        for future in list(pending):
+            if future.cancel():
+                del pending[future]
+        if pending:
+            self.logger.warning(
+                "Interrupted; writing %d requests already sent", len(pending)
+            )
+        while pending:
+            self._collect(pending, output, progress)
+
+    def _collect(
+        self,
+        pending: dict[Future[LLMResponse], tuple[int, str]],
+        output: IO[str],
+        progress: BatchProgress,
+    ) -> None:
+        """Waits for a pending request and writes every answer that arrived."""
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            index, item_id = pending.pop(future)
+            llm_response = future.result()
+            if not llm_response.ok:
+                self.logger.error(
+                    "Batch item %s failed: %s", item_id, llm_response.error
+                )
+                progress.failed += 1
+                continue
+            record = BatchRecord(
+                line=index,
+                id=item_id,
+                model_name=llm_response.model_name,
+                content=llm_response.content or "",
+                usage=llm_response.usage,
+                cached=llm_response.cached,
+            )
+            output.write(record.model_dump_json() + "\n")
+            progress.completed += 1
+        output.flush()
+
+    def _completed_lines(self, output_path: Path) -> bytearray:
+        """
+        Reads which input lines an earlier run answered, one byte per line,
+        and truncates a record left half-written by a crash.
+        """
+        done = bytearray()
+        if not output_path.exists():
+            return done
+        with open(output_path, "rb+") as f:
+            valid_end = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                valid_end += len(line)
+                try:
+                    index = int(json.loads(line)["line"])
+                except (ValueError, KeyError, TypeError):
+                    self.logger.warning("Ignoring an invalid record in %s", output_path)
+                    continue
+                if index >= len(done):
+                    done.extend(bytes(index + 1 - len(done)))
+                done[index] = 1
+            if valid_end < os.fstat(f.fileno()).st_size:
+                self.logger.warning(
+                    "Dropping a partial record at the end of %s", output_path
+                )
+                f.truncate(valid_end)
+        return done
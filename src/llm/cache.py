@@ -0,0 +1,242 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from src.llm.multimodal import ImageSource
+from src.models.llm_response import LLMResponse
+
+# Memory hits whose access time is written to disk together
+TOUCH_BATCH_SIZE = 256
+
+
+def payload_cache_key(payload: dict[str, Any]) -> str:
+    """
+    Computes a content address for an LLM request payload.
+
+    The payload is serialised canonically (sorted keys, compact separators) so
+    equal payloads always hash the same regardless of dict insertion order.
+    Images are represented by the digest of their bytes.
+
+    Args:
+        payload: The request payload from `_prepare_llm_payload`.
+
+    Returns:
+        The hex SHA-256 digest of the canonical payload.
+    """
+    canonical = json.dumps(
+        payload,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_canonical_default,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _canonical_default(value: object) -> str:
+    if isinstance(value, ImageSource):
+        return f"image:sha256:{value.sha256()}"
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class ResponseCache:
+    """
+    Two-level cache of successful LLM responses keyed by payload hash.
+
+    Lookups hit an in-memory LRU first and fall back to an optional SQLite
+    store, so cached answers survive process restarts. Entries expire after
+    `ttl` seconds and both levels are bounded in size. Memory hits refresh
+    the entry's access time on disk in batches, so hot entries are not the
+    first evicted from disk, and the disk is trimmed by 1% of its limit at a
+    time once it is full.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_entries: int = 1024,
+        max_disk_entries: int = 100_000,
+        ttl: float | None = 7 * 24 * 3600,
+    ) -> None:
+        """
+        Args:
+            path: Path of the SQLite database. Only the in-memory LRU is used
+                if not given.
+            max_entries: Maximum number of entries kept in memory.
+            max_disk_entries: Maximum number of entries kept on disk; the
+                least recently used are deleted beyond it.
+            ttl: Seconds after which an entry expires, or None to keep entries
+                until they are evicted.
+        """
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, tuple[float, LLMResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        # Access times of memory hits not yet written to disk
+        self._touched: dict[str, float] = {}
+        self._disk_entries = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                "ON responses (accessed_at)"
+            )
+            self._db.commit()
+            (self._disk_entries,) = self._db.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()
+
+    def get(self, key: str) -> LLMResponse | None:
+        """
+        Looks up a cached response.
+
+        Args:
+            key: The payload cache key.
+
+        Returns:
+            The cached response, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, response = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._touch(key, now)
+                    self.hits += 1
+                    return response
+                del self._memory[key]
+
+            stored = self._get_from_disk(key, now)
+            if stored is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return stored
+
+    def set(self, key: str, response: LLMResponse) -> None:
+        """
+        Stores a response in memory and, if configured, on disk.
+
+        Args:
+            key: The payload cache key.
+            response: The response to cache.
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, response)
+            if self._db is None:
+                return
+            value = response.model_dump_json()
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO responses VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            ).rowcount
+            if inserted:
+                self._disk_entries += 1
+            else:
+                self._db.execute(
+                    "UPDATE responses SET value = ?, created_at = ?, accessed_at = ? "
+                    "WHERE key = ?",
+                    (value, now, now, key),
+                )
+            if self._disk_entries > self.max_disk_entries:
+                self._evict()
+            self._db.commit()
+
+    def clear(self) -> None:
+        """Removes every entry from both cache levels."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+                self._disk_entries = 0
+
+    def close(self) -> None:
+        """Saves pending access times and closes the on-disk store."""
+        with self._lock:
+            if self._db is not None:
+                self._flush_touches()
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _remember(self, key: str, created_at: float, response: LLMResponse) -> None:
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key: str, now: float) -> None:
+        """Records a memory hit's access time for the next disk write."""
+        if self._db is None:
+            return
+        self._touched[key] = now
+        if len(self._touched) >= TOUCH_BATCH_SIZE:
+            self._flush_touches()
+            self._db.commit()
+
+    def _flush_touches(self) -> None:
+        """Writes the access times of recent memory hits to disk."""
+        if self._db is None or not self._touched:
+            return
+        self._db.executemany(
+            "UPDATE responses SET accessed_at = ? WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _evict(self) -> None:
+        """Deletes the least recently used disk entries beyond the limit."""
+        if self._db is None:
+            return
+        self._flush_touches()
+        excess = self._disk_entries - self.max_disk_entries
+        batch = max(1, self.max_disk_entries // 100)
+        deleted = self._db.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+            "ORDER BY accessed_at LIMIT ?)",
+            (excess + batch - 1,),
+        ).rowcount
+        self._disk_entries -= deleted
+
+    def _get_from_disk(self, key: str, now: float) -> LLMResponse | None:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if self._expired(created_at, now):
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+            self._disk_entries -= 1
+            return None
+        self._db.execute(
+            "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        self._db.commit()
+        response = LLMResponse.model_validate_json(value)
+        self._remember(key, created_at, response)
+        return response
@@ -0,0 +1,260 @@
+import threading
+import time
+from collections import deque
+from enum import StrEnum
+from functools import partial
+
+from pydantic import BaseModel
+
+from src.llm.rate_limit import RETRYABLE_STATUS_CODES
+from src.models.llm_response import LLMResponse
+
+
+class CircuitState(StrEnum):
+    """Whether requests to a model are sent."""
+
+    # Requests are sent and their outcomes recorded
+    CLOSED = "closed"
+    # Requests fail fast or go to the fallback model
+    OPEN = "open"
+    # A few probe requests are sent to check whether the model recovered
+    HALF_OPEN = "half_open"
+
+
+class CircuitSnapshot(BaseModel):
+    """Point-in-time view of one circuit breaker."""
+
+    state: CircuitState
+    requests: int
+    failures: int
+    slow_requests: int
+    # Seconds until an open circuit lets a probe through
+    retry_in: float | None = None
+
+
+def is_provider_failure(llm_response: LLMResponse) -> bool:
+    """
+    Checks whether a failed response points at the provider rather than the
+    request, so it should count against the circuit.
+
+    Args:
+        llm_response: The response of a sent request.
+
+    Returns:
+        True for transport errors, throttling, server errors and empty
+        answers; False for successes, other client errors and calls cut
+        short by their own deadline.
+    """
+    if llm_response.ok or llm_response.deadline_exceeded:
+        return False
+    status = llm_response.status_code
+    return status is None or status in RETRYABLE_STATUS_CODES or status >= 500
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker over a rolling window of request outcomes.
+
+    The circuit opens once at least `min_requests` of the last `window`
+    requests were recorded and the share of failures or of requests slower
+    than `slow_call_seconds` reaches its threshold. After `open_seconds` it
+    lets `half_open_probes` requests through; if they all succeed in time it
+    closes, otherwise it opens again.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_requests: int = 10,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float | None = None,
+        slow_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ) -> None:
+        """
+        Args:
+            window: Number of most recent outcomes considered.
+            min_requests: Outcomes needed before the circuit may open.
+            failure_rate_threshold: Share of failures that opens the circuit.
+            slow_call_seconds: Latency above which a request counts as slow,
+                or None to ignore latency.
+            slow_rate_threshold: Share of slow requests that opens the circuit.
+            open_seconds: Seconds an open circuit fails fast before probing.
+            half_open_probes: Probe requests that must succeed to close.
+        """
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._state = CircuitState.CLOSED
+        # (failed, slow) per recorded request
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes_sent = 0
+        self._probes_passed = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Decides whether a request may be sent now.
+
+        Every allowed request must be followed by `record`.
+
+        Returns:
+            True if the request may be sent, False if it should fail fast.
+        """
+        with self._lock:
+            if self._state == CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self._state = CircuitState.HALF_OPEN
+                self._probes_sent = self._probes_passed = 0
+            if self._state == CircuitState.HALF_OPEN:
+                if self._probes_sent >= self.half_open_probes:
+                    return False
+                self._probes_sent += 1
+            return True
+
+    def record(self, failed: bool, seconds: float) -> None:
+        """
+        Records the outcome of an allowed request.
+
+        Args:
+            failed: Whether the request failed because of the provider.
+            seconds: The request's latency.
+        """
+        slow = self.slow_call_seconds is not None and seconds > self.slow_call_seconds
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN:
+                if failed or slow:
+                    self._open()
+                    return
+                self._probes_passed += 1
+                if self._probes_passed >= self.half_open_probes:
+                    self._state = CircuitState.CLOSED
+                    self._outcomes.clear()
+                return
+            if self._state == CircuitState.OPEN:
+                # A request allowed before the circuit opened
+                return
+            self._outcomes.append((failed, slow))
+            if len(self._outcomes) < self.min_requests:
+                return
+            failures = sum(f for f, _ in self._outcomes) / len(self._outcomes)
+            slow_share = sum(s for _, s in self._outcomes) / len(self._outcomes)
+            if (
+                failures >= self.failure_rate_threshold
+                or slow_share >= self.slow_rate_threshold
+            ):
+                self._open()
+
+    def release(self) -> None:
+        """
+        Gives back the slot of an allowed request that was cancelled before
+        its outcome was known, so a half-open circuit can probe again.
+        """
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN and self._probes_sent > 0:
+                self._probes_sent -= 1
+
+    def _open(self) -> None:
+        """Opens the circuit; must be called with the lock held."""
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def snapshot(self) -> CircuitSnapshot:
+        """Get the breaker's state and the counts of its current window."""
+        with self._lock:
+            retry_in = None
+            if self._state == CircuitState.OPEN:
+                elapsed = time.monotonic() - self._opened_at
+                retry_in = max(0.0, self.open_seconds - elapsed)
+            return CircuitSnapshot(
+                state=self._state,
+                requests=len(self._outcomes),
+                failures=sum(f for f, _ in self._outcomes),
+                slow_requests=sum(s for _, s in self._outcomes),
+                retry_in=retry_in,
+            )
+
+
+class CircuitBreakerPolicy:
+    """
+    Circuit breakers per model and endpoint, plus the models to divert to
+    while a circuit is open.
+
+    While a model's circuit is open its requests go to its fallback model,
+    if one is configured and its own circuit lets them through, and otherwise
+    fail immediately with an error instead of waiting for the request timeout.
+    """
+
+    def __init__(
+        self,
+        fallbacks: dict[str, str] | None = None,
+        window: int = 20,
+        min_requests: int = 10,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float | None = None,
+        slow_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ) -> None:
+        """
+        Args:
+            fallbacks: Fallback model name keyed by model name, e.g.
+                `{"gemini-flash-2.5": "gpt-4.1-mini"}`.
+            window: Number of most recent outcomes considered per breaker.
+            min_requests: Outcomes needed before a circuit may open.
+            failure_rate_threshold: Share of failures that opens a circuit.
+            slow_call_seconds: Latency above which a request counts as slow,
+                or None to ignore latency.
+            slow_rate_threshold: Share of slow requests that opens a circuit.
+            open_seconds: Seconds an open circuit fails fast before probing.
+            half_open_probes: Probe requests that must succeed to close.
+        """
+        self.fallbacks = fallbacks or {}
+        self._new_breaker = partial(
+            CircuitBreaker,
+            window=window,
+            min_requests=min_requests,
+            failure_rate_threshold=failure_rate_threshold,
+            slow_call_seconds=slow_call_seconds,
+            slow_rate_threshold=slow_rate_threshold,
+            open_seconds=open_seconds,
+            half_open_probes=half_open_probes,
+        )
+        self._breakers: dict[tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, model_name: str, endpoint: str) -> CircuitBreaker:
+        """
+        Get the circuit breaker of a model on an endpoint, creating it closed.
+
+        Args:
+            model_name: The name of the LLM model.
+            endpoint: The endpoint the model is called on.
+
+        Returns:
+            The CircuitBreaker.
+        """
+        key = (model_name, endpoint)
+        with self._lock:
+            if key not in self._breakers:
+                self._breakers[key] = self._new_breaker()
+            return self._breakers[key]
+
+    def snapshots(self) -> dict[tuple[str, str], CircuitSnapshot]:
+        """
+        Get the state of every breaker that has seen a request.
+
+        Returns:
+            CircuitSnapshots keyed by `(model_name, endpoint)`.
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {key: breaker.snapshot() for key, breaker in breakers.items()}
@@ -0,0 +1,79 @@
+import time
+
+from src.models.request_timeout import RequestTimeout
+
+
+class Deadline:
+    """
+    Time budget of one call, started when the call is made and shared by its
+    retries, hedges and fallbacks.
+
+    The connect and read timeouts of every attempt are capped by the time
+    left, and work that cannot start before the deadline is dropped instead
+    of being sent.
+    """
+
+    def __init__(self, timeout: RequestTimeout) -> None:
+        """
+        Args:
+            timeout: The call's time limits; its total starts counting now.
+        """
+        self.timeout = timeout
+        self.expires_at = (
+            None if timeout.total is None else time.monotonic() + timeout.total
+        )
+
+    @classmethod
+    def start(
+        cls, timeout: RequestTimeout | float | None, default: RequestTimeout
+    ) -> "Deadline":
+        """
+        Starts the deadline of a call.
+
+        Args:
+            timeout: The call's time limits, a total in seconds applied on top
+                of the default connect and read timeouts, or None for the
+                default.
+            default: The caller's default time limits.
+
+        Returns:
+            The running Deadline.
+        """
+        if timeout is None:
+            timeout = default
+        elif not isinstance(timeout, RequestTimeout):
+            timeout = default.model_copy(update={"total": float(timeout)})
+        return cls(timeout)
+
+    def remaining(self) -> float | None:
+        """Get the seconds left, or None if the call has no total limit."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Whether no time is left."""
+        return self.remaining() == 0
+
+    def allows(self, seconds: float) -> bool:
+        """
+        Checks whether waiting a number of seconds still leaves time to send.
+
+        Args:
+            seconds: The wait, e.g. a retry backoff.
+
+        Returns:
+            True if time would be left after waiting.
+        """
+        remaining = self.remaining()
+        return remaining is None or seconds < remaining
+
+    def limits(self) -> tuple[float, float]:
+        """
+        Get the `(connect, read)` timeouts of the next attempt, capped by the
+        time left.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return self.timeout.connect, self.timeout.read
+        return min(self.timeout.connect, remaining), min(self.timeout.read, remaining)
@@ -0,0 +1,450 @@
+import http.client
+import os
+import select
+import socket
+import socketserver
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from pydantic import BaseModel, ValidationError
+
+from src.llm.cache import ResponseCache
+from src.llm.multimodal import StreamingJSONBody, contains_images
+from src.llm.scheduler import Priority, RequestScheduler
+from src.llm.service import LLMService
+from src.models.llm_response import LLMResponse
+from src.models.request_timeout import RequestTimeout
+from src.utils.logging import setup_logging
+
+DEFAULT_GATEWAY_ADDRESS = "http://127.0.0.1:8765"
+
+
+class GatewayRequest(BaseModel):
+    """Body of a `POST /v1/requests` call to the gateway."""
+
+    model_name: str
+    messages: list[dict[str, Any]]
+    priority: Priority = Priority.INTERACTIVE
+    # Counted from when the gateway receives the request
+    timeout: RequestTimeout | float | None = None
+
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_TCPGatewayServer | _UnixGatewayServer"
+
+    def do_GET(self) -> None:  # noqa: N802
+        path = self.path.split("?")[0]
+        if path == "/health":
+            self._send(200, b'{"status": "ok"}', "application/json")
+        elif path == "/metrics":
+            body = self.server.gateway.llm_service.metrics.render().encode()
+            self._send(200, body, "text/plain; version=0.0.4")
+        else:
+            self._send(404, b'{"error": "Not found"}', "application/json")
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self.path.split("?")[0] != "/v1/requests":
+            self._send(404, b'{"error": "Not found"}', "application/json")
+            return
+        length = self._content_length()
+        if length is None:
+            return
+        try:
+            request = GatewayRequest.model_validate_json(self.rfile.read(length))
+        except ValidationError as e:
+            self._send_error(400, str(e))
+            return
+        llm_response = self.server.gateway.handle(request)
+        self._send(200, llm_response.model_dump_json().encode(), "application/json")
+
+    def _content_length(self) -> int | None:
+        """
+        Get the length of the request body, answering the request with an
+        error if the header is missing or invalid.
+        """
+        header = self.headers.get("Content-Length")
+        try:
+            length = -1 if header is None else int(header)
+        except ValueError:
+            length = -1
+        if length >= 0:
+            return length
+        # The body cannot be skipped, so the connection cannot carry another
+        # request
+        self.close_connection = True
+        if header is None:
+            self._send_error(411, "Content-Length required")
+        else:
+            self._send_error(400, f"Invalid Content-Length: {header}")
+        return None
+
+    def _send_error(self, status: int, error: str) -> None:
+        body = LLMResponse(model_name="", error=error).model_dump_json()
+        self._send(status, body.encode(), "application/json")
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        # Unix socket peers have no address, so the default format fails
+        LLMGateway.logger.debug(format, *args)
+
+
+class _TCPGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+    gateway: "LLMGateway"
+
+
+class _UnixGatewayServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    gateway: "LLMGateway"
+
+
+class LLMGateway:
+    """
+    Long-lived local server sharing one LLMService between processes.
+
+    Short-lived workers send their requests here through a GatewayClient
+    instead of each creating a service, so they share its warm connection
+    pool, one response cache and one view of every provider's rate limits.
+    Requests go through a RequestScheduler, so the gateway keeps at most
+    `max_workers` requests in flight and dispatches interactive ones first.
+    The gateway listens on localhost HTTP, or on a Unix socket so only local
+    users with access to the socket file can reach it.
+    """
+
+    logger = setup_logging("llm_gateway")
+
+    def __init__(
+        self,
+        llm_service: LLMService | None = None,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        socket_path: str | None = None,
+        max_workers: int = 32,
+    ) -> None:
+        """
+        Args:
+            llm_service: Service to send requests with. One with an in-memory
+                response cache is created if not given.
+            host: Interface to listen on for HTTP.
+            port: Port to listen on for HTTP; 0 picks a free port.
+            socket_path: Unix socket to listen on instead of HTTP. A stale
+                socket file left by a previous gateway is replaced.
+            max_workers: Maximum number of requests in flight at once.
+        """
+        self.llm_service = llm_service or LLMService(cache=ResponseCache())
+        self.scheduler = RequestScheduler(self.llm_service, max_workers=max_workers)
+        self.socket_path = socket_path
+        self._server: _TCPGatewayServer | _UnixGatewayServer
+        if socket_path is None:
+            self._server = _TCPGatewayServer((host, port), _GatewayHandler)
+        else:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self._server = _UnixGatewayServer(socket_path, _GatewayHandler)
+        self._server.gateway = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> str:
+        """The address clients connect to, e.g. `http://127.0.0.1:8765`."""
+        if self.socket_path is not None:
+            return f"unix://{self.socket_path}"
+        host, port = self._server.socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, request: GatewayRequest) -> LLMResponse:
+        """
+        Sends one request through the shared scheduler and waits for it.
+
+        Args:
+            request: The request received from a client.
+
+        Returns:
+            The LLM response, with `error` set if the request failed.
+        """
+        try:
+            future = self.scheduler.submit(
+                request.model_name, request.messages, request.priority, request.timeout
+            )
+        except RuntimeError as e:
+            return LLMResponse(model_name=request.model_name, error=str(e))
+        return future.result()
+
+    def serve_forever(self) -> None:
+        """Serves requests on the calling thread until `close` is called."""
+        self.logger.info("LLM gateway listening on %s", self.address)
+        self._server.serve_forever()
+
+    def start(self) -> "LLMGateway":
+        """
+        Serves requests from a daemon thread.
+
+        Returns:
+            The gateway itself, for chaining.
+        """
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="llm-gateway", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stops serving, finishes queued requests and removes the socket."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+        self._server.server_close()
+        self.scheduler.close()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def __enter__(self) -> "LLMGateway":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket."""
+
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def _is_closed(connection: http.client.HTTPConnection) -> bool:
+    """
+    Checks whether the peer closed a kept-alive connection.
+
+    An idle connection has nothing to read, so a readable socket means the
+    gateway closed it or it is out of step; either way it must not be used.
+    """
+    if connection.sock is None:
+        return False
+    readable, _, _ = select.select([connection.sock], [], [], 0)
+    return bool(readable)
+
+
+class GatewayClient:
+    """
+    Thin client of an LLMGateway with the request interface of LLMService.
+
+    Each thread keeps one keep-alive connection to the gateway. Errors,
+    including an unreachable gateway, are logged and returned in the
+    LLMResponse, never raised.
+    """
+
+    logger = setup_logging("llm_gateway_client")
+
+    def __init__(
+        self, address: str = DEFAULT_GATEWAY_ADDRESS, timeout: float = 300.0
+    ) -> None:
+        """
+        Args:
+            address: The gateway's address: `http://host:port` or
+                `unix:///path/to/socket`.
+            timeout: Seconds to wait for the gateway to answer a request.
+                Calls with a shorter deadline are cut off by the gateway.
+        """
+        self.address = address
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def send_llm_request(
+        self,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        timeout: RequestTimeout | float | None = None,
+    ) -> str | None:
+        """
+        Sends a request to the LLM through the gateway.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            messages: The list of messages for the LLM.
+            timeout: Time limits of this call, or its total in seconds.
+                Defaults to the gateway service's `timeout`.
+
+        Returns:
+            The content of the LLM's response, or None if an error occurred.
+        """
+        return self.send(model_name, messages, timeout=timeout).content
+
+    def send_llm_requests(
+        self,
+        batch: Sequence[tuple[str, list[dict[str, Any]]]],
+        max_workers: int = 8,
+        timeout: RequestTimeout | float | None = None,
+    ) -> list[LLMResponse]:
+        """
+        Sends a batch of requests through the gateway concurrently.
+
+        Args:
+            batch: `(model_name, messages)` jobs to send.
+            max_workers: Maximum number of requests in flight at once.
+            timeout: Time limits of each request, or its total in seconds.
+
+        Returns:
+            One LLMResponse per job, in the same order as `batch`.
+        """
+        if not batch:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batch))) as executor:
+            return list(
+                executor.map(
+                    lambda job: self.send(job[0], job[1], timeout=timeout), batch
+                )
+            )
+
+    def send(
+        self,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: RequestTimeout | float | None = None,
+    ) -> LLMResponse:
+        """
+        Sends a request through the gateway and returns the full response.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            messages: The list of messages for the LLM.
+            priority: The request's scheduling class at the gateway.
+            timeout: Time limits of this call, or its total in seconds.
+
+        Returns:
+            The LLM response, with `error` set if the request failed.
+        """
+        try:
+            body = self._encode_request(model_name, messages, priority, timeout)
+        except (TypeError, ValueError) as e:
+            self.logger.error("Cannot encode the LLM gateway request: %s", e)
+            return LLMResponse(model_name=model_name, error=str(e))
+        try:
+            status, data = self._exchange("POST", "/v1/requests", body)
+        except (OSError, http.client.HTTPException) as e:
+            self.logger.error("Error reaching the LLM gateway: %s", e)
+            return LLMResponse(model_name=model_name, error=f"Gateway error: {e}")
+        try:
+            llm_response = LLMResponse.model_validate_json(data)
+        except ValidationError as e:
+            self.logger.error("Invalid response from the LLM gateway: %s", e)
+            return LLMResponse(model_name=model_name, error=str(e), status_code=status)
+        if status != 200:
+            self.logger.error(
+                "LLM gateway rejected the request: %s", llm_response.error
+            )
+        return llm_response
+
+    def _encode_request(
+        self,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        priority: Priority,
+        timeout: RequestTimeout | float | None,
+    ) -> bytes:
+        """
+        Serialises a gateway request, encoding ImageSources as data URLs.
+
+        Returns:
+            The JSON request body.
+
+        Raises:
+            TypeError: If the messages hold values JSON cannot represent.
+            ValueError: If the request is invalid.
+        """
+        request = GatewayRequest(
+            model_name=model_name, messages=messages, priority=priority, timeout=timeout
+        )
+        if not contains_images(messages):
+            return request.model_dump_json().encode()
+        payload = request.model_dump(mode="json", exclude={"messages"})
+        payload["messages"] = messages
+        return b"".join(StreamingJSONBody(payload))
+
+    def health(self) -> bool:
+        """Checks whether the gateway is up and answering."""
+        try:
+            status, _ = self._exchange("GET", "/health")
+        except (OSError, http.client.HTTPException):
+            return False
+        return status == 200
+
+    def close(self) -> None:
+        """Closes the calling thread's connection to the gateway."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        """Opens a new connection to the gateway."""
+        if self.address.startswith("unix://"):
+            return _UnixHTTPConnection(self.address[len("unix://") :], self.timeout)
+        host = self.address.removeprefix("http://").rstrip("/")
+        return http.client.HTTPConnection(host, timeout=self.timeout)
+
+    def _exchange(
+        self, method: str, path: str, body: bytes | None = None
+    ) -> tuple[int, bytes]:
+        """
+        Sends one HTTP request on the calling thread's connection.
+
+        A kept-alive connection the gateway has closed in the meantime is
+        replaced before anything is sent on it. A request that fails once
+        sent is not sent again, since the gateway may already be answering
+        it, except for idempotent GETs.
+
+        Returns:
+            The response status and body.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and _is_closed(connection):
+            self.close()
+            connection = None
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        try:
+            return self._request(connection, method, path, body)
+        except (OSError, http.client.HTTPException):
+            self.close()
+            if method != "GET":
+                raise
+        self._local.connection = self._connect()
+        try:
+            return self._request(self._local.connection, method, path, body)
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+
+    def _request(
+        self,
+        connection: http.client.HTTPConnection,
+        method: str,
+        path: str,
+        body: bytes | None,
+    ) -> tuple[int, bytes]:
+        """Sends one HTTP request and reads the whole response."""
+        headers = {"Content-Type": "application/json"} if body else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.read()
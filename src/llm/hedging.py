@@ -0,0 +1,157 @@
+import threading
+from collections import defaultdict, deque
+
+from pydantic import BaseModel
+
+from src.llm.stats import percentile
+
+
+class LatencyTracker:
+    """Thread-safe rolling window of recent request latencies per model."""
+
+    def __init__(self, window: int = 200) -> None:
+        """
+        Args:
+            window: Number of most recent latencies kept per model.
+        """
+        self.window = window
+        self._latencies: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model_name: str, seconds: float) -> None:
+        """
+        Records the latency of a successful request.
+
+        Args:
+            model_name: The name of the LLM model.
+            seconds: The end-to-end latency in seconds.
+        """
+        with self._lock:
+            if model_name not in self._latencies:
+                self._latencies[model_name] = deque(maxlen=self.window)
+            self._latencies[model_name].append(seconds)
+
+    def count(self, model_name: str) -> int:
+        """Get the number of latencies currently in the model's window."""
+        with self._lock:
+            return len(self._latencies.get(model_name, ()))
+
+    def percentile(self, model_name: str, pct: float) -> float | None:
+        """
+        Get a latency percentile over the model's window (nearest-rank).
+
+        Args:
+            model_name: The name of the LLM model.
+            pct: The percentile between 0 and 100.
+
+        Returns:
+            The latency in seconds, or None if nothing was recorded.
+        """
+        with self._lock:
+            samples = list(self._latencies.get(model_name, ()))
+        return percentile(samples, pct)
+
+
+class HedgeStats(BaseModel):
+    """Counters showing how often hedging fires and which side wins."""
+
+    requests: int = 0
+    hedged: int = 0
+    primary_wins: int = 0
+    backup_wins: int = 0
+    # Requests neither side answered successfully, e.g. both failed or the
+    # deadline ran out
+    failures: int = 0
+
+    @property
+    def hedge_rate(self) -> float:
+        """Share of requests that fired a backup request."""
+        return self.hedged / self.requests if self.requests else 0.0
+
+
+class HedgePolicy:
+    """
+    Fires a backup request when the primary model is slower than usual.
+
+    If the primary has not answered within the configured percentile of its
+    recent latency, the same request is sent to its backup model and the
+    first successful answer wins. Until enough latencies are recorded,
+    `default_delay` is used as the hedge threshold.
+    """
+
+    def __init__(
+        self,
+        backups: dict[str, str],
+        percentile: float = 95,
+        min_samples: int = 20,
+        default_delay: float = 10.0,
+        tracker: LatencyTracker | None = None,
+    ) -> None:
+        """
+        Args:
+            backups: Backup model name keyed by primary model name, e.g.
+                `{"gemini-flash-2.5": "gpt-4.1-mini"}`.
+            percentile: Latency percentile of the primary after which to hedge.
+            min_samples: Latencies needed before the percentile is trusted.
+            default_delay: Hedge threshold in seconds while samples are few.
+            tracker: Latency tracker to read from. A new one is created if not
+                given.
+        """
+        self.backups = backups
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.tracker = tracker or LatencyTracker()
+        self._stats: defaultdict[str, HedgeStats] = defaultdict(HedgeStats)
+        self._lock = threading.Lock()
+
+    def hedge_delay(self, model_name: str) -> float:
+        """
+        Get how long to wait for the primary before firing the backup.
+
+        Args:
+            model_name: The name of the primary model.
+
+        Returns:
+            The delay in seconds.
+        """
+        if self.tracker.count(model_name) < self.min_samples:
+            return self.default_delay
+        delay = self.tracker.percentile(model_name, self.percentile)
+        return self.default_delay if delay is None else delay
+
+    def record_outcome(
+        self, model_name: str, hedged: bool, backup_won: bool | None
+    ) -> None:
+        """
+        Records the outcome of a request to a hedged model.
+
+        Args:
+            model_name: The name of the primary model.
+            hedged: Whether a backup request was fired.
+            backup_won: Whether the backup's answer was used, or None if
+                neither side answered successfully.
+        """
+        with self._lock:
+            stats = self._stats[model_name]
+            stats.requests += 1
+            stats.hedged += hedged
+            if backup_won is None:
+                stats.failures += 1
+            elif backup_won:
+                stats.backup_wins += 1
+            else:
+                stats.primary_wins += 1
+
+    def stats(self, model_name: str) -> HedgeStats:
+        """
+        Get a snapshot of the hedging counters of a primary model.
+
+        Args:
+            model_name: The name of the primary model.
+
+        Returns:
+            A copy of the model's HedgeStats.
+        """
+        with self._lock:
+            return self._stats[model_name].model_copy()
@@ -0,0 +1,269 @@
+import hashlib
+import io
+import math
+import os
+import shutil
+import tempfile
+from collections.abc import Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from importlib.util import find_spec
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+from src.llm.multimodal import ImageSource, build_image_message
+from src.llm.registry import LLMRegistry
+from src.models.image_preset import ImagePreset
+from src.utils.logging import setup_logging
+
+_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+def _tile_boxes(
+    width: int, height: int, tile_size: int, overlap: int
+) -> list[tuple[int, int, int, int]]:
+    """
+    Splits an image into a grid of overlapping tiles, row by row.
+
+    Args:
+        width: Image width in pixels.
+        height: Image height in pixels.
+        tile_size: Maximum tile side in pixels.
+        overlap: Pixels shared by neighbouring tiles, so text cut at a tile
+            border is whole in one of them.
+
+    Returns:
+        The `(left, upper, right, lower)` box of every tile.
+    """
+
+    def starts(length: int) -> list[int]:
+        if length <= tile_size:
+            return [0]
+        # Fewest tiles with at least `overlap`, spread evenly over the length
+        count = math.ceil((length - overlap) / max(1, tile_size - overlap))
+        return [round(i * (length - tile_size) / (count - 1)) for i in range(count)]
+
+    return [
+        (left, top, min(left + tile_size, width), min(top + tile_size, height))
+        for top in starts(height)
+        for left in starts(width)
+    ]
+
+
+def process_image(source: str | bytes, preset: ImagePreset) -> list[bytes]:
+    """
+    Downscales, optionally tiles and recompresses one image.
+
+    Runs in a worker process, so it takes and returns only picklable values.
+
+    Args:
+        source: Path of the image file, or the image bytes.
+        preset: How to prepare the image.
+
+    Returns:
+        The encoded image, or its tiles row by row.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as im:
+        image = ImageOps.exif_transpose(im)
+        image.thumbnail((preset.max_side, preset.max_side), Image.Resampling.LANCZOS)
+        if preset.format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        width, height = image.size
+        boxes = (
+            _tile_boxes(width, height, preset.tile_size, preset.tile_overlap)
+            if preset.tile_size
+            else [(0, 0, width, height)]
+        )
+        encoded = []
+        for box in boxes:
+            buffer = io.BytesIO()
+            image.crop(box).save(
+                buffer, preset.format, quality=preset.quality, optimize=True
+            )
+            encoded.append(buffer.getvalue())
+    return encoded
+
+
+class ImagePreprocessor:
+    """
+    Prepares images for vision models on a process pool.
+
+    Every image is resized, tiled and recompressed according to the model's
+    `LLMConfig.image_preset`. With a cache directory, results are stored
+    under a hash of the image bytes and the preset, so re-runs over the same
+    pages skip the work and the prepared files are streamed from disk.
+    Requires Pillow (`pip install ai-starter[images]`).
+    """
+
+    logger = setup_logging("llm_images")
+
+    def __init__(
+        self,
+        cache_dir: str | Path | None = None,
+        max_workers: int | None = None,
+        executor: Executor | None = None,
+    ) -> None:
+        """
+        Args:
+            cache_dir: Directory of the content-hashed cache, or None to keep
+                prepared images in memory only.
+            max_workers: Size of the process pool; defaults to the CPU count.
+            executor: Executor to run the work on instead of a new process
+                pool.
+
+        Raises:
+            ImportError: If Pillow is not installed.
+        """
+        if find_spec("PIL") is None:
+            raise ImportError(
+                "Image preprocessing requires Pillow: pip install 'ai-starter[images]'"
+            )
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._owns_executor = executor is None
+        self._executor = executor or ProcessPoolExecutor(max_workers=max_workers)
+
+    def __enter__(self) -> "ImagePreprocessor":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shuts down the process pool if this preprocessor created it."""
+        if self._owns_executor:
+            self._executor.shutdown()
+
+    def prepare(
+        self, images: Sequence[str | Path | bytes], preset: ImagePreset
+    ) -> list[list[ImageSource]]:
+        """
+        Prepares images in parallel.
+
+        Args:
+            images: Image file paths or image bytes.
+            preset: How to prepare the images.
+
+        Returns:
+            For every input image, in order, its prepared image or tiles.
+        """
+        keys = [self._cache_key(image, preset) for image in images]
+        results: dict[int, list[ImageSource]] = {}
+        futures = {}
+        for index, (image, key) in enumerate(zip(images, keys, strict=True)):
+            cached = self._load(key, preset)
+            if cached is not None:
+                results[index] = cached
+                continue
+            source = str(image) if isinstance(image, Path) else image
+            futures[index] = self._executor.submit(process_image, source, preset)
+
+        if futures:
+            self.logger.info(
+                "Preparing %d images, %d from cache", len(futures), len(results)
+            )
+        for index, future in futures.items():
+            results[index] = self._store(keys[index], preset, future.result())
+        return [results[index] for index in range(len(images))]
+
+    def prepare_for_model(
+        self, model_name: str, images: Sequence[str | Path | bytes]
+    ) -> list[list[ImageSource]]:
+        """
+        Prepares images with the preset of a model.
+
+        Images for models without a preset are passed through unchanged.
+
+        Args:
+            model_name: The name of the LLM model the images are for.
+            images: Image file paths or image bytes.
+
+        Returns:
+            For every input image, in order, its prepared image or tiles.
+
+        Raises:
+            ValueError: If the model is not in the registry.
+        """
+        preset = LLMRegistry.get_model_config(model_name).image_preset
+        if preset is None:
+            return [[ImageSource.coerce(image)] for image in images]
+        return self.prepare(images, preset)
+
+    def build_message(
+        self,
+        model_name: str,
+        text: str | None,
+        images: Sequence[str | Path | bytes],
+        detail: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        Builds a chat message of text and images prepared for a model.
+
+        Args:
+            model_name: The name of the LLM model the message is for.
+            text: Text preceding the images, if any.
+            images: Image file paths or image bytes.
+            detail: Optional image detail level, e.g. "low" or "high".
+
+        Returns:
+            The message dictionary, with tiles in reading order.
+        """
+        prepared = self.prepare_for_model(model_name, images)
+        return build_image_message(
+            text, [tile for tiles in prepared for tile in tiles], detail=detail
+        )
+
+    def _cache_key(self, image: str | Path | bytes, preset: ImagePreset) -> str:
+        digest = hashlib.sha256(preset.model_dump_json().encode())
+        if isinstance(image, bytes):
+            digest.update(image)
+        else:
+            with open(image, "rb") as f:
+                digest.update(hashlib.file_digest(f, "sha256").digest())
+        return digest.hexdigest()
+
+    def _entry_dir(self, key: str) -> Path | None:
+        return self.cache_dir / key[:2] / key if self.cache_dir else None
+
+    def _load(self, key: str, preset: ImagePreset) -> list[ImageSource] | None:
+        entry = self._entry_dir(key)
+        if entry is None or not entry.is_dir():
+            return None
+        return [
+            ImageSource(path=path, mime_type=_MIME_TYPES[preset.format])
+            for path in sorted(entry.iterdir())
+        ]
+
+    def _store(
+        self, key: str, preset: ImagePreset, encoded: list[bytes]
+    ) -> list[ImageSource]:
+        """
+        Writes prepared images to the cache, if any, and wraps them.
+
+        The entry is written to a temporary directory and renamed into place,
+        so readers never see a partial entry.
+        """
+        mime_type = _MIME_TYPES[preset.format]
+        entry = self._entry_dir(key)
+        if entry is None:
+            return [ImageSource(data=data, mime_type=mime_type) for data in encoded]
+
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".tmp-"))
+        extension = _EXTENSIONS[preset.format]
+        for index, data in enumerate(encoded):
+            (staging / f"{index:04d}.{extension}").write_bytes(data)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another worker stored the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+        loaded = self._load(key, preset)
+        return loaded if loaded is not None else []
@@ -0,0 +1,339 @@
+import bisect
+import math
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds, from sub-millisecond CPU work to slow completions
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing value per label set."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> None:
+        """
+        Args:
+            name: Metric name.
+            help_text: Description shown in the exposition output.
+            labels: Label names; values are passed to `inc` in the same order.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        """
+        Increments the counter.
+
+        Args:
+            *label_values: Values for the counter's labels.
+            amount: Non-negative amount to add.
+        """
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        """Get the current value for a label set."""
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def render(self) -> list[str]:
+        """Get the Prometheus text exposition lines of the counter."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observations per label set."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """
+        Args:
+            name: Metric name.
+            help_text: Description shown in the exposition output.
+            labels: Label names; values are passed to `observe` in order.
+            buckets: Sorted upper bounds of the buckets, excluding +Inf.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """
+        Records an observation.
+
+        Args:
+            value: The observed value.
+            *label_values: Values for the histogram's labels.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if label_values not in self._counts:
+                self._counts[label_values] = [0] * (len(self.buckets) + 1)
+                self._sums[label_values] = 0.0
+            self._counts[label_values][index] += 1
+            self._sums[label_values] += value
+
+    def count(self, *label_values: str) -> int:
+        """Get the number of observations for a label set."""
+        with self._lock:
+            return sum(self._counts.get(label_values, ()))
+
+    def render(self) -> list[str]:
+        """Get the Prometheus text exposition lines of the histogram."""
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            items = sorted((k, list(v), self._sums[k]) for k, v in self._counts.items())
+        names = (*self.labels, "le")
+        for label_values, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += count
+                labels = _format_labels(names, (*label_values, _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram] = []
+
+    def counter(
+        self, name: str, help_text: str, labels: tuple[str, ...] = ()
+    ) -> Counter:
+        """Create and register a counter."""
+        counter = Counter(name, help_text, labels)
+        self._metrics.append(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Create and register a histogram."""
+        histogram = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def render(self) -> str:
+        """
+        Renders every registered metric.
+
+        Returns:
+            The Prometheus text exposition format document.
+        """
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_to_file(self, path: str) -> None:
+        """
+        Atomically writes the rendered metrics to a file, e.g. for the
+        node-exporter textfile collector.
+
+        Args:
+            path: Path of the file to write.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".prom.tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def start_http_server(
+        self, port: int, host: str = "127.0.0.1"
+    ) -> ThreadingHTTPServer:
+        """
+        Serves the rendered metrics on `GET /metrics` from a daemon thread.
+
+        Args:
+            port: Port to listen on; 0 picks a free port.
+            host: Interface to bind to.
+
+        Returns:
+            The running server; call `shutdown()` to stop it.
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class LLMMetrics:
+    """Hot-path timing breakdown and usage counters of the LLM services."""
+
+    def __init__(self, registry: MetricsRegistry | None = None) -> None:
+        """
+        Args:
+            registry: Registry to create the metrics in. A new one is created
+                if not given.
+        """
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.payload_build_seconds = r.histogram(
+            "llm_payload_build_seconds",
+            "Time to build headers and payload.",
+            ("model",),
+        )
+        self.connect_seconds = r.histogram(
+            "llm_connect_seconds",
+            "Time to open new connections; 0 when a pooled one is reused.",
+            ("model",),
+        )
+        self.time_to_first_byte_seconds = r.histogram(
+            "llm_time_to_first_byte_seconds",
+            "Time from sending the request to receiving the response headers.",
+            ("model",),
+        )
+        self.download_seconds = r.histogram(
+            "llm_body_download_seconds",
+            "Time to download the response body.",
+            ("model",),
+        )
+        self.json_decode_seconds = r.histogram(
+            "llm_json_decode_seconds", "Time to decode the response JSON.", ("model",)
+        )
+        self.request_seconds = r.histogram(
+            "llm_request_seconds",
+            "End-to-end request latency including retries.",
+            ("model",),
+        )
+        self.requests = r.counter(
+            "llm_requests_total", "Requests sent, by outcome.", ("model", "outcome")
+        )
+        self.tokens = r.counter(
+            "llm_tokens_total",
+            "Tokens reported in usage, by type; cached is the part of the prompt "
+            "served from the provider's prompt cache.",
+            ("model", "type"),
+        )
+        self.cost = r.counter(
+            "llm_cost_usd_total", "Cost reported in usage.", ("model",)
+        )
+        self.retries = r.counter("llm_retries_total", "Retried attempts.", ("model",))
+        self.cache_hits = r.counter(
+            "llm_cache_hits_total", "Responses served from the cache.", ("model",)
+        )
+        self.semantic_cache_hits = r.counter(
+            "llm_semantic_cache_hits_total",
+            "Responses served from the semantic cache for a similar prompt.",
+            ("model",),
+        )
+        self.deadline_exceeded = r.counter(
+            "llm_deadline_exceeded_total",
+            "Calls dropped or cut short because their deadline ran out.",
+            ("model",),
+        )
+        self.circuit_rejections = r.counter(
+            "llm_circuit_rejections_total",
+            "Requests not sent to a model because its circuit was open.",
+            ("model",),
+        )
+
+    def prompt_cache_hit_rate(self, model_name: str) -> float | None:
+        """
+        Get the share of a model's prompt tokens served from the provider's
+        prompt cache.
+
+        Args:
+            model_name: The name of the LLM model.
+
+        Returns:
+            The hit rate between 0 and 1, or None if no prompt tokens were
+            recorded.
+        """
+        prompt_tokens = self.tokens.value(model_name, "prompt")
+        if not prompt_tokens:
+            return None
+        return self.tokens.value(model_name, "cached") / prompt_tokens
+
+    def render(self) -> str:
+        """Renders the metrics in Prometheus text format."""
+        return self.registry.render()
+
+
+# Process-wide metrics shared by every LLM service unless one is given
+llm_metrics = LLMMetrics()
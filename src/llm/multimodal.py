@@ -0,0 +1,254 @@
+import base64
+import hashlib
+import json
+import mimetypes
+import mmap
+import re
+import secrets
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+# Raw bytes encoded per chunk; a multiple of 3 so chunks need no base64 padding
+CHUNK_SIZE = 3 * 64 * 1024
+
+_MAGIC_NUMBERS = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def _sniff_mime_type(header: bytes) -> str:
+    for magic, mime_type in _MAGIC_NUMBERS:
+        if header.startswith(magic):
+            return mime_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class ImageSource:
+    """
+    An image sent as a base64 data URL without ever holding the encoded URL
+    in memory.
+
+    The raw bytes stay in the caller's buffer or on disk (read through a
+    memory map) and are base64-encoded chunk by chunk while the request body
+    is written to the socket.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        data: bytes | memoryview | None = None,
+        mime_type: str | None = None,
+    ) -> None:
+        """
+        Args:
+            path: Image file to read when the body is sent.
+            data: In-memory image bytes; used instead of `path`.
+            mime_type: MIME type of the image. Guessed from the file name or
+                the image header if not given.
+        """
+        if (path is None) == (data is None):
+            raise ValueError("Pass exactly one of path or data")
+        self.source: Path | memoryview = (
+            memoryview(data) if data is not None else Path(str(path))
+        )
+        self.mime_type = mime_type or self._guess_mime_type()
+        self._sha256: str | None = None
+
+    @classmethod
+    def coerce(cls, image: "ImageSource | str | Path | bytes") -> "ImageSource":
+        """
+        Wraps a path or bytes in an ImageSource, passing ImageSources through.
+
+        Args:
+            image: The image or where to read it from.
+
+        Returns:
+            The ImageSource.
+        """
+        if isinstance(image, ImageSource):
+            return image
+        if isinstance(image, bytes):
+            return cls(data=image)
+        return cls(path=image)
+
+    def _guess_mime_type(self) -> str:
+        if isinstance(self.source, Path):
+            guessed, _ = mimetypes.guess_type(self.source.name)
+            if guessed:
+                return guessed
+        with self._buffer() as buffer:
+            return _sniff_mime_type(bytes(buffer[:12]))
+
+    @property
+    def size(self) -> int:
+        """Size of the raw image in bytes."""
+        if isinstance(self.source, memoryview):
+            return self.source.nbytes
+        return self.source.stat().st_size
+
+    @property
+    def prefix(self) -> bytes:
+        """The data URL scheme and MIME type preceding the base64 payload."""
+        return f"data:{self.mime_type};base64,".encode()
+
+    def __len__(self) -> int:
+        """Length of the complete data URL in bytes."""
+        return len(self.prefix) + 4 * ((self.size + 2) // 3)
+
+    @contextmanager
+    def _buffer(self) -> Iterator[memoryview]:
+        if isinstance(self.source, memoryview):
+            yield self.source
+            return
+        with open(self.source, "rb") as f:
+            if self.size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def iter_data_url(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Yields the data URL in chunks.
+
+        Args:
+            chunk_size: Raw bytes encoded per chunk; rounded down to a
+                multiple of 3.
+
+        Yields:
+            The prefix, then the base64 payload piece by piece.
+        """
+        step = max(3, chunk_size - chunk_size % 3)
+        yield self.prefix
+        with self._buffer() as buffer:
+            for start in range(0, buffer.nbytes, step):
+                yield base64.b64encode(buffer[start : start + step])
+
+    def sha256(self) -> str:
+        """Get the hex SHA-256 digest of the raw image, hashed once."""
+        if self._sha256 is None:
+            digest = hashlib.sha256(self.mime_type.encode())
+            with self._buffer() as buffer:
+                for start in range(0, buffer.nbytes, CHUNK_SIZE):
+                    digest.update(buffer[start : start + CHUNK_SIZE])
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+
+def build_image_message(
+    text: str | None,
+    images: Iterable[ImageSource | str | Path | bytes],
+    role: str = "user",
+    detail: str | None = None,
+) -> dict[str, Any]:
+    """
+    Builds a chat message with a text part followed by one part per image.
+
+    The images stay unencoded in the message; a payload containing it is sent
+    with a StreamingJSONBody.
+
+    Args:
+        text: Text preceding the images, if any.
+        images: Images as ImageSources, file paths or raw bytes.
+        role: The message role.
+        detail: Optional image detail level, e.g. "low" or "high".
+
+    Returns:
+        The message dictionary.
+    """
+    content: list[dict[str, Any]] = []
+    if text:
+        content.append({"type": "text", "text": text})
+    for image in images:
+        image_url: dict[str, Any] = {"url": ImageSource.coerce(image)}
+        if detail:
+            image_url["detail"] = detail
+        content.append({"type": "image_url", "image_url": image_url})
+    return {"role": role, "content": content}
+
+
+def contains_images(value: Any) -> bool:
+    """
+    Checks whether a payload or message list contains ImageSources.
+
+    Args:
+        value: The payload, message list or any JSON-like value.
+
+    Returns:
+        True if an ImageSource appears anywhere in the value.
+    """
+    if isinstance(value, ImageSource):
+        return True
+    if isinstance(value, dict):
+        return any(contains_images(v) for v in value.values())
+    if isinstance(value, list | tuple):
+        return any(contains_images(v) for v in value)
+    return False
+
+
+class StreamingJSONBody:
+    """
+    Request body serialising a payload as JSON with its ImageSources encoded
+    on the fly.
+
+    Only the JSON around the images is held in memory. The body knows its
+    length up front so it is sent with `Content-Length` rather than chunked,
+    and it can be iterated any number of times, so retries resend it.
+    """
+
+    def __init__(self, payload: dict[str, Any], chunk_size: int = CHUNK_SIZE) -> None:
+        """
+        Args:
+            payload: The request payload, possibly containing ImageSources.
+            chunk_size: Raw image bytes encoded per chunk.
+        """
+        self.chunk_size = chunk_size
+        # A per-body nonce keeps user text from ever matching a placeholder
+        nonce = secrets.token_hex(8)
+        sources: list[ImageSource] = []
+
+        def placeholder(value: object) -> str:
+            if not isinstance(value, ImageSource):
+                raise TypeError(f"{type(value).__name__} is not JSON serializable")
+            sources.append(value)
+            return f"{nonce}:{len(sources) - 1}"
+
+        serialised = json.dumps(payload, default=placeholder)
+        pieces = re.split(f"{nonce}:(\\d+)", serialised)
+        self._segments: list[bytes | ImageSource] = []
+        for index, piece in enumerate(pieces):
+            if index % 2:
+                self._segments.append(sources[int(piece)])
+            elif piece:
+                self._segments.append(piece.encode())
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self._segments)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for segment in self._segments:
+            if isinstance(segment, ImageSource):
+                yield from segment.iter_data_url(self.chunk_size)
+            else:
+                yield segment
+
+    async def aiter_chunks(self) -> AsyncIterator[bytes]:
+        """
+        Yields the body for async HTTP clients; call once per send.
+
+        Yields:
+            The body piece by piece.
+        """
+        for chunk in self:
+            yield chunk
@@ -0,0 +1,90 @@
+from typing import Any
+
+from src.models.llm_config import LLMConfig
+
+# Message key marking the end of a stable prefix; never sent to the provider
+CACHEABLE_KEY = "cacheable"
+EPHEMERAL_CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def mark_cacheable(message: dict[str, Any]) -> dict[str, Any]:
+    """
+    Marks a message as the end of a prompt prefix reused across requests,
+    such as a long system prompt or shared instructions.
+
+    Args:
+        message: The chat message.
+
+    Returns:
+        A copy of the message carrying the marker.
+    """
+    return {**message, CACHEABLE_KEY: True}
+
+
+def _with_cache_control(message: dict[str, Any]) -> dict[str, Any]:
+    content = message.get("content")
+    if isinstance(content, str):
+        parts: list[dict[str, Any]] = [{"type": "text", "text": content}]
+    elif isinstance(content, list) and content:
+        parts = list(content)
+    else:
+        return message
+    parts[-1] = {**parts[-1], "cache_control": EPHEMERAL_CACHE_CONTROL}
+    return {**message, "content": parts}
+
+
+def apply_cache_hints(
+    messages: list[dict[str, Any]], model_config: LLMConfig
+) -> list[dict[str, Any]]:
+    """
+    Turns cacheable markers into the model's prompt-caching hints.
+
+    Providers with `prompt_caching="cache_control"` get an ephemeral
+    `cache_control` breakpoint on the last content part of the most recent
+    marked messages, up to `max_cache_breakpoints`; each breakpoint caches
+    everything before it. Other providers cache automatically or not at all,
+    so the markers are only stripped.
+
+    Args:
+        messages: The list of messages for the LLM.
+        model_config: The configuration for the LLM model.
+
+    Returns:
+        The messages to send; the input list itself if nothing is marked.
+    """
+    marked = [i for i, message in enumerate(messages) if message.get(CACHEABLE_KEY)]
+    if not marked:
+        return messages
+    breakpoints: set[int] = set()
+    if model_config.prompt_caching == "cache_control":
+        first = max(0, len(marked) - model_config.max_cache_breakpoints)
+        breakpoints = set(marked[first:])
+
+    prepared = []
+    for index, message in enumerate(messages):
+        if CACHEABLE_KEY in message:
+            message = {k: v for k, v in message.items() if k != CACHEABLE_KEY}
+        if index in breakpoints:
+            message = _with_cache_control(message)
+        prepared.append(message)
+    return prepared
+
+
+def cached_prompt_tokens(usage: dict[str, Any] | None) -> int | None:
+    """
+    Get the prompt tokens served from the provider's prompt cache.
+
+    Reads the OpenAI-style `prompt_tokens_details.cached_tokens` reported by
+    OpenRouter, falling back to Anthropic's `cache_read_input_tokens`.
+
+    Args:
+        usage: The usage block of the response, if any.
+
+    Returns:
+        The cached prompt tokens, or None if the usage does not report them.
+    """
+    if not usage:
+        return None
+    details = usage.get("prompt_tokens_details") or {}
+    cached = details.get("cached_tokens", usage.get("cache_read_input_tokens"))
+    return None if cached is None else int(cached)
@@ -0,0 +1,354 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+from typing import ClassVar
+
+from src.models.llm_config import LLMConfig
+
+# Status codes worth retrying: throttling and transient upstream failures
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at a fixed rate.
+
+    A bucket created with `capacity=None` never limits.
+    """
+
+    def __init__(self, capacity: float | None, refill_per_second: float) -> None:
+        """
+        Args:
+            capacity: Maximum number of tokens, or None for an unlimited bucket.
+            refill_per_second: Tokens added per second.
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity or 0.0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_take(self, amount: float) -> float:
+        """
+        Takes `amount` tokens if available.
+
+        Requests larger than the capacity are capped at the capacity, so they
+        wait for a full bucket instead of never fitting.
+
+        Args:
+            amount: The number of tokens to take.
+
+        Returns:
+            0 if the tokens were taken, otherwise the seconds to wait before
+            trying again.
+        """
+        if self.capacity is None:
+            return 0.0
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.refill_per_second
+
+    def give_back(self, amount: float) -> None:
+        """
+        Returns unused tokens, e.g. when a reservation overestimated usage.
+
+        Args:
+            amount: The number of tokens to return. Negative amounts take
+                tokens, possibly driving the bucket into debt.
+        """
+        if self.capacity is None:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity or 0.0,
+            self._tokens + (now - self._updated_at) * self.refill_per_second,
+        )
+        self._updated_at = now
+
+
+class RateLimiter:
+    """
+    Client-side limiter for one provider/API key.
+
+    Combines a requests-per-minute and a tokens-per-minute bucket with a
+    shared pause that is set when the provider throttles us, so every worker
+    using the key backs off together instead of retrying into a storm.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+    ) -> None:
+        """
+        Args:
+            requests_per_minute: Request budget, or None for no limit.
+            tokens_per_minute: Token budget, or None for no limit.
+        """
+        self.requests = TokenBucket(
+            requests_per_minute, (requests_per_minute or 0) / 60
+        )
+        self.tokens = TokenBucket(tokens_per_minute, (tokens_per_minute or 0) / 60)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: int) -> float:
+        """
+        Reserves one request and `tokens` tokens if the budget allows.
+
+        Args:
+            tokens: The estimated tokens the request will use.
+
+        Returns:
+            0 if the reservation was made, otherwise the seconds to wait before
+            trying again.
+        """
+        with self._lock:
+            paused_for = self._paused_until - time.monotonic()
+        if paused_for > 0:
+            return paused_for
+        wait = self.requests.try_take(1)
+        if wait > 0:
+            return wait
+        wait = self.tokens.try_take(tokens)
+        if wait > 0:
+            self.requests.give_back(1)
+        return wait
+
+    def acquire(self, tokens: int, timeout: float | None = None) -> bool:
+        """
+        Blocks until one request and `tokens` tokens are reserved.
+
+        Args:
+            tokens: The estimated tokens the request will use.
+            timeout: Seconds to wait at most, or None to wait as long as the
+                budget needs.
+
+        Returns:
+            True once reserved, or False without waiting further as soon as
+            the budget cannot allow the request within `timeout`.
+        """
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        while (wait := self.try_acquire(tokens)) > 0:
+            if give_up_at is not None and time.monotonic() + wait > give_up_at:
+                return False
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, tokens: int, timeout: float | None = None) -> bool:
+        """
+        Waits without blocking the event loop until one request and `tokens`
+        tokens are reserved.
+
+        Args:
+            tokens: The estimated tokens the request will use.
+            timeout: Seconds to wait at most, or None to wait as long as the
+                budget needs.
+
+        Returns:
+            True once reserved, or False without waiting further as soon as
+            the budget cannot allow the request within `timeout`.
+        """
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        while (wait := self.try_acquire(tokens)) > 0:
+            if give_up_at is not None and time.monotonic() + wait > give_up_at:
+                return False
+            await asyncio.sleep(wait)
+        return True
+
+    def release(self, tokens: int) -> None:
+        """
+        Returns a reservation that was never used, e.g. because the response
+        was served from the cache.
+
+        Args:
+            tokens: The tokens reserved along with the request.
+        """
+        self.requests.give_back(1)
+        self.tokens.give_back(tokens)
+
+    def settle(self, reserved_tokens: int, used_tokens: int | None) -> None:
+        """
+        Corrects a token reservation once actual usage is known.
+
+        Args:
+            reserved_tokens: The tokens reserved for the request.
+            used_tokens: The tokens the provider reported, or None if unknown.
+        """
+        if used_tokens is not None:
+            self.tokens.give_back(reserved_tokens - used_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stops every caller of this limiter from sending for `seconds`.
+
+        Args:
+            seconds: How long to pause.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """
+        Pauses the limiter when rate-limit response headers report an
+        exhausted budget.
+
+        Args:
+            headers: The response headers.
+        """
+        for suffix in ("", "-requests", "-tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining{suffix}")
+            reset = headers.get(f"x-ratelimit-reset{suffix}")
+            if remaining is not None and reset is not None and remaining == "0":
+                reset_in = parse_reset_header(reset)
+                if reset_in is not None:
+                    self.pause(reset_in)
+
+
+class RateLimiterRegistry:
+    """Process-wide rate limiters, one per provider and API key."""
+
+    _limiters: ClassVar[dict[tuple[str, str], RateLimiter]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def get_rate_limiter(cls, model_config: LLMConfig) -> RateLimiter:
+        """
+        Get the rate limiter shared by every model on the same provider and key.
+
+        The limiter is created from the first configuration seen for the key.
+
+        Args:
+            model_config: The configuration for the LLM model.
+
+        Returns:
+            The shared RateLimiter.
+        """
+        key = (model_config.provider, model_config.api_key_env)
+        with cls._lock:
+            if key not in cls._limiters:
+                cls._limiters[key] = RateLimiter(
+                    requests_per_minute=model_config.requests_per_minute,
+                    tokens_per_minute=model_config.tokens_per_minute,
+                )
+            return cls._limiters[key]
+
+    @classmethod
+    def clear(cls) -> None:
+        """Forget every limiter, e.g. after changing configured limits."""
+        with cls._lock:
+            cls._limiters.clear()
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for retryable failures."""
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        """
+        Args:
+            max_retries: Retries after the first attempt.
+            base_delay: Backoff ceiling in seconds for the first retry; it
+                doubles on every further retry.
+            max_delay: Upper bound for any single delay.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Get the delay before retrying, drawn uniformly up to the backoff
+        ceiling so concurrent workers spread out.
+
+        Args:
+            attempt: Zero-based number of the attempt that failed.
+
+        Returns:
+            The delay in seconds.
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2**attempt)
+        return random.uniform(0, ceiling)  # noqa: S311
+
+    def delay(self, attempt: int, headers: Mapping[str, str] | None = None) -> float:
+        """
+        Get the delay before retrying, preferring the server's `Retry-After`.
+
+        Args:
+            attempt: Zero-based number of the attempt that failed.
+            headers: The failed response's headers, if any.
+
+        Returns:
+            The delay in seconds.
+        """
+        retry_after = parse_retry_after(headers.get("retry-after")) if headers else None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self.backoff(attempt)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses a `Retry-After` header given in seconds or as an HTTP date.
+
+    Args:
+        value: The header value.
+
+    Returns:
+        The delay in seconds, or None if absent or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_reset_header(value: str) -> float | None:
+    """
+    Parses a rate-limit reset header into seconds from now.
+
+    Accepts epoch milliseconds (OpenRouter), epoch seconds, plain seconds and
+    durations such as `1s`, `6m0s` or `250ms` (OpenAI).
+
+    Args:
+        value: The header value.
+
+    Returns:
+        The seconds until the limit resets, or None if malformed.
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+        parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+        if not parts:
+            return None
+        return sum(float(amount) * units[unit] for amount, unit in parts)
+    if number > 1e12:
+        return max(0.0, number / 1000 - time.time())
+    if number > 1e9:
+        return max(0.0, number - time.time())
+    return number
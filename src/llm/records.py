@@ -0,0 +1,148 @@
+import re
+from collections.abc import Iterable, Iterator
+
+from pydantic import BaseModel, ValidationError
+
+from src.utils.logging import setup_logging
+
+# Characters that change the parser's state outside and inside strings
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_STRING = re.compile(r'["\\]')
+# An array of objects, or a bracket whose next character has not arrived
+_ARRAY_START = re.compile(r"\[\s*(?:\{|\Z)")
+
+
+class JSONRecordParser[T: BaseModel]:
+    """
+    Incremental parser of a JSON array of objects arriving in pieces.
+
+    Every object in the array is validated as a `T` as soon as its closing
+    brace arrives, so records can be written while the model is still
+    generating the rest. Anything before the first `[` that opens an object,
+    such as a code fence, a sentence with brackets of its own or an
+    enclosing `{"items":` key, is skipped, as is anything after the array
+    ends. Only the unfinished record is buffered.
+    """
+
+    logger = setup_logging("llm_records")
+
+    def __init__(self, model: type[T]) -> None:
+        """
+        Args:
+            model: The pydantic model each array element is validated as.
+        """
+        self.model = model
+        # Elements that were not valid JSON or failed validation
+        self.errors: list[str] = []
+        self.done = False
+        self._buffer = ""
+        self._pos = 0
+        # 0 before the array, 1 between elements, deeper inside an element
+        self._depth = 0
+        self._in_string = False
+        self._record_start: int | None = None
+
+    def feed(self, delta: str) -> list[T]:
+        """
+        Consumes the next piece of the response.
+
+        Args:
+            delta: The text received since the previous call.
+
+        Returns:
+            The records completed by this piece, in order.
+        """
+        if self.done:
+            return []
+        self._buffer += delta
+        records: list[T] = []
+        while not self.done and self._step(records):
+            pass
+        # Only the unfinished record, if any, is needed again
+        keep = self._pos if self._record_start is None else self._record_start
+        self._buffer, self._pos = self._buffer[keep:], self._pos - keep
+        if self._record_start is not None:
+            self._record_start = 0
+        return records
+
+    def _step(self, records: list[T]) -> bool:
+        """
+        Advances to the next character that changes the parser's state.
+
+        Returns:
+            False if the buffer is exhausted and more input is needed.
+        """
+        if self._depth == 0:
+            return self._find_array()
+        pattern = _STRING if self._in_string else _STRUCTURE
+        match = pattern.search(self._buffer, self._pos)
+        if match is None:
+            self._pos = len(self._buffer)
+            return False
+        char, index = match.group(), match.start()
+        if char == "\\":
+            # Skip the escaped character, or wait for it to arrive
+            self._pos = index + 2 if index + 1 < len(self._buffer) else index
+            return self._pos > index
+        self._pos = index + 1
+        if char == '"':
+            self._in_string = not self._in_string
+        elif char in "[{":
+            if self._depth == 1 and char == "{":
+                self._record_start = index
+            self._depth += 1
+        else:
+            self._depth -= 1
+            self.done = self._depth == 0
+            if self._depth == 1 and self._record_start is not None:
+                record = self._validate(self._buffer[self._record_start : index + 1])
+                if record is not None:
+                    records.append(record)
+                self._record_start = None
+        return True
+
+    def _find_array(self) -> bool:
+        """
+        Advances into the array of records, past any text before it.
+
+        Returns:
+            False if the buffer is exhausted and more input is needed.
+        """
+        start = _ARRAY_START.search(self._buffer, self._pos)
+        if start is None:
+            self._pos = len(self._buffer)
+            return False
+        if start.end() == len(self._buffer):
+            # Wait for the character after the bracket
+            self._pos = start.start()
+            return False
+        self._pos, self._depth = start.start() + 1, 1
+        return True
+
+    def _validate(self, text: str) -> T | None:
+        try:
+            return self.model.model_validate_json(text)
+        except ValidationError as e:
+            self.errors.append(text)
+            self.logger.warning(
+                "Skipping invalid %s record: %s", self.model.__name__, e
+            )
+            return None
+
+
+def iter_records[T: BaseModel](deltas: Iterable[str], model: type[T]) -> Iterator[T]:
+    """
+    Yields the records of a streamed JSON array as each one completes.
+
+    Args:
+        deltas: Pieces of the response text, e.g. an LLMStream.
+        model: The pydantic model each array element is validated as.
+
+    Yields:
+        Each valid record as soon as its closing brace arrives.
+    """
+    parser = JSONRecordParser(model)
+    # Text after the array is drained, not parsed, so a stream still ends
+    # normally and reports its usage
+    for delta in deltas:
+        yield from parser.feed(delta)
@@ -1,37 +1,105 @@
-from typing import ClassVar
+import json
+import os
+import threading
+from collections.abc import Callable, Iterator, Mapping, MutableMapping
+from typing import ClassVar, Literal
 
+from src.llm.stats import ModelStats, ModelStatsSnapshot, RequestSample
+from src.models.image_preset import ImagePreset
 from src.models.llm_config import LLMConfig
 
 
+class LazyModelConfigs(MutableMapping[str, LLMConfig]):
+    """
+    Model configurations built on first access.
+
+    Entries may be registered as factories, so importing the registry
+    validates no configs and a process only builds the ones it uses.
+    """
+
+    def __init__(
+        self, entries: Mapping[str, LLMConfig | Callable[[], LLMConfig]]
+    ) -> None:
+        """
+        Args:
+            entries: Model name to its configuration or a factory building it.
+        """
+        self._entries = dict(entries)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, model_name: str) -> LLMConfig:
+        entry = self._entries[model_name]
+        if isinstance(entry, LLMConfig):
+            return entry
+        with self._lock:
+            entry = self._entries[model_name]
+            if not isinstance(entry, LLMConfig):
+                entry = self._entries[model_name] = entry()
+        return entry
+
+    def __setitem__(self, model_name: str, config: LLMConfig) -> None:
+        self._entries[model_name] = config
+
+    def __delitem__(self, model_name: str) -> None:
+        del self._entries[model_name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class LLMRegistry:
     """Registry for LLM configurations."""
 
-    MODELS: ClassVar[dict[str, LLMConfig]] = {
-        "gemini-2.5-pro": LLMConfig(
-            name="google/gemini-2.5-pro-preview-03-25",
-            provider="google",
-        ),
-        # Best for image processing
-        "gpt-4.1": LLMConfig(
-            name="openai/gpt-4.1",
-            provider="openai",
-        ),
-        # Cheapest for image processing
-        "gpt-4.1-mini": LLMConfig(
-            name="openai/gpt-4.1-mini",
-            provider="openai",
-        ),
-        # Best value and fastest for large text processing
-        "gemini-flash-2.5": LLMConfig(
-            name="google/gemini-2.5-flash-preview",
-            provider="google",
-        ),
-        "gemini-flash-2.5-thinking": LLMConfig(
-            name="google/gemini-2.5-flash-preview:thinking",
-            provider="google",
-        ),
-        # Add more models here as needed
-    }
+    MODELS: ClassVar[MutableMapping[str, LLMConfig]] = LazyModelConfigs(
+        {
+            "gemini-2.5-pro": lambda: LLMConfig(
+                name="google/gemini-2.5-pro-preview-03-25",
+                provider="google",
+                context_window=1_048_576,
+                prompt_caching="cache_control",
+                max_cache_breakpoints=1,
+            ),
+            # Best for image processing
+            "gpt-4.1": lambda: LLMConfig(
+                name="openai/gpt-4.1",
+                provider="openai",
+                context_window=1_047_576,
+                prompt_caching="automatic",
+                # Tiles keep small print legible after the provider's downscaling
+                image_preset=ImagePreset(max_side=3072, quality=90, tile_size=1600),
+            ),
+            # Cheapest for image processing
+            "gpt-4.1-mini": lambda: LLMConfig(
+                name="openai/gpt-4.1-mini",
+                provider="openai",
+                context_window=1_047_576,
+                prompt_caching="automatic",
+                image_preset=ImagePreset(max_side=1536, quality=75),
+            ),
+            # Best value and fastest for large text processing
+            "gemini-flash-2.5": lambda: LLMConfig(
+                name="google/gemini-2.5-flash-preview",
+                provider="google",
+                context_window=1_048_576,
+                prompt_caching="cache_control",
+                max_cache_breakpoints=1,
+            ),
+            "gemini-flash-2.5-thinking": lambda: LLMConfig(
+                name="google/gemini-2.5-flash-preview:thinking",
+                provider="google",
+                context_window=1_048_576,
+                prompt_caching="cache_control",
+                max_cache_breakpoints=1,
+            ),
+            # Add more models here as needed
+        }
+    )
+
+    _stats: ClassVar[dict[str, ModelStats]] = {}
+    _stats_lock: ClassVar[threading.Lock] = threading.Lock()
 
     @classmethod
     def get_model_config(cls, model_name: str) -> LLMConfig:
@@ -61,3 +129,134 @@ class LLMRegistry:
             List of available model names
         """
         return list(cls.MODELS.keys())
+
+    @classmethod
+    def record_request(
+        cls,
+        model_name: str,
+        latency: float,
+        ok: bool,
+        usage: dict | None = None,
+    ) -> None:
+        """Record the outcome of a request in the model's rolling statistics.
+
+        Args:
+            model_name: Name of the model the request was sent to
+            latency: End-to-end latency in seconds
+            ok: Whether the request succeeded
+            usage: Usage block of the response, if any
+        """
+        cls._model_stats(model_name).record(latency, ok, usage)
+
+    @classmethod
+    def get_model_stats(cls, model_name: str) -> ModelStatsSnapshot:
+        """Get a summary of a model's recent performance.
+
+        Args:
+            model_name: Name of the model to get statistics for
+
+        Returns:
+            ModelStatsSnapshot of the model's rolling window
+        """
+        return cls._model_stats(model_name).snapshot()
+
+    @classmethod
+    def select_model(
+        cls,
+        objective: Literal["latency", "cost"] = "latency",
+        candidates: list[str] | None = None,
+        max_p95_latency: float | None = None,
+        max_cost_per_1k_tokens: float | None = None,
+        max_error_rate: float | None = None,
+        min_requests: int = 1,
+    ) -> str:
+        """Pick the fastest or cheapest model meeting the given constraints.
+
+        Only models with at least `min_requests` recorded requests and known
+        values for the constrained and optimised metrics are considered.
+
+        Args:
+            objective: Minimise p50 latency ("latency") or cost per 1k tokens
+                ("cost")
+            candidates: Model names to choose from (default: all models)
+            max_p95_latency: Upper bound on p95 latency in seconds
+            max_cost_per_1k_tokens: Upper bound on cost per 1k tokens
+            max_error_rate: Upper bound on the error rate between 0 and 1
+            min_requests: Requests needed before a model's stats are trusted
+
+        Returns:
+            Name of the selected model
+
+        Raises:
+            ValueError: If no model meets the constraints
+        """
+        best: tuple[float, str] | None = None
+        for model_name in candidates or cls.get_available_models():
+            stats = cls.get_model_stats(model_name)
+            if stats.requests < min_requests:
+                continue
+            if max_error_rate is not None and stats.error_rate > max_error_rate:
+                continue
+            if max_p95_latency is not None and (
+                stats.p95_latency is None or stats.p95_latency > max_p95_latency
+            ):
+                continue
+            if max_cost_per_1k_tokens is not None and (
+                stats.cost_per_1k_tokens is None
+                or stats.cost_per_1k_tokens > max_cost_per_1k_tokens
+            ):
+                continue
+            score = (
+                stats.p50_latency
+                if objective == "latency"
+                else stats.cost_per_1k_tokens
+            )
+            if score is not None and (best is None or score < best[0]):
+                best = (score, model_name)
+        if best is None:
+            raise ValueError(f"No model meets the constraints for {objective}.")
+        return best[1]
+
+    @classmethod
+    def save_stats(cls, path: str) -> None:
+        """Persist every model's rolling statistics to a JSON file.
+
+        Args:
+            path: Path of the JSON file to write
+        """
+        with cls._stats_lock:
+            stats = dict(cls._stats)
+        data = {name: model_stats.samples() for name, model_stats in stats.items()}
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load_stats(cls, path: str) -> None:
+        """Restore rolling statistics saved by `save_stats`.
+
+        Does nothing if the file does not exist.
+
+        Args:
+            path: Path of the JSON file to read
+        """
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            data = json.load(f)
+        for model_name, samples in data.items():
+            cls._model_stats(model_name).extend(
+                RequestSample(*sample) for sample in samples
+            )
+
+    @classmethod
+    def clear_stats(cls) -> None:
+        """Forget all recorded statistics."""
+        with cls._stats_lock:
+            cls._stats.clear()
+
+    @classmethod
+    def _model_stats(cls, model_name: str) -> ModelStats:
+        with cls._stats_lock:
+            if model_name not in cls._stats:
+                cls._stats[model_name] = ModelStats(model_name)
+            return cls._stats[model_name]
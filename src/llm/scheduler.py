@@ -0,0 +1,277 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import IntEnum
+from typing import Any, NamedTuple
+
+from src.llm.deadline import Deadline
+from src.llm.rate_limit import RateLimiter, RateLimiterRegistry
+from src.llm.registry import LLMRegistry
+from src.llm.service import LLMService
+from src.llm.tokens import estimate_tokens, fit_context_window
+from src.models.llm_config import LLMConfig
+from src.models.llm_response import LLMResponse
+from src.models.request_timeout import RequestTimeout
+from src.utils.logging import setup_logging
+
+
+class Priority(IntEnum):
+    """Scheduling class of a request; lower values are dispatched first."""
+
+    INTERACTIVE = 0
+    BULK = 1
+
+
+class _Job(NamedTuple):
+    model_name: str
+    messages: list[dict[str, Any]]
+    tokens: int
+    limiter: RateLimiter
+    future: Future[LLMResponse]
+    submitted_at: float
+    deadline: Deadline
+
+
+class RequestScheduler:
+    """
+    Priority queue in front of an LLMService that only dispatches requests
+    the provider's rate-limit budget can take right now.
+
+    Each request is estimated at its prompt tokens plus the model's
+    `max_tokens` and reserved from the shared RateLimiter before it is handed
+    to a worker, so workers never sit blocked on the limiter and throttled
+    providers are not hit at all. Interactive requests go before bulk ones,
+    but a bulk request that has waited `max_bulk_wait` seconds is promoted
+    ahead of them so bulk work cannot starve. When the head request of a
+    provider does not fit its budget, requests for other providers are still
+    dispatched; later requests for the same provider wait behind it, so small
+    requests cannot keep a large one from ever fitting. A request whose
+    deadline runs out while queued is failed without being sent, and one
+    whose future is cancelled while queued is dropped.
+    """
+
+    logger = setup_logging("llm_scheduler")
+
+    def __init__(
+        self,
+        llm_service: LLMService | None = None,
+        max_workers: int = 8,
+        max_bulk_wait: float = 30.0,
+    ) -> None:
+        """
+        Args:
+            llm_service: Service to send requests with. A new one is created
+                if not given.
+            max_workers: Maximum number of requests in flight at once.
+            max_bulk_wait: Seconds after which a queued bulk request is
+                dispatched ahead of interactive ones.
+        """
+        self.llm_service = llm_service or LLMService()
+        self.max_workers = max_workers
+        self.max_bulk_wait = max_bulk_wait
+        self._queues: dict[Priority, deque[_Job]] = {p: deque() for p in Priority}
+        self._in_flight = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="llm-scheduler"
+        )
+        self._dispatcher = threading.Thread(
+            target=self._run, name="llm-scheduler-dispatch", daemon=True
+        )
+        self._dispatcher.start()
+
+    def submit(
+        self,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        priority: Priority = Priority.BULK,
+        timeout: RequestTimeout | float | None = None,
+    ) -> Future[LLMResponse]:
+        """
+        Queues a request.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            messages: The list of messages for the LLM.
+            priority: The request's scheduling class.
+            timeout: Time limits of the request, or its total in seconds,
+                counted from now so time spent queued is included. Defaults
+                to the service's `timeout`.
+
+        Returns:
+            A future resolving to the LLM response, with `error` set if the
+            request failed.
+        """
+        future: Future[LLMResponse] = Future()
+        try:
+            model_config: LLMConfig = LLMRegistry.get_model_config(model_name)
+        except ValueError as e:
+            self.logger.error("Invalid model name: %s", e)
+            future.set_result(LLMResponse(model_name=model_name, error=str(e)))
+            return future
+
+        fitted, max_tokens = fit_context_window(messages, model_config)
+        job = _Job(
+            model_name=model_name,
+            messages=messages,
+            tokens=estimate_tokens(fitted) + max_tokens,
+            limiter=RateLimiterRegistry.get_rate_limiter(model_config),
+            future=future,
+            submitted_at=time.monotonic(),
+            deadline=Deadline.start(timeout, self.llm_service.timeout),
+        )
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot submit to a closed RequestScheduler")
+            self._queues[priority].append(job)
+            self._condition.notify()
+        return future
+
+    def send_llm_request(
+        self,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: RequestTimeout | float | None = None,
+    ) -> str | None:
+        """
+        Queues a request and waits for its answer.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            messages: The list of messages for the LLM.
+            priority: The request's scheduling class.
+            timeout: Time limits of the request, or its total in seconds.
+
+        Returns:
+            The content of the LLM's response, or None if an error occurred
+            or the deadline ran out.
+        """
+        return self.submit(model_name, messages, priority, timeout).result().content
+
+    def pending(self) -> int:
+        """Get the number of queued requests not yet dispatched."""
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stops accepting requests. Queued requests are still sent, unless
+        their futures are cancelled.
+
+        Args:
+            wait: Whether to block until every request has finished.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if wait:
+            self._dispatcher.join()
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "RequestScheduler":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _candidates(self) -> list[_Job]:
+        """
+        Get the queued jobs in dispatch order: aged bulk jobs, then
+        interactive jobs, then the remaining bulk jobs, each oldest first.
+        """
+        aged_before = time.monotonic() - self.max_bulk_wait
+        bulk = self._queues[Priority.BULK]
+        aged = [job for job in bulk if job.submitted_at <= aged_before]
+        fresh = [job for job in bulk if job.submitted_at > aged_before]
+        return [*aged, *self._queues[Priority.INTERACTIVE], *fresh]
+
+    def _dispatch_ready(self) -> float | None:
+        """
+        Dispatches every queued job that has a free worker and fits its
+        limiter's budget, and fails every queued job whose deadline ran out.
+        Must be called with the condition held.
+
+        Returns:
+            Seconds until a blocked job may fit or a queued deadline runs out,
+            or None if no job is waiting on either.
+        """
+        self._drop_expired()
+        blocked: set[int] = set()
+        retry_in: float | None = None
+        for job in self._candidates():
+            if self._in_flight >= self.max_workers:
+                break
+            if id(job.limiter) in blocked:
+                continue
+            wait = job.limiter.try_acquire(job.tokens)
+            if wait > 0:
+                blocked.add(id(job.limiter))
+                retry_in = wait if retry_in is None else min(retry_in, wait)
+                continue
+            self._remove(job)
+            if not job.future.set_running_or_notify_cancel():
+                job.limiter.release(job.tokens)
+                continue
+            self._in_flight += 1
+            self._executor.submit(self._execute, job)
+        for job in self._candidates():
+            remaining = job.deadline.remaining()
+            if remaining is not None:
+                retry_in = remaining if retry_in is None else min(retry_in, remaining)
+        return retry_in
+
+    def _drop_expired(self) -> None:
+        """
+        Removes the cancelled queued jobs and fails those whose deadline ran
+        out. Must be called with the condition held.
+        """
+        for job in self._candidates():
+            if job.future.cancelled():
+                self._remove(job)
+            elif job.deadline.expired() and job.future.set_running_or_notify_cancel():
+                self._remove(job)
+                self.logger.warning(
+                    "Dropping queued %s request past its deadline", job.model_name
+                )
+                self.llm_service.metrics.deadline_exceeded.inc(job.model_name)
+                job.future.set_result(
+                    LLMResponse(
+                        model_name=job.model_name,
+                        error=f"Deadline exceeded for {job.model_name}",
+                        deadline_exceeded=True,
+                    )
+                )
+
+    def _remove(self, job: _Job) -> None:
+        """Removes a job from its queue. Must be called with the condition held."""
+        for queue in self._queues.values():
+            if job in queue:
+                queue.remove(job)
+                break
+
+    def _run(self) -> None:
+        """Dispatcher loop; exits once closed and every queue is empty."""
+        with self._condition:
+            while True:
+                retry_in = self._dispatch_ready()
+                if self._closed and not any(self._queues.values()):
+                    return
+                self._condition.wait(timeout=retry_in)
+
+    def _execute(self, job: _Job) -> None:
+        """Sends a dispatched job and resolves its future."""
+        try:
+            llm_response = self.llm_service.send_reserved_request(
+                job.model_name, job.messages, job.tokens, job.deadline
+            )
+        except Exception as e:
+            self.logger.error("Unexpected error in scheduled LLM request: %s", e)
+            llm_response = LLMResponse(model_name=job.model_name, error=str(e))
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify()
+        job.future.set_result(llm_response)
@@ -0,0 +1,461 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Protocol
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "The semantic cache requires NumPy: pip install 'ai-starter[semantic]'"
+    ) from e
+
+from src.models.llm_response import LLMResponse
+from src.utils.logging import setup_logging
+
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+# Initial number of slots of a scope's index; it doubles as needed
+_SCOPE_CAPACITY = 16
+
+
+def _message_text(message: dict[str, Any]) -> str | None:
+    """Get a message's text, or None if it has non-text content."""
+    content = message.get("content")
+    if isinstance(content, list):
+        if any(not isinstance(p, dict) or p.get("type") != "text" for p in content):
+            return None
+        return " ".join(str(part.get("text", "")) for part in content)
+    return content if isinstance(content, str) else None
+
+
+def split_prompt(
+    model_name: str, messages: list[dict[str, Any]]
+) -> tuple[str, str] | None:
+    """
+    Splits a prompt into the scope it is matched within and the text it is
+    embedded by.
+
+    Only the last message is embedded. Everything else has to be identical
+    for two prompts to be compared at all: the model, every earlier message
+    such as a long shared system prompt, the last message's role, and the
+    numbers in the last message, which embeddings barely tell apart.
+
+    Args:
+        model_name: The name of the LLM model.
+        messages: The list of messages for the LLM.
+
+    Returns:
+        A hash of the scope and the last message's text, or None if the
+        prompt is empty or a message has non-text content such as an image.
+    """
+    if not messages:
+        return None
+    text = _message_text(messages[-1])
+    if text is None:
+        return None
+    context = []
+    for message in messages[:-1]:
+        content = _message_text(message)
+        if content is None:
+            return None
+        context.append([message.get("role", ""), content])
+    role = messages[-1].get("role", "")
+    scope = json.dumps([model_name, context, role, _NUMBER.findall(text)])
+    return hashlib.sha256(scope.encode()).hexdigest(), text
+
+
+class Embedder(Protocol):
+    """Turns texts into fixed-size vectors whose cosine reflects meaning."""
+
+    dimensions: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embeds a batch of texts.
+
+        Args:
+            texts: The texts to embed.
+
+        Returns:
+            A `(len(texts), dimensions)` array; rows need not be normalised.
+        """
+        ...
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedder based on signed feature hashing.
+
+    Each text is reduced to its lower-cased words and the character trigrams
+    of those words, and every feature adds ±1 to a hashed dimension. Prompts
+    that differ only in case, punctuation or whitespace embed identically,
+    and small rewordings stay close, but so do prompts that differ in a
+    word that changes their meaning. It needs no model or network and is
+    meant for tests; use a real embedding model in production.
+    """
+
+    def __init__(self, dimensions: int = 256) -> None:
+        """
+        Args:
+            dimensions: Size of the vectors.
+        """
+        self.dimensions = dimensions
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embeds a batch of texts.
+
+        Args:
+            texts: The texts to embed.
+
+        Returns:
+            A `(len(texts), dimensions)` float32 array.
+        """
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            joined = " ".join(words)
+            trigrams = [joined[i : i + 3] for i in range(len(joined) - 2)]
+            for feature in [*words, *trigrams]:
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value >> 63 else -1.0
+                vectors[row, value % self.dimensions] += sign
+        return vectors
+
+
+class _Scope:
+    """Slots of the entries sharing a scope, in no particular order."""
+
+    __slots__ = ("size", "slots")
+
+    def __init__(self) -> None:
+        self.slots = np.empty(_SCOPE_CAPACITY, dtype=np.int64)
+        self.size = 0
+
+
+class SemanticCache:
+    """
+    Cache of successful LLM responses looked up by prompt similarity.
+
+    A prompt is only compared with past prompts of the same scope: the same
+    model, identical earlier messages and the same numbers in the last
+    message (see `split_prompt`). Within its scope, the last message's unit
+    embedding is matched against the others', and the lookup is answered
+    from the cache when the cosine similarity reaches the model's threshold.
+    Vectors are kept in one contiguous float32 array and every scope keeps
+    the indices of its rows, so a lookup only scores its own scope's
+    entries, with one matrix product per scope in a batch. With a `path`,
+    the vectors live in a memory-mapped `.npy` file and the responses in
+    SQLite next to it, so the cache survives restarts and is paged in
+    lazily. The cache holds at most `max_entries` entries; beyond that the
+    least recently used is replaced. Prompts with non-text content are never
+    cached. Requires NumPy (`pip install ai-starter[semantic]`).
+    """
+
+    logger = setup_logging("llm_semantic_cache")
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        path: str | None = None,
+        max_entries: int = 100_000,
+        threshold: float = 0.95,
+        thresholds: dict[str, float] | None = None,
+        ttl: float | None = 7 * 24 * 3600,
+    ) -> None:
+        """
+        Args:
+            embedder: Backend turning prompts into vectors, typically a
+                sentence embedding model; HashingEmbedder is for tests.
+            path: Directory for the memory-mapped vectors and the responses.
+                Everything is kept in memory if not given.
+            max_entries: Maximum number of cached prompts.
+            threshold: Cosine similarity a past prompt needs to be reused.
+            thresholds: Per-model overrides of `threshold`, keyed by model
+                name.
+            ttl: Seconds after which an entry expires, or None to keep entries
+                until they are evicted.
+        """
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.thresholds = thresholds or {}
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        dimensions = self.embedder.dimensions
+        self._created = np.zeros(max_entries, dtype=np.float64)
+        self._accessed = np.zeros(max_entries, dtype=np.float64)
+        self._responses: list[LLMResponse | None] = [None] * max_entries
+        # Scope of each slot's entry, and the entry's index in that scope
+        self._slot_scopes: list[str | None] = [None] * max_entries
+        self._positions = np.zeros(max_entries, dtype=np.int64)
+        self._scopes: dict[str, _Scope] = {}
+        # Slots below this index have been used at least once
+        self._count = 0
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if path is None:
+            self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+            return
+        os.makedirs(path, exist_ok=True)
+        self._vectors = self._open_vectors(path)
+        self._db = sqlite3.connect(
+            os.path.join(path, "entries.sqlite"), check_same_thread=False
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "slot INTEGER PRIMARY KEY, scope TEXT NOT NULL, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._load()
+
+    def threshold_for(self, model_name: str) -> float:
+        """Get the similarity a past prompt needs to answer for a model."""
+        return self.thresholds.get(model_name, self.threshold)
+
+    def lookup(
+        self, requests: Sequence[tuple[str, list[dict[str, Any]]]]
+    ) -> list[LLMResponse | None]:
+        """
+        Looks up a batch of prompts with one embedding call and one matrix
+        product per scope.
+
+        Args:
+            requests: `(model_name, messages)` pairs.
+
+        Returns:
+            The cached response of the most similar past prompt for each
+            request, or None where nothing is similar enough.
+        """
+        results: list[LLMResponse | None] = [None] * len(requests)
+        texts: list[str] = []
+        # Positions in `requests` of the prompts to embed, by scope
+        groups: dict[str, list[int]] = {}
+        # Row in `texts` of each prompt to embed, by position
+        rows: dict[int, int] = {}
+        for index, (model_name, messages) in enumerate(requests):
+            split = split_prompt(model_name, messages)
+            if split is not None:
+                groups.setdefault(split[0], []).append(index)
+                rows[index] = len(texts)
+                texts.append(split[1])
+        if not texts:
+            with self._lock:
+                self.misses += len(requests)
+            return results
+        queries = self._embed(texts)
+        now = time.time()
+        with self._lock:
+            used = []
+            for scope, indices in groups.items():
+                for index, slot, score in self._best_matches(
+                    scope, indices, queries[[rows[i] for i in indices]]
+                ):
+                    if self._usable(slot, score, requests[index][0], now):
+                        results[index] = self._responses[slot]
+                        self._accessed[slot] = now
+                        used.append(slot)
+            self._touch(used, now)
+            hits = sum(result is not None for result in results)
+            self.hits += hits
+            self.misses += len(requests) - hits
+        return results
+
+    def get(
+        self, model_name: str, messages: list[dict[str, Any]]
+    ) -> LLMResponse | None:
+        """
+        Looks up one prompt.
+
+        Args:
+            model_name: The name of the LLM model.
+            messages: The list of messages for the LLM.
+
+        Returns:
+            The cached response of the most similar past prompt, or None.
+        """
+        return self.lookup([(model_name, messages)])[0]
+
+    def set(
+        self, model_name: str, messages: list[dict[str, Any]], response: LLMResponse
+    ) -> None:
+        """
+        Caches a response under its prompt's embedding.
+
+        Args:
+            model_name: The name of the LLM model.
+            messages: The list of messages for the LLM.
+            response: The response to cache.
+        """
+        split = split_prompt(model_name, messages)
+        if split is None:
+            return
+        scope, text = split
+        vector = self._embed([text])[0]
+        now = time.time()
+        with self._lock:
+            slot = self._free_slot()
+            self._vectors[slot] = vector
+            self._index(slot, scope)
+            self._created[slot] = self._accessed[slot] = now
+            self._responses[slot] = response
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                    (slot, scope, response.model_dump_json(), now, now),
+                )
+                self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(scope.size for scope in self._scopes.values())
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        with self._lock:
+            self._responses = [None] * self.max_entries
+            self._slot_scopes = [None] * self.max_entries
+            self._scopes.clear()
+            self._count = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+
+    def close(self) -> None:
+        """Flushes the memory-mapped vectors and closes the on-disk store."""
+        with self._lock:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        """Embeds texts as unit-length float32 rows."""
+        vectors = np.asarray(self.embedder.embed(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        normalised: np.ndarray = vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+        return normalised
+
+    def _best_matches(
+        self, scope: str, indices: list[int], queries: np.ndarray
+    ) -> list[tuple[int, int, float]]:
+        """
+        Finds the most similar entry of a scope for each of its queries.
+
+        Args:
+            scope: The queries' scope.
+            indices: The queries' positions in the batch.
+            queries: The queries' unit vectors, one row per index.
+
+        Returns:
+            `(index, slot, score)` of the best entry per query; nothing if
+            the scope has no entries.
+        """
+        entries = self._scopes.get(scope)
+        if entries is None:
+            return []
+        slots = entries.slots[: entries.size]
+        scores = self._vectors[slots] @ queries.T
+        best = scores.argmax(axis=0)
+        return [
+            (index, int(slots[row]), float(scores[row, column]))
+            for column, (index, row) in enumerate(zip(indices, best, strict=True))
+        ]
+
+    def _index(self, slot: int, scope: str) -> None:
+        """Adds a slot to a scope, taking it out of its previous one."""
+        self._unindex(slot)
+        entries = self._scopes.setdefault(scope, _Scope())
+        if entries.size == len(entries.slots):
+            entries.slots = np.resize(entries.slots, 2 * entries.size)
+        entries.slots[entries.size] = slot
+        self._positions[slot] = entries.size
+        entries.size += 1
+        self._slot_scopes[slot] = scope
+
+    def _unindex(self, slot: int) -> None:
+        """Removes a slot from its scope, if it is in one."""
+        scope = self._slot_scopes[slot]
+        if scope is None:
+            return
+        self._slot_scopes[slot] = None
+        entries = self._scopes[scope]
+        entries.size -= 1
+        if entries.size == 0:
+            del self._scopes[scope]
+            return
+        # Move the scope's last slot into the freed position
+        last = int(entries.slots[entries.size])
+        position = int(self._positions[slot])
+        entries.slots[position] = last
+        self._positions[last] = position
+
+    def _usable(self, slot: int, score: float, model_name: str, now: float) -> bool:
+        """Whether a best match is similar enough and not expired."""
+        if score < self.threshold_for(model_name):
+            return False
+        return self.ttl is None or bool(now - self._created[slot] <= self.ttl)
+
+    def _touch(self, slots: list[int], now: float) -> None:
+        """Records on disk that entries were just used."""
+        if self._db is not None and slots:
+            self._db.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE slot = ?",
+                [(now, int(slot)) for slot in slots],
+            )
+            self._db.commit()
+
+    def _free_slot(self) -> int:
+        """Get a never-used slot, or else the least recently used one."""
+        if self._count < self.max_entries:
+            self._count += 1
+            return self._count - 1
+        return int(self._accessed.argmin())
+
+    def _open_vectors(self, path: str) -> np.ndarray:
+        """
+        Maps the vector file in a cache directory, starting over if it was
+        written with another size or embedder.
+        """
+        vectors_path = os.path.join(path, "vectors.npy")
+        shape = (self.max_entries, self.embedder.dimensions)
+        if os.path.exists(vectors_path):
+            vectors = np.lib.format.open_memmap(vectors_path, mode="r+")
+            if vectors.shape == shape and vectors.dtype == np.float32:
+                return vectors
+            self.logger.warning(
+                "Discarding semantic cache in %s of another shape", path
+            )
+            del vectors
+            entries_path = os.path.join(path, "entries.sqlite")
+            if os.path.exists(entries_path):
+                os.unlink(entries_path)
+        return np.lib.format.open_memmap(
+            vectors_path, mode="w+", dtype=np.float32, shape=shape
+        )
+
+    def _load(self) -> None:
+        """Restores the entries' metadata from disk."""
+        if self._db is None:
+            return
+        rows = self._db.execute(
+            "SELECT slot, scope, value, created_at, accessed_at FROM entries"
+        ).fetchall()
+        for slot, scope, value, created_at, accessed_at in rows:
+            if slot >= self.max_entries:
+                continue
+            self._index(slot, scope)
+            self._created[slot] = created_at
+            self._accessed[slot] = accessed_at
+            self._responses[slot] = LLMResponse.model_validate_json(value)
+            self._count = max(self._count, slot + 1)
@@ -1,15 +1,467 @@
-import json
+import atexit
 import os
-from typing import Any
+import threading
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any
 
 import requests
 
+from src.llm.cache import ResponseCache, payload_cache_key
+from src.llm.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerPolicy,
+    CircuitSnapshot,
+    is_provider_failure,
+)
+from src.llm.deadline import Deadline
+from src.llm.hedging import HedgePolicy
+from src.llm.metrics import LLMMetrics, llm_metrics
+from src.llm.multimodal import StreamingJSONBody, contains_images
+from src.llm.prompt_cache import apply_cache_hints, cached_prompt_tokens
+from src.llm.rate_limit import (
+    RETRYABLE_STATUS_CODES,
+    RateLimiter,
+    RateLimiterRegistry,
+    RetryPolicy,
+)
 from src.llm.registry import LLMRegistry
+from src.llm.singleflight import SingleFlight
+from src.llm.streaming import LLMStream
+from src.llm.tokens import estimate_tokens, fit_context_window
+from src.llm.transport import HTTPTransport
 from src.models.llm_config import LLMConfig
+from src.models.llm_response import LLMResponse
+from src.models.request_timeout import RequestTimeout
 from src.utils.logging import setup_logging
 
+if TYPE_CHECKING:
+    from src.llm.semantic_cache import SemanticCache
 
-class LLMService:
+
+class BaseLLMService:
+    """
+    Transport-independent request building and response parsing shared by the
+    sync and async LLM services.
+    """
+
+    # Per-request lines are sampled so an outage cannot flood the log
+    logger = setup_logging("llm_service", sample_rate=20)
+    retry_policy: RetryPolicy
+    hedge_policy: HedgePolicy | None
+    circuit_breaker: CircuitBreakerPolicy | None
+    timeout: RequestTimeout
+    metrics: LLMMetrics
+
+    def _get_llm_headers(self, api_key_env: str) -> dict[str, str]:
+        """
+        Prepares the headers for the LLM API request.
+
+        Args:
+            api_key_env: The environment variable name containing the API key.
+
+        Returns:
+            A dictionary containing the request headers.
+        """
+        return {
+            "Authorization": f"Bearer {os.getenv(api_key_env)}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://github.com/tardigrde/pyhton-ai-starter",
+            "X-Title": "AI Starter",
+        }
+
+    def _prepare_llm_payload(
+        self,
+        model_config: LLMConfig,
+        messages: list[dict[str, Any]],
+        stream: bool = False,
+    ) -> dict[str, Any]:
+        """
+        Prepares the payload for the LLM API request.
+
+        Messages marked with `mark_cacheable` get the provider's prompt-caching
+        hints. For models with a known context window, oversized conversations
+        are trimmed and `max_tokens` is sized to the room the prompt leaves.
+
+        Args:
+            model_config: The configuration for the LLM model.
+            messages: The list of messages for the LLM.
+            stream: Whether to request a server-sent-events stream.
+
+        Returns:
+            A dictionary containing the request payload.
+        """
+        fitted, max_tokens = fit_context_window(messages, model_config)
+        if fitted is not messages:
+            self.logger.warning(
+                "Truncated %d messages to %d to fit the context window of %s",
+                len(messages),
+                len(fitted),
+                model_config.name,
+            )
+        return {
+            "model": model_config.name,
+            "messages": apply_cache_hints(fitted, model_config),
+            "max_tokens": max_tokens,
+            "temperature": model_config.temperature,
+            "stream": stream,
+            "transforms": ["middle-out"],
+            "route": "fallback",
+            "handle_rate_limits": True,
+            "usage": {"include": True},
+        }
+
+    def _extract_content_from_response(self, response_json: dict) -> str | None:
+        """
+        Extracts the content string from the LLM API response.
+
+        Args:
+            response_json: The JSON response from the LLM API.
+
+        Returns:
+            The extracted content string, or None if not found.
+        """
+        content = None
+        if response_json.get("choices"):
+            if "message" in response_json["choices"][0]:
+                content = response_json["choices"][0]["message"].get("content")
+        elif "content" in response_json:
+            content = response_json["content"]
+        elif "text" in response_json:
+            content = response_json["text"]
+        return content
+
+    def _encode_body(self, payload: dict[str, Any]) -> StreamingJSONBody | None:
+        """
+        Get a streamed request body for payloads carrying images, so their
+        base64 data URLs are never materialised in memory.
+
+        Args:
+            payload: The request payload.
+
+        Returns:
+            The streamed body, or None if the payload is sent as plain JSON.
+        """
+        if not contains_images(payload["messages"]):
+            return None
+        return StreamingJSONBody(payload)
+
+    def _reserve_tokens(self, payload: dict[str, Any]) -> int:
+        """
+        Estimates the tokens to reserve from the rate limiter for a request.
+
+        Args:
+            payload: The request payload.
+
+        Returns:
+            The estimated prompt tokens plus the completion token limit.
+        """
+        return estimate_tokens(payload["messages"]) + int(payload["max_tokens"])
+
+    def _retry_delay(
+        self,
+        model_name: str,
+        attempt: int,
+        status_code: int,
+        headers: Any,
+        limiter: RateLimiter,
+    ) -> float | None:
+        """
+        Decides whether a response should be retried and for how long to wait.
+
+        A 429 also pauses the shared limiter for the delay, so every worker on
+        the same key backs off instead of only this one.
+
+        Args:
+            model_name: The name of the LLM model.
+            attempt: Zero-based number of the attempt that produced the
+                response.
+            status_code: The HTTP status code of the response.
+            headers: The response headers.
+            limiter: The rate limiter the request was sent under.
+
+        Returns:
+            The delay in seconds, or None if the response is final.
+        """
+        if status_code not in RETRYABLE_STATUS_CODES:
+            return None
+        if attempt >= self.retry_policy.max_retries:
+            return None
+        delay = self.retry_policy.delay(attempt, headers)
+        if status_code == 429:
+            limiter.pause(delay)
+        self.metrics.retries.inc(model_name)
+        self.logger.warning(
+            "LLM API returned %s, retrying in %.2fs (attempt %d/%d)",
+            status_code,
+            delay,
+            attempt + 1,
+            self.retry_policy.max_retries,
+        )
+        return delay
+
+    def _persist_stats(self, path: str) -> None:
+        """
+        Restores the registry statistics from `path` and saves them back at
+        interpreter exit, so model selection starts warm in the next process.
+
+        Args:
+            path: Path of the JSON statistics file.
+        """
+        LLMRegistry.load_stats(path)
+        atexit.register(LLMRegistry.save_stats, path)
+
+    def _retry_after_error(
+        self, model_name: str, attempt: int, error: Exception
+    ) -> float | None:
+        """
+        Decides whether a connection-level failure should be retried and for
+        how long to wait.
+
+        Args:
+            model_name: The name of the LLM model.
+            attempt: Zero-based number of the attempt that failed.
+            error: The connection or timeout error.
+
+        Returns:
+            The delay in seconds, or None if retries are exhausted.
+        """
+        if attempt >= self.retry_policy.max_retries:
+            return None
+        delay = self.retry_policy.backoff(attempt)
+        self.metrics.retries.inc(model_name)
+        self.logger.warning("%s; retrying in %.2fs", error, delay)
+        return delay
+
+    def _decode_json(self, model_name: str, response: Any) -> dict[str, Any]:
+        """
+        Decodes a response body, timing it in the metrics.
+
+        Args:
+            model_name: The name of the LLM model.
+            response: The HTTP response.
+
+        Returns:
+            The decoded JSON body.
+        """
+        started_at = time.perf_counter()
+        response_json: dict[str, Any] = response.json()
+        self.metrics.json_decode_seconds.observe(
+            time.perf_counter() - started_at, model_name
+        )
+        return response_json
+
+    def _record_outcome(
+        self, model_name: str, llm_response: LLMResponse, seconds: float
+    ) -> None:
+        """
+        Feeds the outcome of a sent request to the metrics, the registry
+        statistics and, if successful, the hedging policy's latency window.
+
+        Args:
+            model_name: The name of the LLM model.
+            llm_response: The response the request produced.
+            seconds: The end-to-end latency including retries.
+        """
+        LLMRegistry.record_request(
+            model_name, seconds, llm_response.ok, llm_response.usage
+        )
+        self.metrics.request_seconds.observe(seconds, model_name)
+        self.metrics.requests.inc(model_name, "ok" if llm_response.ok else "error")
+        usage = llm_response.usage or {}
+        for token_type in ("prompt_tokens", "completion_tokens"):
+            if usage.get(token_type):
+                self.metrics.tokens.inc(
+                    model_name,
+                    token_type.removesuffix("_tokens"),
+                    amount=usage[token_type],
+                )
+        cached_tokens = cached_prompt_tokens(usage)
+        if cached_tokens:
+            self.metrics.tokens.inc(model_name, "cached", amount=cached_tokens)
+        try:
+            self.metrics.cost.inc(model_name, amount=float(usage.get("cost") or 0))
+        except (TypeError, ValueError):
+            pass
+        if self.hedge_policy is not None and llm_response.ok:
+            self.hedge_policy.tracker.record(model_name, seconds)
+
+    def circuit_state(self, model_name: str) -> CircuitSnapshot | None:
+        """
+        Get the state of a model's circuit breaker.
+
+        Args:
+            model_name: The name of the LLM model.
+
+        Returns:
+            The breaker's CircuitSnapshot, or None if the service has no
+            circuit breaker or the model is unknown.
+        """
+        if self.circuit_breaker is None:
+            return None
+        try:
+            endpoint = LLMRegistry.get_model_config(model_name).endpoint
+        except ValueError:
+            return None
+        return self.circuit_breaker.breaker(model_name, endpoint).snapshot()
+
+    def _admit(
+        self, model_name: str, model_config: LLMConfig
+    ) -> tuple[CircuitBreaker | None, bool]:
+        """
+        Asks the model's circuit breaker whether a request may be sent.
+
+        Args:
+            model_name: The name of the LLM model.
+            model_config: The configuration for the LLM model.
+
+        Returns:
+            The breaker to record the outcome in, or None without a circuit
+            breaker, and whether the request may be sent.
+        """
+        if self.circuit_breaker is None:
+            return None, True
+        breaker = self.circuit_breaker.breaker(model_name, model_config.endpoint)
+        return breaker, breaker.allow()
+
+    def _fallback(self, model_name: str) -> tuple[str, LLMConfig] | None:
+        """
+        Get the model to divert to while a model's circuit is open.
+
+        Args:
+            model_name: The name of the LLM model whose circuit is open.
+
+        Returns:
+            The fallback's name and configuration, or None if it has none.
+        """
+        if self.circuit_breaker is None:
+            return None
+        fallback_name = self.circuit_breaker.fallbacks.get(model_name)
+        if fallback_name is None:
+            return None
+        try:
+            return fallback_name, LLMRegistry.get_model_config(fallback_name)
+        except ValueError as e:
+            self.logger.error("Invalid fallback model name: %s", e)
+            return None
+
+    def _circuit_open_response(self, model_name: str) -> LLMResponse:
+        """Get the error response of a request rejected by an open circuit."""
+        self.metrics.circuit_rejections.inc(model_name)
+        self.logger.warning("Circuit open for %s; failing fast", model_name)
+        return LLMResponse(
+            model_name=model_name, error=f"Circuit open for {model_name}"
+        )
+
+    def _record_circuit(
+        self,
+        breaker: CircuitBreaker,
+        llm_response: LLMResponse,
+        sent: bool,
+        seconds: float,
+    ) -> None:
+        """
+        Records the outcome of an admitted request in its circuit breaker.
+
+        Args:
+            breaker: The breaker that admitted the request.
+            llm_response: The response the request produced.
+            sent: Whether any attempt reached the provider. If none did, for
+                example because the deadline ran out waiting for the rate
+                limiter, the admission is given back instead.
+            seconds: The end-to-end latency including retries.
+        """
+        if not sent:
+            breaker.release()
+        elif not llm_response.deadline_exceeded:
+            breaker.record(is_provider_failure(llm_response), seconds)
+        elif seconds > self.timeout.read:
+            # The provider took longer than any read is allowed to
+            breaker.record(True, seconds)
+        elif breaker.slow_call_seconds and seconds > breaker.slow_call_seconds:
+            breaker.record(False, seconds)
+        else:
+            # Only the caller's own tight deadline cut the call short; that
+            # says nothing about the provider
+            breaker.release()
+
+    def _deadline_exceeded_response(self, model_name: str) -> LLMResponse:
+        """Get the error response of a call whose deadline ran out."""
+        self.metrics.deadline_exceeded.inc(model_name)
+        self.logger.warning("Deadline exceeded for %s", model_name)
+        return LLMResponse(
+            model_name=model_name,
+            error=f"Deadline exceeded for {model_name}",
+            deadline_exceeded=True,
+        )
+
+    def _used_tokens(self, usage: dict[str, Any] | None) -> int | None:
+        """
+        Get the total tokens a request used from its usage block.
+
+        Args:
+            usage: The usage block of the response, if any.
+
+        Returns:
+            The total tokens, or None if the usage block does not report them.
+        """
+        if not usage:
+            return None
+        if usage.get("total_tokens") is not None:
+            return int(usage["total_tokens"])
+        if usage.get("prompt_tokens") is None:
+            return None
+        return int(usage["prompt_tokens"]) + int(usage.get("completion_tokens") or 0)
+
+    def _build_llm_response(self, model_name: str, response_json: dict) -> LLMResponse:
+        """
+        Logs usage information and extracts the content from a decoded LLM
+        API response.
+
+        Args:
+            model_name: The name of the LLM model that produced the response.
+            response_json: The JSON response from the LLM API.
+
+        Returns:
+            The LLM response, with `error` set if it has no content.
+        """
+        usage = response_json.get("usage")
+        if usage is not None:
+            usage_cost = None
+            try:
+                usage_cost = float(usage.get("cost"))
+            except Exception:
+                self.logger.error("Could not extract usage cost from response")
+            self.logger.info(
+                "LLM API call usage: prompt_tokens=%s, cached_tokens=%s, "
+                "completion_tokens=%s, cost=$%s",
+                usage.get("prompt_tokens"),
+                cached_prompt_tokens(usage),
+                usage.get("completion_tokens"),
+                usage_cost,
+            )
+
+        content = self._extract_content_from_response(response_json)
+
+        if not content:
+            response_keys = list(response_json.keys())
+            self.logger.error(
+                "Could not extract content from LLM response. Response keys: %s",
+                response_keys,
+            )
+            if "choices" in response_json:
+                # The choices are only rendered if the record is written
+                self.logger.error("Choices structure: %s", response_json["choices"])
+            return LLMResponse(
+                model_name=model_name,
+                usage=usage,
+                error="No content in LLM response",
+            )
+        return LLMResponse(model_name=model_name, content=content, usage=usage)
+
+
+class LLMService(BaseLLMService):
     """
     A service class for interacting with Language Model (LLM) APIs.
 
@@ -17,10 +469,79 @@ class LLMService:
     and managing configuration.
     """
 
-    logger = setup_logging("llm_service")
+    def __init__(
+        self,
+        transport: HTTPTransport | None = None,
+        cache: ResponseCache | None = None,
+        coalesce_requests: bool = True,
+        retry_policy: RetryPolicy | None = None,
+        hedge_policy: HedgePolicy | None = None,
+        stats_path: str | None = None,
+        metrics: LLMMetrics | None = None,
+        circuit_breaker: CircuitBreakerPolicy | None = None,
+        timeout: RequestTimeout | None = None,
+        semantic_cache: "SemanticCache | None" = None,
+        hedge_workers: int = 64,
+    ) -> None:
+        """
+        Args:
+            transport: HTTP transport to send requests with. A new pooled
+                transport is created if not given; pass one in to share
+                connections between services.
+            cache: Optional cache of successful responses. Models with
+                `cache_responses=False` always bypass it.
+            coalesce_requests: Whether callers sending a payload identical to
+                one already in flight wait for its result instead of sending
+                their own request.
+            retry_policy: Backoff policy for throttled, transient and
+                connection failures. Defaults to `RetryPolicy()`.
+            hedge_policy: Optional policy sending slow requests to a backup
+                model as well, keeping the first successful answer.
+            stats_path: Optional JSON file the registry's model statistics are
+                loaded from now and saved to at exit.
+            metrics: Metrics to record timings and usage in. Defaults to the
+                process-wide `llm_metrics`.
+            circuit_breaker: Optional policy failing fast, or diverting to a
+                fallback model, while a model's endpoint keeps failing.
+            timeout: Default time limits of a call. Defaults to
+                `RequestTimeout()`, which has no total limit.
+            semantic_cache: Optional cache answering prompts similar to ones
+                already answered, consulted after an exact `cache` miss.
+                Models with `cache_responses=False` always bypass it.
+            hedge_workers: Threads sending hedged requests. A hedged call
+                keeps up to two busy, so this should be at least twice the
+                number of callers sending to hedged models at once.
+        """
+        self.transport = transport or HTTPTransport()
+        self.metrics = metrics or llm_metrics
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.hedge_policy = hedge_policy
+        self.circuit_breaker = circuit_breaker
+        self.timeout = timeout or RequestTimeout()
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=hedge_workers, thread_name_prefix="llm-hedge"
+        )
+        if stats_path:
+            self._persist_stats(stats_path)
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        self._in_flight: SingleFlight[LLMResponse] | None = (
+            SingleFlight() if coalesce_requests else None
+        )
+
+    def warm_up(self) -> None:
+        """
+        Opens connections to every endpoint in the registry ahead of the first
+        request.
+        """
+        endpoints = [config.endpoint for config in LLMRegistry.MODELS.values()]
+        self.transport.warm_up(endpoints)
 
     def send_llm_request(
-        self, model_name: str, messages: list[dict[str, Any]]
+        self,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        timeout: RequestTimeout | float | None = None,
     ) -> str | None:
         """
         Sends a request to the LLM via OpenRouter.
@@ -28,125 +549,727 @@ class LLMService:
         Args:
             model_name: The name of the LLM model to use.
             messages: The list of messages for the LLM.
+            timeout: Time limits of this call, or its total in seconds.
+                Defaults to the service's `timeout`.
+
+        Returns:
+            The content of the LLM's response, or None if an error occurred
+            or the deadline ran out.
+        """
+        deadline = Deadline.start(timeout, self.timeout)
+        return self._send(model_name, messages, deadline).content
+
+    def stream_llm_request(
+        self,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        timeout: RequestTimeout | float | None = None,
+    ) -> LLMStream | None:
+        """
+        Sends a streaming request to the LLM via OpenRouter.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            messages: The list of messages for the LLM.
+            timeout: Time limits of this call, or its total in seconds.
+                Defaults to the service's `timeout`. The total bounds how
+                long the stream takes to start and every wait for a delta.
 
         Returns:
-            The content of the LLM's response, or None if an error occurred.
+            An LLMStream yielding content deltas as they arrive, or None if the
+            request could not be started. Its `usage`, `time_to_first_token`
+            and `tokens_per_second` are set once the stream is consumed.
         """
         try:
             model_config: LLMConfig = LLMRegistry.get_model_config(model_name)
         except ValueError as e:
-            self.logger.error(f"Invalid model name: {e}")
+            self.logger.error("Invalid model name: %s", e)
             return None
 
+        deadline = Deadline.start(timeout, self.timeout)
         headers = self._get_llm_headers(model_config.api_key_env)
-        payload = self._prepare_llm_payload(model_config, messages)
+        payload = self._prepare_llm_payload(model_config, messages, stream=True)
+        limiter = RateLimiterRegistry.get_rate_limiter(model_config)
+        reserved = self._reserve_tokens(payload)
+        if not limiter.acquire(reserved, deadline.remaining()):
+            self._deadline_exceeded_response(model_name)
+            return None
 
+        response = None
         try:
             self.logger.info(
-                f"API request with {model_name} to {model_config.endpoint}"
+                "Streaming API request with %s to %s", model_name, model_config.endpoint
             )
-            response = requests.post(
+            started_at = time.perf_counter()
+            response = self.transport.post(
                 model_config.endpoint,
                 headers=headers,
-                json=payload,
-                timeout=60,
+                **self._body_kwargs(payload),
+                timeout=deadline.limits(),
+                stream=True,
             )
+            limiter.update_from_headers(response.headers)
             response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self.logger.error("Error sending LLM request: %s", e)
+            if response is not None:
+                response.close()
+            limiter.settle(reserved, 0)
+            return None
 
-            response_json = response.json()
+        def finish(stream: LLMStream) -> None:
+            limiter.settle(reserved, self._used_tokens(stream.usage))
+            self._record_outcome(
+                model_name,
+                LLMResponse(
+                    model_name=model_name,
+                    content=stream.content,
+                    usage=stream.usage,
+                    error=stream.error,
+                ),
+                time.perf_counter() - started_at,
+            )
 
-            # Log usage information if available
-            if "usage" in response_json:
-                usage = response_json["usage"]
-                try:
-                    usage_cost = float(usage.get("cost"))
-                except Exception:
-                    self.logger.error("Could not extract usage cost from response: ")
-                self.logger.info(
-                    f"LLM API call usage: prompt_tokens={usage.get('prompt_tokens')}, "
-                    f"completion_tokens={usage.get('completion_tokens')}, "
-                    f"cost=${usage_cost}"
-                )
+        return LLMStream(model_name, response, started_at, on_close=finish)
 
-            content = self._extract_content_from_response(response_json)
+    def send_llm_requests(
+        self,
+        batch: Sequence[tuple[str, list[dict[str, Any]]]],
+        max_workers: int = 8,
+        timeout: RequestTimeout | float | None = None,
+    ) -> list[LLMResponse]:
+        """
+        Sends a batch of requests on a bounded thread pool.
 
-            if not content:
-                response_keys = list(response_json.keys())
-                self.logger.error(
-                    "Could not extract content from LLM response."
-                    f"Response keys: {response_keys}"
+        A failing request does not abort the batch; its result carries the
+        error instead.
+
+        Args:
+            batch: `(model_name, messages)` jobs to send.
+            max_workers: Maximum number of requests in flight at once.
+            timeout: Time limits of each request, or a total in seconds.
+                The total covers the whole batch: jobs still queued when it
+                runs out fail with a deadline error without being sent.
+
+        Returns:
+            One LLMResponse per job, in the same order as `batch`.
+        """
+        if not batch:
+            return []
+        deadline = Deadline.start(timeout, self.timeout)
+        similar = self._semantic_lookup(batch)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batch))) as executor:
+            return list(
+                executor.map(
+                    lambda job, hit: (
+                        hit
+                        or self._send(job[0], job[1], deadline, check_semantic=False)
+                    ),
+                    batch,
+                    similar,
                 )
-                if "choices" in response_json:
-                    choices = json.dumps(response_json["choices"], indent=2)
-                    self.logger.error(f"Choices structure: {choices}")
-                return None
-            return content
+            )
 
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error sending LLM request: {e}")
-            return None
-        except Exception as e:
-            self.logger.error(f"Unexpected error during LLM request: {e}")
-            return None
+    def send_reserved_request(
+        self,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        reserved_tokens: int,
+        deadline: Deadline | None = None,
+    ) -> LLMResponse:
+        """
+        Sends a request whose rate-limit budget the caller already reserved.
 
-    def _get_llm_headers(self, api_key_env: str) -> dict[str, str]:
+        The first attempt skips the limiter; retries reserve as usual. If no
+        request is sent, because the answer came from the cache or from an
+        identical request in flight, the reservation is released.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            messages: The list of messages for the LLM.
+            reserved_tokens: The tokens reserved from the model's rate limiter
+                together with one request.
+            deadline: The call's deadline, started when it was queued.
+                Defaults to one started now from the service's `timeout`.
+
+        Returns:
+            The LLM response, with `error` set if the request failed.
         """
-        Prepares the headers for the LLM API request.
+        deadline = deadline or Deadline(self.timeout)
+        return self._send(model_name, messages, deadline, reserved_tokens)
+
+    def _send(
+        self,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        deadline: Deadline,
+        reserved_tokens: int | None = None,
+        check_semantic: bool = True,
+    ) -> LLMResponse:
+        """
+        Sends a request to the LLM and wraps the outcome, never raising.
 
         Args:
-            api_key_env: The environment variable name containing the API key.
+            model_name: The name of the LLM model to use.
+            messages: The list of messages for the LLM.
+            deadline: The call's deadline.
+            reserved_tokens: Tokens the caller already reserved from the rate
+                limiter for the first attempt, if any.
+            check_semantic: Whether to consult the semantic cache; False if
+                the caller already did.
 
         Returns:
-            A dictionary containing the request headers.
+            The LLM response, with `error` set if the request failed.
         """
-        return {
-            "Authorization": f"Bearer {os.getenv(api_key_env)}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://github.com/tardigrde/pyhton-ai-starter",
-            "X-Title": "AI Starter",
-        }
+        try:
+            model_config: LLMConfig = LLMRegistry.get_model_config(model_name)
+        except ValueError as e:
+            self.logger.error("Invalid model name: %s", e)
+            return LLMResponse(model_name=model_name, error=str(e))
 
-    def _prepare_llm_payload(
-        self, model_config: LLMConfig, messages: list[dict[str, Any]]
-    ) -> dict[str, Any]:
+        build_started_at = time.perf_counter()
+        headers = self._get_llm_headers(model_config.api_key_env)
+        payload = self._prepare_llm_payload(model_config, messages)
+        self.metrics.payload_build_seconds.observe(
+            time.perf_counter() - build_started_at, model_name
+        )
+
+        use_cache = model_config.cache_responses and (
+            self.cache is not None or self.semantic_cache is not None
+        )
+        if self._in_flight is None and not use_cache:
+            return self._request(
+                model_name, model_config, headers, payload, deadline, reserved_tokens
+            )
+
+        key = payload_cache_key(payload)
+        if use_cache:
+            cached = self._cached(model_name, key, messages, check_semantic)
+            if cached is not None:
+                self._release_reservation(model_config, reserved_tokens)
+                return cached
+
+        def post() -> LLMResponse:
+            llm_response = self._request(
+                model_name, model_config, headers, payload, deadline, reserved_tokens
+            )
+            if use_cache and llm_response.ok:
+                self._store(model_name, key, messages, llm_response)
+            return llm_response
+
+        if self._in_flight is None:
+            return post()
+        return self._coalesce(
+            self._in_flight,
+            model_name,
+            model_config,
+            key,
+            post,
+            deadline,
+            reserved_tokens,
+        )
+
+    def _coalesce(
+        self,
+        in_flight: SingleFlight[LLMResponse],
+        model_name: str,
+        model_config: LLMConfig,
+        key: str,
+        post: Callable[[], LLMResponse],
+        deadline: Deadline,
+        reserved_tokens: int | None,
+    ) -> LLMResponse:
         """
-        Prepares the payload for the LLM API request.
+        Sends a request unless an identical one is in flight, then shares it.
+
+        A caller sharing another's request waits no longer than its own
+        deadline, and sends its own request if the shared one was cut short
+        by a deadline it still has time left past.
 
         Args:
+            in_flight: The requests in flight.
+            model_name: The name of the LLM model to use.
             model_config: The configuration for the LLM model.
+            key: The request's cache key, identifying identical requests.
+            post: Sends the request.
+            deadline: The call's deadline.
+            reserved_tokens: Tokens the caller already reserved from the rate
+                limiter for the first attempt, if any.
+
+        Returns:
+            The LLM response, with `error` set if the request failed.
+        """
+        try:
+            llm_response, shared = in_flight.do(key, post, deadline.remaining())
+        except TimeoutError:
+            self._release_reservation(model_config, reserved_tokens)
+            return self._deadline_exceeded_response(model_name)
+        if not shared:
+            return llm_response
+        if llm_response.deadline_exceeded and not deadline.expired():
+            return post()
+        self.logger.info("Coalesced duplicate in-flight request for %s", model_name)
+        self._release_reservation(model_config, reserved_tokens)
+        return llm_response
+
+    def _cached(
+        self,
+        model_name: str,
+        key: str,
+        messages: list[dict[str, Any]],
+        check_semantic: bool,
+    ) -> LLMResponse | None:
+        """
+        Looks a request up in the exact cache, then in the semantic cache.
+
+        Args:
+            model_name: The name of the LLM model.
+            key: The request's exact cache key.
             messages: The list of messages for the LLM.
+            check_semantic: Whether to consult the semantic cache.
 
         Returns:
-            A dictionary containing the request payload.
+            A copy of the cached response marked as cached, or None on a miss.
         """
-        return {
-            "model": model_config.name,
-            "messages": messages,
-            "max_tokens": model_config.max_tokens,
-            "temperature": model_config.temperature,
-            "stream": False,
-            "transforms": ["middle-out"],
-            "route": "fallback",
-            "handle_rate_limits": True,
-            "usage": {"include": True},
-        }
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            self.logger.info("Cache hit for %s", model_name)
+            self.metrics.cache_hits.inc(model_name)
+            return cached.model_copy(update={"cached": True})
+        if check_semantic and self.semantic_cache is not None:
+            similar = self.semantic_cache.get(model_name, messages)
+            if similar is not None:
+                self.logger.info("Semantic cache hit for %s", model_name)
+                self.metrics.semantic_cache_hits.inc(model_name)
+                return similar.model_copy(update={"cached": True})
+        return None
 
-    def _extract_content_from_response(self, response_json: dict) -> str | None:
+    def _store(
+        self,
+        model_name: str,
+        key: str,
+        messages: list[dict[str, Any]],
+        llm_response: LLMResponse,
+    ) -> None:
         """
-        Extracts the content string from the LLM API response.
+        Caches a successful response in the exact and semantic caches.
 
         Args:
-            response_json: The JSON response from the LLM API.
+            model_name: The name of the LLM model the request was sent to.
+            key: The request's exact cache key.
+            messages: The list of messages for the LLM.
+            llm_response: The response to cache.
+        """
+        if self.cache is not None:
+            self.cache.set(key, llm_response)
+        if self.semantic_cache is not None:
+            self.semantic_cache.set(model_name, messages, llm_response)
+
+    def _semantic_lookup(
+        self, batch: Sequence[tuple[str, list[dict[str, Any]]]]
+    ) -> list[LLMResponse | None]:
+        """
+        Looks a batch up in the semantic cache with one vectorised query.
+
+        Args:
+            batch: `(model_name, messages)` jobs to look up.
 
         Returns:
-            The extracted content string, or None if not found.
+            A copy of the cached response marked as cached for each job
+            answered from the semantic cache, and None for the others.
         """
-        content = None
-        if response_json.get("choices"):
-            if "message" in response_json["choices"][0]:
-                content = response_json["choices"][0]["message"].get("content")
-        elif "content" in response_json:
-            content = response_json["content"]
-        elif "text" in response_json:
-            content = response_json["text"]
-        return content
+        if self.semantic_cache is None:
+            return [None] * len(batch)
+        cacheable = []
+        for index, (model_name, _) in enumerate(batch):
+            try:
+                if LLMRegistry.get_model_config(model_name).cache_responses:
+                    cacheable.append(index)
+            except ValueError:
+                continue
+        found = self.semantic_cache.lookup([batch[i] for i in cacheable])
+        results: list[LLMResponse | None] = [None] * len(batch)
+        for index, similar in zip(cacheable, found, strict=True):
+            if similar is not None:
+                model_name = batch[index][0]
+                self.metrics.semantic_cache_hits.inc(model_name)
+                results[index] = similar.model_copy(update={"cached": True})
+        return results
+
+    def _release_reservation(
+        self, model_config: LLMConfig, reserved_tokens: int | None
+    ) -> None:
+        """
+        Returns a caller's reservation that no request was sent for.
+
+        Args:
+            model_config: The configuration for the LLM model.
+            reserved_tokens: The reserved tokens, or None if nothing was
+                reserved.
+        """
+        if reserved_tokens is not None:
+            RateLimiterRegistry.get_rate_limiter(model_config).release(reserved_tokens)
+
+    def _request(
+        self,
+        model_name: str,
+        model_config: LLMConfig,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        deadline: Deadline,
+        reserved_tokens: int | None = None,
+    ) -> LLMResponse:
+        """
+        Sends a prepared request, hedging it if the model has a backup.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            model_config: The configuration for the LLM model.
+            headers: The request headers.
+            payload: The request payload.
+            deadline: The call's deadline.
+            reserved_tokens: Tokens already reserved for the first attempt.
+
+        Returns:
+            The LLM response, with `error` set if the request failed.
+        """
+        policy = self.hedge_policy
+        if policy is None or model_name not in policy.backups:
+            return self._post(
+                model_name, model_config, headers, payload, deadline, reserved_tokens
+            )
+        return self._send_hedged(
+            policy,
+            model_name,
+            model_config,
+            headers,
+            payload,
+            deadline,
+            reserved_tokens,
+        )
+
+    def _send_hedged(
+        self,
+        policy: HedgePolicy,
+        model_name: str,
+        model_config: LLMConfig,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        deadline: Deadline,
+        reserved_tokens: int | None = None,
+    ) -> LLMResponse:
+        """
+        Sends a request to the primary model and, if it is slower than its
+        hedge delay or fails, the same messages to the backup model.
+
+        The first successful answer is returned. A loser still queued is
+        cancelled; one already on the wire finishes in the background and its
+        answer is discarded. The hedge delay counts from when the primary
+        starts, so time queued for a hedging thread never fires a backup.
+        Both requests share the call's deadline, and the call returns when it
+        runs out even if neither has answered.
+
+        Args:
+            policy: The hedging policy to apply.
+            model_name: The name of the primary model.
+            model_config: The configuration for the primary model.
+            headers: The request headers for the primary model.
+            payload: The request payload for the primary model.
+            deadline: The call's deadline.
+            reserved_tokens: Tokens already reserved for the primary's first
+                attempt.
+
+        Returns:
+            The winning LLM response, or the primary's failure if both failed.
+        """
+        backup_name = policy.backups[model_name]
+        started = threading.Event()
+
+        def post_primary() -> LLMResponse:
+            started.set()
+            return self._post(
+                model_name, model_config, headers, payload, deadline, reserved_tokens
+            )
+
+        primary = self._hedge_executor.submit(post_primary)
+        if not started.wait(deadline.remaining()) and primary.cancel():
+            self._release_reservation(model_config, reserved_tokens)
+            policy.record_outcome(model_name, hedged=False, backup_won=None)
+            return self._deadline_exceeded_response(model_name)
+        hedge_delay = policy.hedge_delay(model_name)
+        remaining = deadline.remaining()
+        if remaining is not None:
+            hedge_delay = min(hedge_delay, remaining)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done and primary.result().ok:
+            policy.record_outcome(model_name, hedged=False, backup_won=False)
+            return primary.result()
+
+        try:
+            backup_config = LLMRegistry.get_model_config(backup_name)
+        except ValueError as e:
+            self.logger.error("Invalid backup model name: %s", e)
+            llm_response = primary.result()
+            policy.record_outcome(
+                model_name, hedged=False, backup_won=False if llm_response.ok else None
+            )
+            return llm_response
+
+        self.logger.info("Hedging %s request with %s", model_name, backup_name)
+        backup = self._hedge_executor.submit(
+            self._post,
+            backup_name,
+            backup_config,
+            self._get_llm_headers(backup_config.api_key_env),
+            self._prepare_llm_payload(backup_config, payload["messages"]),
+            deadline,
+        )
+        return self._race(policy, model_name, primary, backup, deadline)
+
+    def _race(
+        self,
+        policy: HedgePolicy,
+        model_name: str,
+        primary: Future[LLMResponse],
+        backup: Future[LLMResponse],
+        deadline: Deadline,
+    ) -> LLMResponse:
+        """
+        Waits for the first successful answer of a hedged pair.
+
+        Args:
+            policy: The hedging policy to record the outcome in.
+            model_name: The name of the primary model.
+            primary: The primary model's request.
+            backup: The backup model's request.
+            deadline: The call's deadline.
+
+        Returns:
+            The winning LLM response, or the primary's failure if both failed.
+        """
+        pending: set[Future[LLMResponse]] = {primary, backup}
+        while pending:
+            done, pending = wait(
+                pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                for loser in pending:
+                    loser.cancel()
+                policy.record_outcome(model_name, hedged=True, backup_won=None)
+                return self._deadline_exceeded_response(model_name)
+            for future in done:
+                if future.result().ok:
+                    for loser in pending:
+                        loser.cancel()
+                    policy.record_outcome(
+                        model_name, hedged=True, backup_won=future is backup
+                    )
+                    return future.result()
+        policy.record_outcome(model_name, hedged=True, backup_won=None)
+        return primary.result()
+
+    def _body_kwargs(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """
+        Get the `transport.post` keyword arguments carrying the payload.
+
+        Args:
+            payload: The request payload.
+
+        Returns:
+            `json` for plain payloads, or `data` with a streamed body for
+            payloads carrying images.
+        """
+        body = self._encode_body(payload)
+        return {"json": payload} if body is None else {"data": body}
+
+    def _observe_transfer(
+        self, model_name: str, response: requests.Response, post_seconds: float
+    ) -> None:
+        """
+        Splits the time spent in `transport.post` into connect, time to first
+        byte and body download.
+
+        Args:
+            model_name: The name of the LLM model.
+            response: The HTTP response; its `elapsed` covers everything up
+                to the parsed headers, including connecting.
+            post_seconds: Total time spent in `transport.post`.
+        """
+        connect = self.transport.last_connect_seconds
+        headers_at = response.elapsed.total_seconds()
+        self.metrics.connect_seconds.observe(connect, model_name)
+        self.metrics.time_to_first_byte_seconds.observe(
+            max(0.0, headers_at - connect), model_name
+        )
+        self.metrics.download_seconds.observe(
+            max(0.0, post_seconds - headers_at), model_name
+        )
+
+    def _post(
+        self,
+        model_name: str,
+        model_config: LLMConfig,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        deadline: Deadline,
+        reserved_tokens: int | None = None,
+        divert: bool = True,
+    ) -> LLMResponse:
+        """
+        Posts a prepared payload and records the outcome in the model's
+        statistics and circuit breaker.
+
+        Nothing is sent once the deadline has run out. While the model's
+        circuit is open the request goes to the fallback model if `divert` is
+        set and one is configured, and otherwise fails fast.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            model_config: The configuration for the LLM model.
+            headers: The request headers.
+            payload: The request payload.
+            deadline: The call's deadline.
+            reserved_tokens: Tokens already reserved for the first attempt.
+            divert: Whether an open circuit sends the request to the fallback.
+
+        Returns:
+            The LLM response, with `error` set if the request failed.
+        """
+        if deadline.expired():
+            self._release_reservation(model_config, reserved_tokens)
+            return self._deadline_exceeded_response(model_name)
+        breaker, allowed = self._admit(model_name, model_config)
+        if not allowed:
+            self._release_reservation(model_config, reserved_tokens)
+            fallback = self._fallback(model_name) if divert else None
+            if fallback is None:
+                return self._circuit_open_response(model_name)
+            fallback_name, fallback_config = fallback
+            self.logger.warning(
+                "Circuit open for %s; diverting to %s", model_name, fallback_name
+            )
+            return self._post(
+                fallback_name,
+                fallback_config,
+                self._get_llm_headers(fallback_config.api_key_env),
+                self._prepare_llm_payload(fallback_config, payload["messages"]),
+                deadline,
+                divert=False,
+            )
+        started_at = time.perf_counter()
+        llm_response, sent = self._post_with_retries(
+            model_name, model_config, headers, payload, deadline, reserved_tokens
+        )
+        seconds = time.perf_counter() - started_at
+        self._record_outcome(model_name, llm_response, seconds)
+        if breaker is not None:
+            self._record_circuit(breaker, llm_response, sent, seconds)
+        return llm_response
+
+    def _post_with_retries(
+        self,
+        model_name: str,
+        model_config: LLMConfig,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        deadline: Deadline,
+        reserved_tokens: int | None = None,
+    ) -> tuple[LLMResponse, bool]:
+        """
+        Posts a prepared payload to the model endpoint, never raising.
+
+        Every attempt first reserves budget from the provider's shared rate
+        limiter, unless the caller reserved it for the first attempt.
+        Retryable status codes and connection failures are retried with
+        jittered exponential backoff, honouring `Retry-After`. Each attempt's
+        connect and read timeouts are capped by the time left, and a retry
+        whose backoff or rate-limit wait would outlast the deadline is not
+        made.
+
+        Args:
+            model_name: The name of the LLM model to use.
+            model_config: The configuration for the LLM model.
+            headers: The request headers.
+            payload: The request payload.
+            deadline: The call's deadline.
+            reserved_tokens: Tokens already reserved for the first attempt.
+
+        Returns:
+            The LLM response, with `error` set if the request failed, and
+            whether any attempt was sent to the provider.
+        """
+        limiter = RateLimiterRegistry.get_rate_limiter(model_config)
+        reserved = (
+            self._reserve_tokens(payload)
+            if reserved_tokens is None
+            else reserved_tokens
+        )
+        body_kwargs = self._body_kwargs(payload)
+        attempt = 0
+        sent = False
+        while True:
+            if (attempt > 0 or reserved_tokens is None) and not limiter.acquire(
+                reserved, deadline.remaining()
+            ):
+                return self._deadline_exceeded_response(model_name), sent
+            try:
+                self.logger.info(
+                    "API request with %s to %s", model_name, model_config.endpoint
+                )
+                sent, sent_at = True, time.perf_counter()
+                limits = deadline.limits()
+                response = self.transport.post(
+                    model_config.endpoint,
+                    headers=headers,
+                    **body_kwargs,
+                    timeout=limits,
+                )
+                self._observe_transfer(
+                    model_name, response, time.perf_counter() - sent_at
+                )
+                delay = self._retry_delay(
+                    model_name, attempt, response.status_code, response.headers, limiter
+                )
+                if delay is not None:
+                    response.close()
+                    limiter.settle(reserved, 0)
+                    if not deadline.allows(delay):
+                        return self._deadline_exceeded_response(model_name), sent
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                limiter.update_from_headers(response.headers)
+                response.raise_for_status()
+                llm_response = self._build_llm_response(
+                    model_name, self._decode_json(model_name, response)
+                )
+                limiter.settle(reserved, self._used_tokens(llm_response.usage))
+                return llm_response, sent
+
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ) as e:
+                limiter.settle(reserved, 0)
+                # A timeout shortened to the time left means the deadline ran out
+                capped = limits != (deadline.timeout.connect, deadline.timeout.read)
+                timed_out = isinstance(e, requests.exceptions.Timeout)
+                if deadline.expired() or (capped and timed_out):
+                    return self._deadline_exceeded_response(model_name), sent
+                delay = self._retry_after_error(model_name, attempt, e)
+                if delay is None or not deadline.allows(delay):
+                    self.logger.error("Error sending LLM request: %s", e)
+                    return LLMResponse(model_name=model_name, error=str(e)), sent
+                time.sleep(delay)
+                attempt += 1
+            except requests.exceptions.RequestException as e:
+                limiter.settle(reserved, 0)
+                self.logger.error("Error sending LLM request: %s", e)
+                status_code = None if e.response is None else e.response.status_code
+                return LLMResponse(
+                    model_name=model_name, error=str(e), status_code=status_code
+                ), sent
+            except Exception as e:
+                limiter.settle(reserved, 0)
+                self.logger.error("Unexpected error during LLM request: %s", e)
+                return LLMResponse(model_name=model_name, error=str(e)), sent
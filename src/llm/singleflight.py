@@ -0,0 +1,138 @@
+import asyncio
+import contextlib
+import threading
+from collections.abc import Awaitable, Callable
+from typing import cast
+
+
+class _Call[T]:
+    """An in-flight call that duplicate callers wait on."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+        self.duplicates = 0
+
+
+class SingleFlight[T]:
+    """
+    Coalesces concurrent calls with the same key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running block until it finishes, or their own timeout elapses, and
+    receive the same result (or exception). Once the call completes, the next
+    caller starts a new one.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call[T]] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self, key: str, fn: Callable[[], T], timeout: float | None = None
+    ) -> tuple[T, bool]:
+        """
+        Runs `fn` unless a call with the same key is already in flight.
+
+        Args:
+            key: Identifies duplicate calls.
+            fn: The function to run.
+            timeout: Seconds to wait for another caller's call, or None to
+                wait until it finishes.
+
+        Returns:
+            The result and whether it was shared from another caller's call.
+
+        Raises:
+            TimeoutError: If `timeout` elapsed before the shared call finished.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                call.duplicates += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight call {key}")
+        else:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return cast(T, call.result), not leader
+
+
+class _AsyncCall[T]:
+    """An in-flight task and the number of callers awaiting it."""
+
+    def __init__(self, task: asyncio.Task[T]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight[T]:
+    """
+    Asyncio counterpart of `SingleFlight`.
+
+    The shared call runs as its own task, so cancelling one waiter does not
+    cancel it for the others; it is only cancelled once every waiter is gone.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _AsyncCall[T]] = {}
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        timeout: float | None = None,
+    ) -> tuple[T, bool]:
+        """
+        Awaits `fn()` unless a call with the same key is already in flight.
+
+        Args:
+            key: Identifies duplicate calls.
+            fn: Returns the awaitable to run.
+            timeout: Seconds to wait for another caller's call, or None to
+                wait until it finishes. Timing out counts as leaving, like a
+                cancel.
+
+        Returns:
+            The result and whether it was shared from another caller's call.
+
+        Raises:
+            TimeoutError: If `timeout` elapsed before the shared call finished.
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = _AsyncCall(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            async with asyncio.timeout(timeout if shared else None):
+                result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await call.task
+        return result, shared
+
+    def _forget(self, key: str, call: _AsyncCall[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
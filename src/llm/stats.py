@@ -0,0 +1,153 @@
+import math
+import threading
+from collections import deque
+from collections.abc import Iterable
+from typing import Any, NamedTuple
+
+from pydantic import BaseModel
+
+from src.llm.prompt_cache import cached_prompt_tokens
+
+
+def percentile(samples: Iterable[float], pct: float) -> float | None:
+    """
+    Computes a nearest-rank percentile.
+
+    Args:
+        samples: The values to take the percentile of.
+        pct: The percentile between 0 and 100.
+
+    Returns:
+        The percentile, or None if there are no samples.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class RequestSample(NamedTuple):
+    """Outcome of one request as kept in a model's rolling window."""
+
+    latency: float
+    ok: bool
+    completion_tokens: int
+    total_tokens: int
+    cost: float
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+
+
+class ModelStatsSnapshot(BaseModel):
+    """Point-in-time summary of a model's recent performance."""
+
+    model_name: str
+    requests: int
+    error_rate: float
+    p50_latency: float | None = None
+    p95_latency: float | None = None
+    tokens_per_second: float | None = None
+    cost_per_1k_tokens: float | None = None
+    prompt_cache_hit_rate: float | None = None
+
+
+class ModelStats:
+    """Thread-safe rolling window of request outcomes for one model."""
+
+    def __init__(self, model_name: str, window: int = 500) -> None:
+        """
+        Args:
+            model_name: The name of the LLM model.
+            window: Number of most recent requests kept.
+        """
+        self.model_name = model_name
+        self._samples: deque[RequestSample] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(
+        self, latency: float, ok: bool, usage: dict[str, Any] | None = None
+    ) -> None:
+        """
+        Records the outcome of a request.
+
+        Args:
+            latency: End-to-end latency in seconds.
+            ok: Whether the request succeeded.
+            usage: The usage block of the response, if any.
+        """
+        usage = usage or {}
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        total_tokens = int(
+            usage.get("total_tokens") or completion_tokens + prompt_tokens
+        )
+        cached_tokens = cached_prompt_tokens(usage) or 0
+        try:
+            cost = float(usage.get("cost") or 0)
+        except (TypeError, ValueError):
+            cost = 0.0
+        with self._lock:
+            self._samples.append(
+                RequestSample(
+                    latency,
+                    ok,
+                    completion_tokens,
+                    total_tokens,
+                    cost,
+                    prompt_tokens,
+                    cached_tokens,
+                )
+            )
+
+    def samples(self) -> list[RequestSample]:
+        """Get a copy of the samples in the window, oldest first."""
+        with self._lock:
+            return list(self._samples)
+
+    def extend(self, samples: Iterable[RequestSample]) -> None:
+        """
+        Adds previously recorded samples, e.g. restored from disk.
+
+        Args:
+            samples: The samples to add, oldest first.
+        """
+        with self._lock:
+            self._samples.extend(samples)
+
+    def snapshot(self) -> ModelStatsSnapshot:
+        """
+        Summarises the window.
+
+        Latency and throughput are computed over successful requests only.
+
+        Returns:
+            The model's ModelStatsSnapshot.
+        """
+        samples = self.samples()
+        succeeded = [s for s in samples if s.ok]
+        errors = len(samples) - len(succeeded)
+        busy_seconds = sum(s.latency for s in succeeded)
+        completion_tokens = sum(s.completion_tokens for s in succeeded)
+        total_tokens = sum(s.total_tokens for s in succeeded)
+        prompt_tokens = sum(s.prompt_tokens for s in succeeded)
+        return ModelStatsSnapshot(
+            model_name=self.model_name,
+            requests=len(samples),
+            error_rate=errors / len(samples) if samples else 0.0,
+            p50_latency=percentile((s.latency for s in succeeded), 50),
+            p95_latency=percentile((s.latency for s in succeeded), 95),
+            tokens_per_second=(
+                completion_tokens / busy_seconds if busy_seconds > 0 else None
+            ),
+            cost_per_1k_tokens=(
+                sum(s.cost for s in succeeded) / total_tokens * 1000
+                if total_tokens
+                else None
+            ),
+            prompt_cache_hit_rate=(
+                sum(s.cached_tokens for s in succeeded) / prompt_tokens
+                if prompt_tokens
+                else None
+            ),
+        )
@@ -0,0 +1,140 @@
+import json
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+import requests
+from pydantic import BaseModel
+
+from src.llm.records import iter_records
+from src.utils.logging import setup_logging
+
+
+def parse_sse_events(lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """
+    Parses a server-sent-events stream of chat completion chunks.
+
+    Comment lines (OpenRouter sends `: OPENROUTER PROCESSING` keep-alives) and
+    blank separators are skipped, and the stream ends at `data: [DONE]`.
+
+    Args:
+        lines: Decoded lines of the response body.
+
+    Yields:
+        The decoded JSON payload of each `data:` event.
+    """
+    for line in lines:
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            return
+        yield json.loads(data)
+
+
+class LLMStream:
+    """
+    Iterator over the content deltas of a streamed LLM response.
+
+    Timing statistics and the final `usage` block become available once the
+    stream has been consumed.
+    """
+
+    logger = setup_logging("llm_stream")
+
+    def __init__(
+        self,
+        model_name: str,
+        response: requests.Response,
+        started_at: float,
+        on_close: Callable[["LLMStream"], None] | None = None,
+    ) -> None:
+        """
+        Args:
+            model_name: The name of the LLM model producing the stream.
+            response: The open HTTP response streaming server-sent events.
+            started_at: `time.perf_counter()` value taken when the request was
+                sent.
+            on_close: Optional callback run once with the stream when it ends
+                and its response is closed.
+        """
+        self.model_name = model_name
+        self.usage: dict[str, Any] | None = None
+        self.error: str | None = None
+        self.finished = False
+        self._response = response
+        if response.encoding is None:
+            response.encoding = "utf-8"
+        self._chunks: list[str] = []
+        self._start = started_at
+        self._first_token_at: float | None = None
+        self._end: float | None = None
+        self._on_close = on_close
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            lines = self._response.iter_lines(chunk_size=None, decode_unicode=True)
+            for event in parse_sse_events(lines):
+                if event.get("usage"):
+                    self.usage = event["usage"]
+                if "error" in event:
+                    self.error = str(event["error"])
+                    self.logger.error("Error in LLM stream: %s", self.error)
+                    break
+                for choice in event.get("choices", []):
+                    delta = choice.get("delta", {}).get("content")
+                    if delta:
+                        if self._first_token_at is None:
+                            self._first_token_at = time.perf_counter()
+                        self._chunks.append(delta)
+                        yield delta
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.error = str(e)
+            self.logger.error("Error reading LLM stream: %s", e)
+        finally:
+            self._end = time.perf_counter()
+            self.finished = True
+            self._response.close()
+            if self._on_close is not None:
+                on_close, self._on_close = self._on_close, None
+                on_close(self)
+
+    def records[T: BaseModel](self, model: type[T]) -> Iterator[T]:
+        """
+        Consumes the stream as a JSON array, yielding each element as soon as
+        it is complete.
+
+        Args:
+            model: The pydantic model each array element is validated as.
+
+        Yields:
+            Each valid record; invalid ones are logged and skipped.
+        """
+        return iter_records(self, model)
+
+    @property
+    def content(self) -> str:
+        """The content received so far."""
+        return "".join(self._chunks)
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        """Seconds from sending the request to the first content delta."""
+        if self._first_token_at is None:
+            return None
+        return self._first_token_at - self._start
+
+    @property
+    def tokens_per_second(self) -> float | None:
+        """
+        Completion tokens per second after the first token, once the stream
+        has ended. Uses the server's token count when `usage` is present and
+        the number of deltas otherwise.
+        """
+        if self._end is None or self._first_token_at is None:
+            return None
+        tokens = len(self._chunks)
+        if self.usage and self.usage.get("completion_tokens"):
+            tokens = self.usage["completion_tokens"]
+        elapsed = self._end - self._first_token_at
+        return tokens / elapsed if elapsed > 0 else None
@@ -0,0 +1,220 @@
+import re
+from typing import Any
+
+from src.models.llm_config import LLMConfig
+
+# Rough average for English text across current tokenizers
+CHARS_PER_TOKEN = 4
+# Formatting overhead the chat template adds around every message
+TOKENS_PER_MESSAGE = 4
+# Flat cost assumed for a non-text content part such as an image
+TOKENS_PER_NON_TEXT_PART = 85
+# Share of the context window left unused to absorb estimation error
+CONTEXT_SAFETY_MARGIN = 0.05
+# Completion budget kept free when the prompt has to be truncated
+MIN_COMPLETION_TOKENS = 1024
+# Number of distinct texts whose token counts are remembered
+MEMO_SIZE = 8192
+TRUNCATION_MARKER = "\n[... truncated ...]\n"
+
+# Words and single punctuation marks, the units BPE tokenizers rarely merge
+_PIECES = re.compile(r"\w+|[^\w\s]")
+# Token counts keyed by (hash, length) so large texts are not kept alive
+_memo: dict[tuple[int, int], int] = {}
+
+
+def count_text_tokens(text: str) -> int:
+    """
+    Estimates the tokens of a text, remembering recent results.
+
+    Every word costs one token per `CHARS_PER_TOKEN` characters, at least one,
+    and every punctuation mark one token, which tracks BPE tokenizers more
+    closely than a plain character count on code and numbers. Repeated texts, such as a
+    system prompt sent with every request, are counted once.
+
+    Args:
+        text: The text to count.
+
+    Returns:
+        The estimated number of tokens.
+    """
+    key = (hash(text), len(text))
+    tokens = _memo.get(key)
+    if tokens is None:
+        tokens = sum(
+            max(1, round(len(piece) / CHARS_PER_TOKEN))
+            for piece in _PIECES.findall(text)
+        )
+        if len(_memo) >= MEMO_SIZE:
+            _memo.clear()
+        _memo[key] = tokens
+    return tokens
+
+
+def estimate_message_tokens(message: dict[str, Any]) -> int:
+    """
+    Estimates the prompt tokens of one chat message.
+
+    Args:
+        message: The chat message.
+
+    Returns:
+        The estimated number of tokens, including the template overhead.
+    """
+    total = TOKENS_PER_MESSAGE
+    content = message.get("content")
+    if isinstance(content, str):
+        total += count_text_tokens(content)
+    elif isinstance(content, list):
+        for part in content:
+            if part.get("type") == "text":
+                total += count_text_tokens(part.get("text", ""))
+            else:
+                total += TOKENS_PER_NON_TEXT_PART
+    return total
+
+
+def estimate_tokens(messages: list[dict[str, Any]]) -> int:
+    """
+    Estimates the prompt tokens of a list of chat messages.
+
+    This is a fast heuristic, good enough for budgeting and rate limiting
+    but not for billing.
+
+    Args:
+        messages: The list of messages for the LLM.
+
+    Returns:
+        The estimated number of prompt tokens.
+    """
+    return sum(estimate_message_tokens(message) for message in messages)
+
+
+def _truncate_text(text: str, max_tokens: int) -> str:
+    """Cuts the middle out of a text so it fits `max_tokens`."""
+    tokens = count_text_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    # Keep 10% slack since tokens are not spread evenly over the text
+    keep = int(len(text) * max_tokens / tokens * 0.9) - len(TRUNCATION_MARKER)
+    if keep <= 0:
+        return ""
+    return text[: keep // 2] + TRUNCATION_MARKER + text[len(text) - keep // 2 :]
+
+
+def _truncate_message(message: dict[str, Any], max_tokens: int) -> dict[str, Any]:
+    """Shortens the longest text of a message so the message fits `max_tokens`."""
+    excess = estimate_message_tokens(message) - max_tokens
+    content = message.get("content")
+    if excess <= 0:
+        return message
+    if isinstance(content, str):
+        target = count_text_tokens(content) - excess
+        return {**message, "content": _truncate_text(content, target)}
+    if isinstance(content, list):
+        texts = [i for i, part in enumerate(content) if part.get("type") == "text"]
+        if texts:
+            longest = max(texts, key=lambda i: len(content[i].get("text", "")))
+            part = content[longest]
+            target = count_text_tokens(part.get("text", "")) - excess
+            parts = list(content)
+            parts[longest] = {**part, "text": _truncate_text(part["text"], target)}
+            return {**message, "content": parts}
+    return message
+
+
+def turn_end(messages: list[dict[str, Any]], start: int) -> int:
+    """
+    Get where the conversation turn starting at a message ends.
+
+    A turn is a user message and the replies following it, so a history cut
+    at turn boundaries never starts with a reply to a dropped question.
+
+    Args:
+        messages: The list of messages for the LLM.
+        start: Index of the turn's first message.
+
+    Returns:
+        The index of the next user message, or the length of `messages` if
+        there is none.
+    """
+    for index in range(start + 1, len(messages)):
+        if messages[index].get("role") == "user":
+            return index
+    return len(messages)
+
+
+def truncate_messages(
+    messages: list[dict[str, Any]], max_tokens: int
+) -> list[dict[str, Any]]:
+    """
+    Trims a conversation to an estimated token budget.
+
+    The oldest turns are dropped first, each user message together with its
+    replies, except system messages and the turn holding the last message.
+    If that is not enough, the longest remaining message is shortened by
+    cutting out the middle of its text.
+
+    Args:
+        messages: The list of messages for the LLM.
+        max_tokens: The prompt token budget.
+
+    Returns:
+        The messages that fit; the input list itself if nothing was trimmed.
+    """
+    costs = [estimate_message_tokens(message) for message in messages]
+    total = sum(costs)
+    if total <= max_tokens:
+        return messages
+
+    dropped: set[int] = set()
+    start = 0
+    while total > max_tokens:
+        end = turn_end(messages, start)
+        if end == len(messages):
+            break
+        for index in range(start, end):
+            if messages[index].get("role") != "system":
+                dropped.add(index)
+                total -= costs[index]
+        start = end
+    kept = [
+        (m, c)
+        for i, (m, c) in enumerate(zip(messages, costs, strict=True))
+        if i not in dropped
+    ]
+
+    if total > max_tokens:
+        longest = max(range(len(kept)), key=lambda i: kept[i][1])
+        message, cost = kept[longest]
+        kept[longest] = (_truncate_message(message, cost - (total - max_tokens)), 0)
+    return [message for message, _ in kept]
+
+
+def fit_context_window(
+    messages: list[dict[str, Any]], model_config: LLMConfig
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    Fits a conversation and its completion into the model's context window.
+
+    The completion budget is what the window leaves after the prompt, capped
+    at the configured `max_tokens`. If the prompt leaves less than
+    `MIN_COMPLETION_TOKENS`, it is truncated first. Models without a known
+    `context_window` keep their messages and configured `max_tokens`.
+
+    Args:
+        messages: The list of messages for the LLM.
+        model_config: The configuration for the LLM model.
+
+    Returns:
+        The messages to send and the `max_tokens` to request.
+    """
+    if model_config.context_window is None:
+        return messages, model_config.max_tokens
+    window = int(model_config.context_window * (1 - CONTEXT_SAFETY_MARGIN))
+    min_completion = min(model_config.max_tokens, MIN_COMPLETION_TOKENS)
+    prompt_tokens = estimate_tokens(messages)
+    if prompt_tokens + min_completion > window:
+        messages = truncate_messages(messages, window - min_completion)
+        prompt_tokens = estimate_tokens(messages)
+    return messages, max(1, min(model_config.max_tokens, window - prompt_tokens))
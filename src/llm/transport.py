@@ -0,0 +1,131 @@
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from src.utils.logging import setup_logging
+
+# Seconds spent opening connections during the current thread's last request
+_connect_timings = threading.local()
+
+
+def _add_connect_time(seconds: float) -> None:
+    _connect_timings.seconds = getattr(_connect_timings, "seconds", 0.0) + seconds
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self) -> None:
+        started_at = time.perf_counter()
+        super().connect()
+        _add_connect_time(time.perf_counter() - started_at)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self) -> None:
+        started_at = time.perf_counter()
+        super().connect()
+        _add_connect_time(time.perf_counter() - started_at)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTP adapter whose connections report how long they took to open."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class HTTPTransport:
+    """
+    Shared HTTP transport for LLM API calls.
+
+    Wraps a single `requests.Session` whose adapters keep a pool of keep-alive
+    connections per host, so repeated calls to the same endpoint reuse an open
+    TCP/TLS connection instead of handshaking every time. The underlying
+    urllib3 pools are thread-safe, so one transport can be shared by all
+    workers of a service.
+    """
+
+    logger = setup_logging("llm_transport")
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        endpoint_pool_sizes: dict[str, int] | None = None,
+    ) -> None:
+        """
+        Args:
+            pool_maxsize: Default number of connections kept alive per host.
+            endpoint_pool_sizes: Optional pool size overrides keyed by endpoint
+                URL (e.g. `LLMConfig.endpoint`).
+        """
+        self.session = requests.Session()
+        default_adapter = TimedHTTPAdapter(
+            pool_connections=pool_maxsize, pool_maxsize=pool_maxsize
+        )
+        self.session.mount("http://", default_adapter)
+        self.session.mount("https://", default_adapter)
+        for endpoint, size in (endpoint_pool_sizes or {}).items():
+            self.session.mount(
+                endpoint, TimedHTTPAdapter(pool_connections=size, pool_maxsize=size)
+            )
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Sends a POST request over the pooled session.
+
+        Args:
+            url: The URL to post to.
+            **kwargs: Keyword arguments forwarded to `requests.Session.post`.
+
+        Returns:
+            The HTTP response.
+        """
+        _connect_timings.seconds = 0.0
+        return self.session.post(url, **kwargs)
+
+    @property
+    def last_connect_seconds(self) -> float:
+        """
+        Seconds the calling thread's last `post` spent opening connections;
+        0 when it reused a pooled connection.
+        """
+        return float(getattr(_connect_timings, "seconds", 0.0))
+
+    def warm_up(self, endpoints: Iterable[str], timeout: float = 10) -> None:
+        """
+        Opens a connection to each endpoint so the first real call skips the
+        TCP/TLS handshake.
+
+        Failures are logged and ignored; warm-up is best effort.
+
+        Args:
+            endpoints: Endpoint URLs to connect to. Duplicates are ignored.
+            timeout: Timeout in seconds for each warm-up request.
+        """
+        for endpoint in dict.fromkeys(endpoints):
+            try:
+                self.session.head(endpoint, timeout=timeout).close()
+                self.logger.info("Warmed up connection to %s", endpoint)
+            except requests.exceptions.RequestException as e:
+                self.logger.warning("Could not warm up %s: %s", endpoint, e)
+
+    def close(self) -> None:
+        """Closes all pooled connections."""
+        self.session.close()
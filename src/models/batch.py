@@ -0,0 +1,43 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class BatchRecord(BaseModel):
+    """One line of a batch run's JSONL output."""
+
+    # Zero-based index of the answered item among the non-empty input lines
+    line: int
+    id: str
+    model_name: str
+    content: str
+    usage: dict[str, Any] | None = None
+    cached: bool = False
+
+
+class BatchProgress(BaseModel):
+    """Progress of a batch run."""
+
+    total: int
+    # Items answered by an earlier run and not sent again
+    skipped: int = 0
+    completed: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def remaining(self) -> int:
+        """Items not yet answered or failed in this run."""
+        return max(0, self.total - self.skipped - self.completed - self.failed)
+
+    @property
+    def throughput(self) -> float:
+        """Items finished per second in this run."""
+        finished = self.completed + self.failed
+        return finished / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """Estimated seconds until the run finishes, if any item has finished."""
+        throughput = self.throughput
+        return self.remaining / throughput if throughput > 0 else None
@@ -0,0 +1,170 @@
+import sys
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from src.llm.tokens import estimate_message_tokens, turn_end
+
+SYSTEM = sys.intern("system")
+USER = sys.intern("user")
+ASSISTANT = sys.intern("assistant")
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+# Condenses dropped messages, the previous summary first if there is one,
+# into the text of a new summary
+Summarizer = Callable[[list[dict[str, Any]]], str]
+
+
+class Conversation:
+    """
+    Multi-turn chat history kept under a prompt token budget.
+
+    Messages are appended as the conversation goes on and `messages` is the
+    live list to send, so each turn costs one append instead of a copy of
+    the whole history. Every message's estimated tokens are counted once,
+    when it is added, and kept in a running total. Once the total exceeds
+    `max_tokens`, the oldest turns are dropped, each user message together
+    with its replies, except the leading system messages and the turn
+    holding the last message, so the kept history starts with a user
+    message. With a `summarize` function, dropped
+    messages are folded into a summary kept after the system messages
+    instead of being lost. Roles are interned, so long histories share one
+    copy of each role string.
+    """
+
+    __slots__ = (
+        "_costs",
+        "_messages",
+        "_pinned",
+        "_summarized",
+        "_tokens",
+        "dropped",
+        "max_tokens",
+        "summarize",
+    )
+
+    def __init__(
+        self,
+        system: str | None = None,
+        max_tokens: int | None = None,
+        summarize: Summarizer | None = None,
+    ) -> None:
+        """
+        Args:
+            system: Optional system prompt the conversation starts with.
+            max_tokens: Estimated prompt token budget of the history, or None
+                to keep every message.
+            summarize: Optional function condensing dropped messages into a
+                summary text.
+        """
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        # Number of messages dropped to stay within the budget
+        self.dropped = 0
+        self._messages: list[dict[str, Any]] = []
+        self._costs: list[int] = []
+        self._tokens = 0
+        # Leading messages that are never dropped: system prompts and summary
+        self._pinned = 0
+        self._summarized = False
+        if system is not None:
+            self.add(SYSTEM, system)
+
+    @property
+    def messages(self) -> list[dict[str, Any]]:
+        """
+        The messages to send, oldest first.
+
+        This is the conversation's own list, updated in place as messages are
+        added; do not modify it, and do not add messages while a request
+        sending it is in flight.
+        """
+        return self._messages
+
+    @property
+    def tokens(self) -> int:
+        """The estimated prompt tokens of `messages`."""
+        return self._tokens
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def add(self, role: str, content: str | list[dict[str, Any]]) -> None:
+        """
+        Appends a message and drops old ones if the budget is exceeded.
+
+        Args:
+            role: The message's role, such as `user` or `assistant`.
+            content: The message's text, or its content parts.
+        """
+        message = {"role": sys.intern(role), "content": content}
+        cost = estimate_message_tokens(message)
+        if message["role"] is SYSTEM and self._pinned == len(self._messages):
+            self._pinned += 1
+        self._messages.append(message)
+        self._costs.append(cost)
+        self._tokens += cost
+        self._fit()
+
+    def add_user(self, content: str | list[dict[str, Any]]) -> None:
+        """Appends a user message."""
+        self.add(USER, content)
+
+    def add_assistant(self, content: str) -> None:
+        """Appends an assistant message, typically the previous answer."""
+        self.add(ASSISTANT, content)
+
+    def extend(self, messages: Iterable[dict[str, Any]]) -> None:
+        """
+        Appends existing chat messages.
+
+        Args:
+            messages: Messages with a `role` and `content`.
+        """
+        for message in messages:
+            self.add(message["role"], message["content"])
+
+    def _fit(self) -> None:
+        """Drops the oldest unpinned turns until the budget is met."""
+        if self.max_tokens is None:
+            return
+        while self._tokens > self.max_tokens:
+            stop, freed = self._pinned, 0
+            while freed < self._excess():
+                end = turn_end(self._messages, stop)
+                if end == len(self._messages):
+                    break
+                freed += sum(self._costs[stop:end])
+                stop = end
+            if stop == self._pinned:
+                return
+            dropped = self._messages[self._pinned : stop]
+            del self._messages[self._pinned : stop]
+            del self._costs[self._pinned : stop]
+            self._tokens -= freed
+            self.dropped += len(dropped)
+            if self.summarize is None:
+                return
+            self._fold(dropped)
+
+    def _excess(self) -> int:
+        """Get the estimated tokens over the budget."""
+        return self._tokens - (self.max_tokens or 0)
+
+    def _fold(self, dropped: list[dict[str, Any]]) -> None:
+        """Replaces the summary with one that also covers dropped messages."""
+        if self.summarize is None:
+            return
+        if self._summarized:
+            index = self._pinned - 1
+            dropped.insert(0, self._messages[index])
+            self._tokens -= self._costs[index]
+        else:
+            index = self._pinned
+            self._messages.insert(index, {})
+            self._costs.insert(index, 0)
+            self._pinned += 1
+            self._summarized = True
+        summary = {"role": SYSTEM, "content": SUMMARY_PREFIX + self.summarize(dropped)}
+        self._messages[index] = summary
+        self._costs[index] = estimate_message_tokens(summary)
+        self._tokens += self._costs[index]
@@ -0,0 +1,23 @@
+from typing import Literal, Self
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class ImagePreset(BaseModel):
+    """How images are prepared before they are sent to a vision model."""
+
+    # Longest side in pixels after downscaling; smaller images are kept as is
+    max_side: int = Field(default=2048, gt=0)
+    format: Literal["JPEG", "PNG", "WEBP"] = "JPEG"
+    # Encoder quality for lossy formats
+    quality: int = Field(default=85, ge=1, le=100)
+    # Split pages larger than this many pixels per side into overlapping tiles
+    tile_size: int | None = Field(default=None, gt=0)
+    tile_overlap: int = Field(default=64, ge=0)
+
+    @model_validator(mode="after")
+    def _check_tile_overlap(self) -> Self:
+        """Rejects tiles that would overlap by their whole size."""
+        if self.tile_size is not None and self.tile_overlap >= self.tile_size:
+            raise ValueError("tile_overlap must be smaller than tile_size")
+        return self
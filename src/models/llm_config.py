@@ -1,5 +1,9 @@
+from typing import Literal
+
 from pydantic import BaseModel
 
+from src.models.image_preset import ImagePreset
+
 
 class LLMConfig(BaseModel):
     """Configuration for a vision model."""
@@ -8,5 +12,20 @@ class LLMConfig(BaseModel):
     provider: str
     api_key_env: str = "OPENROUTER_API_KEY"
     endpoint: str = "https://openrouter.ai/api/v1/chat/completions"
+    # Upper bound on the completion; lowered per request to fit context_window
     max_tokens: int = 20000
+    # Prompt and completion tokens the model accepts, if known
+    context_window: int | None = None
     temperature: float = 0.1
+    # Set to False for models whose answers must never be served from cache
+    cache_responses: bool = True
+    # Client-side budgets shared by every model on the same provider and key
+    requests_per_minute: int | None = None
+    tokens_per_minute: int | None = None
+    # How images are resized, tiled and recompressed for this model
+    image_preset: ImagePreset | None = None
+    # How the provider caches repeated prompt prefixes: "cache_control" needs
+    # breakpoints on messages marked cacheable, "automatic" needs no hints
+    prompt_caching: Literal["automatic", "cache_control"] | None = None
+    # Most cache_control breakpoints the provider honours per request
+    max_cache_breakpoints: int = 4
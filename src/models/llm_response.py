@@ -0,0 +1,22 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class LLMResponse(BaseModel):
+    """Outcome of a single LLM request."""
+
+    model_name: str
+    content: str | None = None
+    usage: dict[str, Any] | None = None
+    error: str | None = None
+    # HTTP status of a request that failed with an error response
+    status_code: int | None = None
+    # Set when the call's deadline ran out before an answer arrived
+    deadline_exceeded: bool = False
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """Whether the request succeeded and returned content."""
+        return self.error is None and self.content is not None
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class RequestTimeout(BaseModel):
+    """Time limits of one LLM call."""
+
+    # Seconds to open a connection to the endpoint
+    connect: float = 10.0
+    # Seconds to wait for each piece of the response
+    read: float = 60.0
+    # Seconds the whole call may take, retries and hedges included, or None
+    # for no limit
+    total: float | None = None
@@ -1,36 +1,250 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Records waiting for the writer thread; further records are dropped
+QUEUE_SIZE = 10_000
+# Set to "json" to log one JSON object per line
+LOG_FORMAT_ENV = "LOG_FORMAT"
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits records per logger, level and message template.
+
+    Each template gets a token bucket refilling at `rate` records per second
+    up to `burst`. Records beyond it are dropped, and the next record let
+    through reports how many were suppressed. Templates only repeat when
+    messages are logged lazily, e.g. `logger.info("Cache hit for %s", name)`.
+    """
+
+    def __init__(self, rate: float, burst: int = 10) -> None:
+        """
+        Args:
+            rate: Records per second let through per template.
+            burst: Records let through at once before sampling starts.
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        # Template key -> (tokens, last refill, suppressed count)
+        self._buckets: dict[tuple[str, int, str], tuple[float, float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _DispatchFormatter(logging.Formatter):
+    """Formats each record with the formatter chosen for its logger."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.default = logging.Formatter(TEXT_FORMAT)
+        self.formatters: dict[str, logging.Formatter] = {}
+
+    def format(self, record: logging.LogRecord) -> str:
+        formatter = self.formatters.get(record.name, self.default)
+        formatted = formatter.format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed and not isinstance(formatter, JSONFormatter):
+            formatted += f" [{suppressed} similar messages suppressed]"
+        return formatted
+
+
+class _NameFilter(logging.Filter):
+    """Passes the records of the listed loggers only."""
+
+    def __init__(self, names: set[str]) -> None:
+        super().__init__()
+        self.names = names
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.name in self.names
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread without formatting or waiting.
+
+    Records are queued as they are, so the message is only built on the
+    writer thread; arguments must not be mutated after the logging call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            global _dropped
+            _dropped += 1
+
+
+_lock = threading.Lock()
+_queue: queue.Queue[logging.LogRecord] = queue.Queue(QUEUE_SIZE)
+_formatter = _DispatchFormatter()
+_console = logging.StreamHandler(sys.stderr)
+_console.setFormatter(_formatter)
+# Log file path -> handler writing the records of the loggers in its filter
+_files: dict[str, tuple[logging.Handler, _NameFilter]] = {}
+_listener: QueueListener | None = None
+_dropped = 0
+
+
+def _restart_listener() -> None:
+    """Starts the writer thread, or restarts it to pick up new handlers."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    file_handlers = [handler for handler, _ in _files.values()]
+    _listener = QueueListener(
+        _queue, _console, *file_handlers, respect_handler_level=True
+    )
+    _listener.start()
 
 
 def setup_logging(
-    name: str, log_file: str | None = None, level: int = logging.INFO
+    name: str,
+    log_file: str | None = None,
+    level: int = logging.INFO,
+    json_format: bool | None = None,
+    sample_rate: float | None = None,
 ) -> logging.Logger:
     """Set up logging configuration.
 
+    Records are queued and written to stderr and the log file by a single
+    background thread, so logging calls never wait on I/O. Calling this again
+    for the same name reconfigures the logger instead of adding handlers.
+
     Args:
         name: Name of the logger
         log_file: Optional path to log file
         level: Logging level (default: INFO)
+        json_format: Log JSON lines instead of text; defaults to True if the
+            LOG_FORMAT environment variable is "json"
+        sample_rate: Optional records per second let through per message
+            template, for noisy loggers
 
     Returns:
         Configured logger instance
     """
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-
-    # Create formatters
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    if json_format is None:
+        json_format = os.environ.get(LOG_FORMAT_ENV, "").lower() == "json"
 
-    # Add console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    with _lock:
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        _formatter.formatters[name] = (
+            JSONFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+        )
 
-    # Add file handler if log file is specified
-    if log_file:
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handler = next(
+            (h for h in logger.handlers if isinstance(h, _NonBlockingQueueHandler)),
+            None,
+        )
+        if handler is None:
+            handler = _NonBlockingQueueHandler(_queue)
+            logger.addHandler(handler)
+        for existing in list(handler.filters):
+            handler.removeFilter(existing)
+        if sample_rate is not None:
+            handler.addFilter(SamplingFilter(sample_rate))
 
+        restart = _listener is None
+        if log_file and log_file not in _files:
+            file_handler = logging.FileHandler(log_file)
+            file_handler.setFormatter(_formatter)
+            name_filter = _NameFilter(set())
+            file_handler.addFilter(name_filter)
+            _files[log_file] = (file_handler, name_filter)
+            restart = True
+        if log_file:
+            _files[log_file][1].names.add(name)
+        if restart:
+            _restart_listener()
     return logger
+
+
+def flush_logging() -> None:
+    """Waits until every queued record has been written."""
+    with _lock:
+        if _listener is not None:
+            _restart_listener()
+
+
+def shutdown_logging() -> None:
+    """Writes the queued records and stops the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        if _dropped:
+            sys.stderr.write(f"Logging queue full; dropped {_dropped} records\n")
+
+
+def dropped_records() -> int:
+    """Get the number of records dropped because the queue was full."""
+    return _dropped
+
+
+def _reinit_after_fork() -> None:
+    """Gives a forked child its own queue and writer thread; neither survives fork."""
+    global _lock, _queue, _listener
+    _lock = threading.Lock()
+    _queue = queue.Queue(QUEUE_SIZE)
+    for logger in logging.Logger.manager.loggerDict.values():
+        for handler in getattr(logger, "handlers", []):
+            if isinstance(handler, _NonBlockingQueueHandler):
+                handler.queue = _queue
+    if _listener is not None:
+        _listener = None
+        _restart_listener()
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_reinit_after_fork)
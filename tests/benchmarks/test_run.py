@@ -0,0 +1,93 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from benchmarks.fake_server import FakeChatServer, FakeServerConfig
+from benchmarks.run import BenchmarkOptions, compare, main, run_benchmarks
+
+
+@pytest.fixture
+def fake_server(request):
+    """Fixture running a FakeChatServer in-process with the given config."""
+    server = FakeChatServer(request.param)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize(
+    "fake_server", [FakeServerConfig(latency=0, response_tokens=3)], indirect=True
+)
+def test_fake_server_answers_and_streams(fake_server):
+    """Test that the fake server returns sized answers as JSON and as SSE."""
+    payload = {"model": "m", "messages": [{"role": "user", "content": "Hi"}]}
+    response = requests.post(fake_server.url, json=payload, timeout=5)
+    body = response.json()
+    assert body["choices"][0]["message"]["content"] == "word word word "
+    assert body["usage"]["completion_tokens"] == 3
+
+    streamed = requests.post(
+        fake_server.url, json={**payload, "stream": True}, timeout=5
+    )
+    events = [line for line in streamed.text.splitlines() if line]
+    assert events[-1] == "data: [DONE]"
+
+
+@pytest.mark.parametrize(
+    "fake_server",
+    [FakeServerConfig(latency=0, rate_limit_rate=1.0, retry_after=2)],
+    indirect=True,
+)
+def test_fake_server_rate_limits(fake_server):
+    """Test that the 429 knob answers with Retry-After."""
+    response = requests.post(fake_server.url, json={"messages": []}, timeout=5)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2.0"
+
+
+def test_compare_flags_regressions():
+    """Test that throughput drops and p99 rises beyond the limit are reported."""
+    baseline = {
+        "results": [{"mode": "threaded", "throughput": 100.0, "p99_latency": 0.1}]
+    }
+    report = {"results": [{"mode": "threaded", "throughput": 95.0, "p99_latency": 0.2}]}
+
+    regressions = compare(report, baseline, max_regression=0.1)
+
+    assert len(regressions) == 1
+    assert "p99 latency" in regressions[0]
+
+
+def test_run_benchmarks_offline():
+    """Test a small end-to-end run against the fake server process."""
+    report = run_benchmarks(
+        ["sequential", "async"],
+        FakeServerConfig(latency=0.001, error_rate=0.2, seed=1),
+        BenchmarkOptions(requests=10, concurrency=4, max_retries=5),
+    )
+
+    assert [r["mode"] for r in report["results"]] == ["sequential", "async"]
+    for result in report["results"]:
+        assert result["requests"] == 10
+        assert result["errors"] == 0
+        assert result["p99_latency"] >= result["p50_latency"] > 0
+        assert result["cpu_seconds"] > 0
+        assert result["peak_rss_mb"] > 0
+
+
+def test_main_writes_report_and_compares(tmp_path):
+    """Test that the CLI writes a JSON report and fails on a regression."""
+    output = tmp_path / "report.json"
+    args = ["--modes", "threaded", "--requests", "5", "--latency", "0.001"]
+
+    assert main([*args, "--output", str(output)]) == 0
+    report = json.loads(output.read_text())
+    assert report["metadata"]["options"]["requests"] == 5
+
+    report["results"][0]["throughput"] *= 100
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report))
+    assert main([*args, "--baseline", str(baseline)]) == 1
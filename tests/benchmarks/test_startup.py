@@ -0,0 +1,34 @@
+import statistics
+
+from benchmarks.startup import (
+    STARTUP_BUDGET_SECONDS,
+    import_report,
+    parse_importtime,
+    time_runs,
+)
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      4452 |      21399 | src.utils.logging
+import time:       464 |      59062 | dotenv
+"""
+
+
+def test_parse_importtime_sorts_by_cumulative_time():
+    """Test that the importtime report is parsed slowest first."""
+    times = parse_importtime(IMPORTTIME)
+    assert [t.module for t in times] == ["dotenv", "src.utils.logging", "_io"]
+    assert times[0].seconds == 0.059062
+
+
+def test_main_does_not_import_the_llm_stack():
+    """Test that importing main leaves the LLM stack and pydantic unloaded."""
+    _, heavy = import_report("main")
+    assert heavy == []
+
+
+def test_startup_within_budget():
+    """Test that a run that never calls an LLM starts within the budget."""
+    timings = time_runs(["--name", "budget"], runs=5)
+    assert statistics.median(timings) <= STARTUP_BUDGET_SECONDS
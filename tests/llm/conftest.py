@@ -0,0 +1,186 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubOpenRouterServer(ThreadingHTTPServer):
+    """Local stand-in for the OpenRouter chat completions endpoint."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StubOpenRouterHandler)
+        self.lock = threading.Lock()
+        self.requests: list[dict] = []
+        self.client_ports: list[int] = []
+        self.response_content = "Stub response."
+        self.delay = 0.0
+        self.chunk_delay = 0.0
+        # Per-model overrides of `delay`, keyed by the payload's model name
+        self.model_delays: dict[str, float] = {}
+        # Status codes returned, in order, before requests start succeeding
+        self.error_statuses: list[int] = []
+        self.error_headers: dict[str, str] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Prompt prefixes ending in a cache_control breakpoint seen so far
+        self.cached_prefixes: set[str] = set()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    @property
+    def connection_count(self) -> int:
+        """Number of distinct client connections seen so far."""
+        return len(set(self.client_ports))
+
+
+class StubOpenRouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubOpenRouterServer
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def _prompt_cache(self, messages: list[dict]) -> tuple[int, int] | None:
+        """
+        Simulates a prompt cache keyed by the prefix up to the last breakpoint,
+        returning the prefix tokens and how many of them were cached.
+        """
+        end = None
+        for index, message in enumerate(messages):
+            content = message.get("content")
+            if isinstance(content, list) and any("cache_control" in p for p in content):
+                end = index + 1
+        if end is None:
+            return None
+        prefix = json.dumps(messages[:end], sort_keys=True)
+        with self.server.lock:
+            hit = prefix in self.server.cached_prefixes
+            self.server.cached_prefixes.add(prefix)
+        return len(prefix) // 4, len(prefix) // 4 if hit else 0
+
+    def _record(self, payload: dict | None) -> None:
+        with self.server.lock:
+            self.server.client_ports.append(self.client_address[1])
+            if payload is not None:
+                self.server.requests.append(payload)
+
+    def _send_json(self, body: dict, status: int = 200) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, usage: dict) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._write_chunk(b": OPENROUTER PROCESSING\n\n")
+        for word in self.server.response_content.split(" "):
+            time.sleep(self.server.chunk_delay)
+            event = {"choices": [{"delta": {"content": word + " "}}]}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+        event = {"choices": [{"delta": {}}], "usage": usage}
+        self._write_chunk(f"data: {json.dumps(event)}\n\ndata: [DONE]\n\n".encode())
+        self._write_chunk(b"")
+
+    def do_HEAD(self):  # noqa: N802
+        self._record(None)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        self._record(payload)
+        with self.server.lock:
+            status = (
+                self.server.error_statuses.pop(0)
+                if self.server.error_statuses
+                else None
+            )
+        if status is not None:
+            self.send_response(status)
+            for name, value in self.server.error_headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(
+                self.server.max_in_flight, self.server.in_flight
+            )
+        time.sleep(
+            self.server.model_delays.get(payload.get("model"), self.server.delay)
+        )
+        with self.server.lock:
+            self.server.in_flight -= 1
+        usage = {"prompt_tokens": 5, "completion_tokens": 3, "cost": 0.0001}
+        prompt_cache = self._prompt_cache(payload.get("messages", []))
+        if prompt_cache is not None:
+            prefix_tokens, cached_tokens = prompt_cache
+            usage["prompt_tokens"] = 5 + prefix_tokens
+            usage["prompt_tokens_details"] = {"cached_tokens": cached_tokens}
+        if payload.get("stream"):
+            self._send_stream(usage)
+            return
+        self._send_json(
+            {
+                "model": payload.get("model"),
+                "choices": [{"message": {"content": self.server.response_content}}],
+                "usage": usage,
+            }
+        )
+
+
+@pytest.fixture(autouse=True)
+def reset_process_state():
+    """Fixture giving every test fresh rate limiters and model statistics."""
+    from src.llm.rate_limit import RateLimiterRegistry
+    from src.llm.registry import LLMRegistry
+
+    RateLimiterRegistry.clear()
+    LLMRegistry.clear_stats()
+    yield
+    RateLimiterRegistry.clear()
+    LLMRegistry.clear_stats()
+
+
+@pytest.fixture
+def stub_server():
+    """Fixture running a local OpenRouter stand-in for the test duration."""
+    server = StubOpenRouterServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stub_llm_config(stub_server):
+    """Fixture providing an LLMConfig pointed at the local stand-in server."""
+    from src.models.llm_config import LLMConfig
+
+    return LLMConfig(
+        name="stub-model",
+        provider="stub",
+        endpoint=stub_server.url,
+        api_key_env="STUB_API_KEY",
+        max_tokens=100,
+    )
@@ -0,0 +1,106 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from src.llm.async_service import AsyncLLMService
+from src.llm.rate_limit import RetryPolicy
+
+
+@pytest.fixture
+def patched_registry(stub_llm_config):
+    """Fixture routing every model name to the local stand-in server."""
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ) as mock_get_model_config:
+        yield mock_get_model_config
+
+
+def test_async_send_llm_request_success(stub_server, patched_registry):
+    """Test a single async request against the stand-in server."""
+
+    async def run():
+        async with AsyncLLMService() as service:
+            return await service.send_llm_request(
+                "stub-model", [{"role": "user", "content": "Hello"}]
+            )
+
+    assert asyncio.run(run()) == "Stub response."
+    assert stub_server.requests[0]["model"] == "stub-model"
+    assert stub_server.requests[0]["stream"] is False
+
+
+def test_async_send_llm_request_invalid_model():
+    """Test that an unknown model returns None without a network call."""
+
+    async def run():
+        async with AsyncLLMService() as service:
+            return await service.send_llm_request("invalid-model", [])
+
+    assert asyncio.run(run()) is None
+
+
+def test_async_send_llm_request_http_error(patched_registry):
+    """Test that HTTP errors are retried, then logged and turned into None."""
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        return httpx.Response(500)
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        retry_policy = RetryPolicy(max_retries=2, base_delay=0.01)
+        async with AsyncLLMService(client=client, retry_policy=retry_policy) as service:
+            return await service.send_llm_request("stub-model", [])
+
+    assert asyncio.run(run()) is None
+    assert len(attempts) == 3
+
+
+def test_async_send_llm_request_retries_after_429(stub_server, patched_registry):
+    """Test that a throttled async request is retried after Retry-After."""
+    stub_server.error_statuses = [429]
+    stub_server.error_headers = {"Retry-After": "0.05"}
+
+    async def run():
+        async with AsyncLLMService() as service:
+            return await service.send_llm_request("stub-model", [])
+
+    assert asyncio.run(run()) == "Stub response."
+    assert len(stub_server.requests) == 2
+
+
+def test_gather_preserves_order_and_bounds_concurrency(stub_server, patched_registry):
+    """Test that gather returns ordered results and respects the semaphore."""
+    stub_server.delay = 0.05
+
+    async def run():
+        async with AsyncLLMService(max_concurrency=4) as service:
+            jobs = [
+                ("stub-model", [{"role": "user", "content": str(i)}]) for i in range(20)
+            ]
+            return await service.gather(jobs)
+
+    results = asyncio.run(run())
+    assert results == ["Stub response."] * 20
+    assert len(stub_server.requests) == 20
+    assert stub_server.max_in_flight <= 4
+
+
+def test_cancellation_releases_semaphore(stub_server, patched_registry):
+    """Test that a cancelled request frees its concurrency slot."""
+    stub_server.delay = 1.0
+
+    async def run():
+        async with AsyncLLMService(max_concurrency=1) as service:
+            task = asyncio.create_task(service.send_llm_request("stub-model", []))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return service._semaphore.locked()
+
+    assert asyncio.run(run()) is False
@@ -0,0 +1,126 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.batch import BatchRunner
+from src.llm.scheduler import RequestScheduler
+from src.llm.service import LLMService
+from src.models.batch import BatchProgress
+
+
+@pytest.fixture
+def patched_registry(stub_llm_config):
+    """Fixture resolving every model name to the stub configuration."""
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        side_effect=lambda name: stub_llm_config.model_copy(update={"name": name}),
+    ):
+        yield
+
+
+def _write_input(path, count: int) -> None:
+    lines = [json.dumps({"id": f"item-{i}", "prompt": f"p{i}"}) for i in range(count)]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def _records(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_batch_writes_every_answer(stub_server, patched_registry, tmp_path):
+    """Test that every line is answered once with bounded concurrency."""
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(source, 20)
+    stub_server.delay = 0.02
+    reports: list[BatchProgress] = []
+
+    progress = BatchRunner(
+        "stub-model", max_workers=4, progress=reports.append, progress_interval=0
+    ).run(source, output)
+
+    records = _records(output)
+    assert sorted(r["line"] for r in records) == list(range(20))
+    assert {r["id"] for r in records} == {f"item-{i}" for i in range(20)}
+    assert records[0]["content"] == "Stub response."
+    assert progress.completed == 20 and progress.remaining == 0
+    assert stub_server.max_in_flight <= 4
+    assert reports[-1].completed == 20
+
+
+def test_batch_resumes_without_resending(stub_server, patched_registry, tmp_path):
+    """Test that a rerun skips answered lines and drops a torn last record."""
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(source, 5)
+    answered = [
+        json.dumps({"line": i, "id": f"item-{i}", "model_name": "m", "content": "x"})
+        for i in (0, 2)
+    ]
+    output.write_text("\n".join(answered) + '\n{"line": 3, "id": "it')
+
+    progress = BatchRunner("stub-model").run(source, output)
+
+    sent = [request["messages"][0]["content"] for request in stub_server.requests]
+    assert sorted(sent) == ["p1", "p3", "p4"]
+    assert progress.skipped == 2 and progress.completed == 3
+    assert sorted(r["line"] for r in _records(output)) == [0, 1, 2, 3, 4]
+
+
+def test_interrupted_batch_pays_only_for_what_it_writes(
+    stub_server, patched_registry, tmp_path
+):
+    """Test that queued requests are cancelled and sent ones are recorded."""
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(source, 20)
+    stub_server.delay = 0.1
+
+    def interrupt(progress: BatchProgress) -> None:
+        raise KeyboardInterrupt
+
+    runner = BatchRunner(
+        "stub-model", max_workers=2, progress=interrupt, progress_interval=0
+    )
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(source, output)
+
+    assert 0 < len(stub_server.requests) < 20
+    assert len(_records(output)) == len(stub_server.requests)
+
+    progress = BatchRunner("stub-model", max_workers=2).run(source, output)
+
+    assert len(stub_server.requests) == 20
+    assert progress.completed + progress.skipped == 20
+    assert sorted(r["line"] for r in _records(output)) == list(range(20))
+
+
+def test_batch_leaves_failures_for_the_next_run(
+    stub_server, patched_registry, tmp_path
+):
+    """Test that failed and invalid lines are not written, so reruns retry."""
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    source.write_text(
+        '{"prompt": "rejected"}\n{"neither": 1}\n{"prompt": "answered"}\n'
+    )
+    stub_server.error_statuses = [400]
+
+    with RequestScheduler(LLMService(), max_workers=1) as scheduler:
+        progress = BatchRunner("stub-model", scheduler=scheduler).run(source, output)
+
+    assert progress.completed == 1 and progress.failed == 2
+    assert [r["id"] for r in _records(output)] == ["2"]
+
+
+def test_batch_skips_lines_of_the_wrong_shape(stub_server, patched_registry, tmp_path):
+    """Test that valid JSON that is not a request fails only its own line."""
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    source.write_text(
+        '[1, 2]\n{"messages": "not a list"}\n{"model": 3, "prompt": "p"}\n'
+        '{"prompt": "answered"}\n'
+    )
+
+    with RequestScheduler(LLMService(), max_workers=1) as scheduler:
+        progress = BatchRunner("stub-model", scheduler=scheduler).run(source, output)
+
+    assert progress.completed == 1 and progress.failed == 3
+    assert [r["id"] for r in _records(output)] == ["3"]
+    assert len(stub_server.requests) == 1
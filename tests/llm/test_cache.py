@@ -0,0 +1,121 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.cache import ResponseCache, payload_cache_key
+from src.llm.service import LLMService
+from src.models.llm_response import LLMResponse
+
+
+def make_response(content: str) -> LLMResponse:
+    return LLMResponse(model_name="test-model", content=content, usage={"cost": 0.1})
+
+
+def test_payload_cache_key_ignores_key_order():
+    """Test that equal payloads hash the same regardless of key order."""
+    first = {"model": "m", "messages": [{"role": "user", "content": "Hi"}]}
+    second = {"messages": [{"content": "Hi", "role": "user"}], "model": "m"}
+    assert payload_cache_key(first) == payload_cache_key(second)
+    assert payload_cache_key(first) != payload_cache_key({**first, "model": "n"})
+
+
+def test_cache_lru_eviction():
+    """Test that the least recently used entry is evicted from memory."""
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", make_response("A"))
+    cache.set("b", make_response("B"))
+    assert cache.get("a").content == "A"
+    cache.set("c", make_response("C"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").content == "A"
+    assert cache.get("c").content == "C"
+    assert cache.hits == 3
+    assert cache.misses == 1
+
+
+def test_cache_ttl_expiry():
+    """Test that entries older than the TTL are not returned."""
+    cache = ResponseCache(ttl=10)
+    with patch("src.llm.cache.time.time", return_value=1000.0):
+        cache.set("a", make_response("A"))
+    with patch("src.llm.cache.time.time", return_value=1005.0):
+        assert cache.get("a") is not None
+    with patch("src.llm.cache.time.time", return_value=1011.0):
+        assert cache.get("a") is None
+
+
+def test_cache_persists_to_disk(tmp_path):
+    """Test that entries survive a new cache instance on the same database."""
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path=path)
+    cache.set("a", make_response("A"))
+    cache.close()
+
+    reopened = ResponseCache(path=path)
+    assert reopened.get("a") == make_response("A")
+    reopened.clear()
+    assert reopened.get("a") is None
+
+
+def test_cache_disk_size_limit(tmp_path):
+    """Test that the disk store keeps at most max_disk_entries rows."""
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_disk_entries=2)
+    for i, key in enumerate(["a", "b", "c"]):
+        with patch("src.llm.cache.time.time", return_value=1000.0 + i):
+            cache.set(key, make_response(key))
+    rows = cache._db.execute("SELECT key FROM responses ORDER BY key").fetchall()
+    assert rows == [("b",), ("c",)]
+
+
+def test_cache_memory_hits_keep_entries_on_disk(tmp_path):
+    """Test that keys served from memory are not the first evicted from disk."""
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_disk_entries=2)
+    with patch("src.llm.cache.time.time", return_value=1000.0):
+        cache.set("hot", make_response("hot"))
+    with patch("src.llm.cache.time.time", return_value=1001.0):
+        cache.set("cold", make_response("cold"))
+    with patch("src.llm.cache.time.time", return_value=1002.0):
+        assert cache.get("hot") is not None
+    with patch("src.llm.cache.time.time", return_value=1003.0):
+        cache.set("new", make_response("new"))
+
+    rows = cache._db.execute("SELECT key FROM responses ORDER BY key").fetchall()
+    assert rows == [("hot",), ("new",)]
+    indexes = cache._db.execute("PRAGMA index_list(responses)").fetchall()
+    assert any(index[1] == "responses_accessed_at" for index in indexes)
+
+
+@pytest.fixture
+def patched_registry(stub_llm_config):
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        yield stub_llm_config
+
+
+def test_service_serves_repeated_requests_from_cache(stub_server, patched_registry):
+    """Test that identical requests only reach the server once."""
+    llm_service = LLMService(cache=ResponseCache())
+    messages = [{"role": "user", "content": "Hello"}]
+
+    first = llm_service.send_llm_requests([("stub-model", messages)])[0]
+    second = llm_service.send_llm_requests([("stub-model", messages)])[0]
+
+    assert first.content == second.content == "Stub response."
+    assert not first.cached
+    assert second.cached
+    assert len(stub_server.requests) == 1
+
+
+def test_service_cache_opt_out(stub_server, patched_registry):
+    """Test that models with cache_responses=False bypass the cache."""
+    patched_registry.cache_responses = False
+    llm_service = LLMService(cache=ResponseCache())
+    messages = [{"role": "user", "content": "Hello"}]
+
+    llm_service.send_llm_request("stub-model", messages)
+    llm_service.send_llm_request("stub-model", messages)
+
+    assert len(stub_server.requests) == 2
@@ -0,0 +1,242 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.async_service import AsyncLLMService
+from src.llm.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerPolicy,
+    CircuitState,
+    is_provider_failure,
+)
+from src.llm.rate_limit import RetryPolicy
+from src.llm.service import LLMService
+from src.models.llm_response import LLMResponse
+
+
+class FakeClock:
+    """Stand-in for `time.monotonic` that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Fixture freezing the circuit breakers' clock."""
+    fake = FakeClock()
+    with patch("src.llm.circuit_breaker.time.monotonic", fake):
+        yield fake
+
+
+def test_is_provider_failure():
+    """Test that only transport, throttling and server errors count."""
+    assert not is_provider_failure(LLMResponse(model_name="m", content="ok"))
+    assert is_provider_failure(LLMResponse(model_name="m", error="timed out"))
+    assert is_provider_failure(LLMResponse(model_name="m", error="e", status_code=503))
+    assert is_provider_failure(LLMResponse(model_name="m", error="e", status_code=429))
+    assert not is_provider_failure(
+        LLMResponse(model_name="m", error="e", status_code=400)
+    )
+    assert not is_provider_failure(
+        LLMResponse(model_name="m", error="Deadline exceeded", deadline_exceeded=True)
+    )
+
+
+def test_breaker_opens_on_failure_rate_and_recovers(clock):
+    """Test closed -> open -> half-open -> closed transitions."""
+    breaker = CircuitBreaker(window=4, min_requests=4, open_seconds=10)
+    for failed in (False, True, False):
+        assert breaker.allow()
+        breaker.record(failed, 0.1)
+    assert breaker.snapshot().state == CircuitState.CLOSED
+
+    breaker.record(True, 0.1)
+    assert breaker.snapshot().state == CircuitState.OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot().retry_in == 10
+
+    clock.now += 10
+    assert breaker.allow()
+    assert not breaker.allow(), "only one probe is let through"
+    assert breaker.snapshot().state == CircuitState.HALF_OPEN
+    breaker.record(False, 0.1)
+    assert breaker.snapshot().state == CircuitState.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_reopens_on_failed_probe(clock):
+    """Test that a failed half-open probe opens the circuit again."""
+    breaker = CircuitBreaker(window=2, min_requests=2, open_seconds=5)
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+    clock.now += 5
+    assert breaker.allow()
+
+    breaker.record(True, 0.1)
+
+    assert breaker.snapshot().state == CircuitState.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_opens_on_slow_requests(clock):
+    """Test that latency above the slow threshold opens the circuit."""
+    breaker = CircuitBreaker(
+        window=4, min_requests=4, slow_call_seconds=1.0, slow_rate_threshold=0.75
+    )
+    for seconds in (0.1, 2.0, 2.0, 2.0):
+        breaker.record(False, seconds)
+
+    assert breaker.snapshot().state == CircuitState.OPEN
+
+
+def test_policy_keys_breakers_by_model_and_endpoint():
+    """Test that each model and endpoint pair has its own breaker."""
+    policy = CircuitBreakerPolicy(min_requests=1, window=1)
+    policy.breaker("a", "http://one").record(True, 0.1)
+
+    assert policy.breaker("a", "http://one") is policy.breaker("a", "http://one")
+    states = {key: s.state for key, s in policy.snapshots().items()}
+    assert states == {("a", "http://one"): CircuitState.OPEN}
+    assert policy.breaker("a", "http://two").allow()
+
+
+@pytest.fixture
+def patched_registry(stub_llm_config):
+    """Fixture resolving every model name to the stub configuration."""
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        side_effect=lambda name: stub_llm_config.model_copy(update={"name": name}),
+    ):
+        yield
+
+
+def test_service_fails_fast_while_open(stub_server, patched_registry):
+    """Test that an open circuit answers without contacting the provider."""
+    stub_server.error_statuses = [500, 500]
+    policy = CircuitBreakerPolicy(window=2, min_requests=2)
+    llm_service = LLMService(
+        retry_policy=RetryPolicy(max_retries=0),
+        coalesce_requests=False,
+        circuit_breaker=policy,
+    )
+
+    for _ in range(2):
+        assert llm_service.send_llm_requests([("flaky", [])])[0].status_code == 500
+    result = llm_service.send_llm_requests([("flaky", [])])[0]
+
+    assert result.error == "Circuit open for flaky"
+    assert len(stub_server.requests) == 2
+    snapshot = llm_service.circuit_state("flaky")
+    assert snapshot is not None and snapshot.state == CircuitState.OPEN
+
+
+def test_service_diverts_to_fallback_while_open(stub_server, patched_registry):
+    """Test that an open circuit sends requests to the fallback model."""
+    policy = CircuitBreakerPolicy(fallbacks={"flaky": "steady"})
+    policy.breaker("flaky", stub_server.url)._open()
+    llm_service = LLMService(circuit_breaker=policy)
+
+    result = llm_service.send_llm_requests([("flaky", [])])[0]
+
+    assert result.ok and result.model_name == "steady"
+    assert [r["model"] for r in stub_server.requests] == ["steady"]
+
+
+def test_client_errors_do_not_open_the_circuit(stub_server, patched_registry):
+    """Test that rejected requests are not blamed on the provider."""
+    stub_server.error_statuses = [400, 400]
+    policy = CircuitBreakerPolicy(window=2, min_requests=2)
+    llm_service = LLMService(coalesce_requests=False, circuit_breaker=policy)
+
+    for _ in range(2):
+        llm_service.send_llm_requests([("strict", [])])[0]
+
+    assert llm_service.circuit_state("strict").state == CircuitState.CLOSED
+
+
+def test_async_service_fails_fast_while_open(stub_server, patched_registry):
+    """Test that the async service honours an open circuit."""
+    policy = CircuitBreakerPolicy()
+    policy.breaker("flaky", stub_server.url)._open()
+
+    async def run():
+        async with AsyncLLMService(circuit_breaker=policy) as service:
+            return await service.send_llm_request("flaky", [])
+
+    assert asyncio.run(run()) is None
+    assert stub_server.requests == []
+
+
+def test_cancelled_probe_is_released(clock):
+    """Test that a probe cancelled before its outcome lets another through."""
+    breaker = CircuitBreaker(window=1, min_requests=1, open_seconds=1)
+    breaker.record(True, 0.1)
+    clock.now += 1
+    assert breaker.allow()
+
+    breaker.release()
+
+    assert breaker.allow()
+
+
+def test_hung_provider_opens_the_circuit(stub_server, patched_registry):
+    """Test that calls cut by their deadline count as slow, probes too."""
+    stub_server.delay = 2.0
+    policy = CircuitBreakerPolicy(
+        window=2, min_requests=2, open_seconds=0.3, slow_call_seconds=0.15
+    )
+
+    async def run():
+        async with AsyncLLMService(circuit_breaker=policy) as service:
+            for _ in range(2):
+                assert await service.send_llm_request("hung", [], 0.2) is None
+            assert service.circuit_state("hung").state == CircuitState.OPEN
+            await asyncio.sleep(0.3)
+            assert await service.send_llm_request("hung", [], 0.2) is None
+            return service
+
+    service = asyncio.run(run())
+
+    assert service.circuit_state("hung").state == CircuitState.OPEN
+    assert service.metrics.deadline_exceeded.value("hung") == 3
+    assert len(stub_server.requests) == 3
+
+
+def test_tight_deadlines_leave_the_circuit_closed(stub_server, patched_registry):
+    """Test that callers' own short deadlines do not blame a healthy provider."""
+    stub_server.delay = 0.3
+    policy = CircuitBreakerPolicy(window=4, min_requests=2)
+    llm_service = LLMService(
+        retry_policy=RetryPolicy(max_retries=0),
+        coalesce_requests=False,
+        circuit_breaker=policy,
+    )
+
+    for _ in range(2):
+        result = llm_service.send_llm_requests([("slowish", [])], timeout=0.1)[0]
+        assert result.deadline_exceeded
+    assert llm_service.circuit_state("slowish").state == CircuitState.CLOSED
+
+    assert llm_service.send_llm_request("slowish", []) == "Stub response."
+
+
+def test_unsent_probe_is_released(stub_server, patched_registry, clock):
+    """Test that a probe never sent, for want of rate limit, is given back."""
+    policy = CircuitBreakerPolicy(window=1, min_requests=1, open_seconds=10)
+    breaker = policy.breaker("limited", stub_server.url)
+    breaker.record(True, 0.1)
+    clock.now += 10
+    llm_service = LLMService(coalesce_requests=False, circuit_breaker=policy)
+
+    with patch("src.llm.rate_limit.RateLimiter.acquire", return_value=False):
+        result = llm_service.send_llm_requests([("limited", [])])[0]
+
+    assert result.deadline_exceeded
+    assert stub_server.requests == []
+    assert breaker.snapshot().state == CircuitState.HALF_OPEN
+    assert breaker.allow()
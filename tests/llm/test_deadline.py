@@ -0,0 +1,127 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.async_service import AsyncLLMService
+from src.llm.deadline import Deadline
+from src.llm.hedging import HedgePolicy
+from src.llm.scheduler import Priority, RequestScheduler
+from src.llm.service import LLMService
+from src.models.request_timeout import RequestTimeout
+
+
+@pytest.fixture
+def patched_registry(stub_llm_config):
+    """Fixture resolving every model name to the stub configuration."""
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        side_effect=lambda name: stub_llm_config.model_copy(update={"name": name}),
+    ):
+        yield
+
+
+def test_deadline_caps_timeouts_by_time_left():
+    """Test that a total is layered on the defaults and caps each timeout."""
+    deadline = Deadline.start(2, RequestTimeout(connect=5, read=30))
+
+    assert deadline.timeout == RequestTimeout(connect=5, read=30, total=2)
+    connect, read = deadline.limits()
+    assert 1.9 < connect <= 2 and 1.9 < read <= 2
+    assert deadline.allows(1) and not deadline.allows(3)
+    assert not deadline.expired()
+
+
+def test_deadline_without_total_never_expires():
+    """Test that the default timeouts apply unchanged without a total."""
+    deadline = Deadline.start(None, RequestTimeout(connect=5, read=30))
+
+    assert deadline.remaining() is None
+    assert deadline.limits() == (5, 30)
+    assert deadline.allows(3600) and not deadline.expired()
+
+
+def test_expired_deadline_is_not_sent(stub_server, patched_registry):
+    """Test that a call whose deadline already ran out is dropped."""
+    llm_service = LLMService()
+
+    assert llm_service.send_llm_request("stub-model", [], timeout=0) is None
+    assert stub_server.requests == []
+
+
+def test_slow_answer_is_cut_off_at_the_deadline(stub_server, patched_registry):
+    """Test that the read timeout is capped by the time left."""
+    stub_server.delay = 2.0
+    started_at = time.monotonic()
+
+    result = LLMService().send_llm_request("stub-model", [], timeout=0.2)
+
+    assert result is None
+    assert time.monotonic() - started_at < 1.0
+
+
+def test_retry_that_would_miss_the_deadline_is_dropped(stub_server, patched_registry):
+    """Test that a backoff outlasting the deadline ends the call at once."""
+    stub_server.error_statuses = [503]
+    stub_server.error_headers = {"Retry-After": "5"}
+    started_at = time.monotonic()
+
+    result = LLMService().send_llm_requests([("stub-model", [])], timeout=1.0)[0]
+
+    assert result.deadline_exceeded
+    assert len(stub_server.requests) == 1
+    assert time.monotonic() - started_at < 1.0
+
+
+def test_hedged_call_returns_at_the_deadline(stub_server, patched_registry):
+    """Test that a hedged call does not wait past its deadline."""
+    stub_server.delay = 2.0
+    policy = HedgePolicy(backups={"primary": "backup"}, default_delay=0.05)
+    llm_service = LLMService(hedge_policy=policy, coalesce_requests=False)
+    started_at = time.monotonic()
+
+    result = llm_service.send_llm_requests([("primary", [])], timeout=0.3)[0]
+
+    assert not result.ok
+    assert time.monotonic() - started_at < 1.0
+
+
+def test_scheduler_drops_queued_requests_past_their_deadline(
+    stub_server, patched_registry
+):
+    """Test that a request that expires while queued is never sent."""
+    stub_server.delay = 0.3
+    with RequestScheduler(LLMService(), max_workers=1) as scheduler:
+        first = scheduler.submit("stub-model", [{"role": "user", "content": "a"}])
+        late = scheduler.submit(
+            "stub-model", [{"role": "user", "content": "b"}], Priority.BULK, 0.1
+        )
+
+        assert late.result(timeout=1).deadline_exceeded
+        assert first.result(timeout=2).ok
+    assert [r["messages"][0]["content"] for r in stub_server.requests] == ["a"]
+
+
+def test_async_call_is_cancelled_at_the_deadline(stub_server, patched_registry):
+    """Test that the async service aborts the attempt and frees its slot."""
+    stub_server.delay = 2.0
+
+    async def run():
+        async with AsyncLLMService(
+            max_concurrency=1, timeout=RequestTimeout(total=0.2)
+        ) as service:
+            started_at = time.monotonic()
+            result = await service.send_llm_request("stub-model", [])
+            elapsed = time.monotonic() - started_at
+            stub_server.delay = 0
+            follow_up = await service.send_llm_request(
+                "stub-model", [{"role": "user", "content": "again"}], timeout=5
+            )
+            return result, elapsed, follow_up
+
+    result, elapsed, follow_up = asyncio.run(run())
+
+    assert result is None
+    assert elapsed < 1.0
+    assert follow_up == "Stub response."
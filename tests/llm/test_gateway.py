@@ -0,0 +1,217 @@
+import base64
+import http.client
+import json
+import socket
+import socketserver
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.cache import ResponseCache
+from src.llm.gateway import GatewayClient, LLMGateway
+from src.llm.metrics import LLMMetrics
+from src.llm.multimodal import build_image_message
+from src.llm.service import LLMService
+from src.models.llm_response import LLMResponse
+
+
+@pytest.fixture
+def patched_registry(stub_llm_config):
+    """Fixture resolving every model name to the stub configuration."""
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        side_effect=lambda name: stub_llm_config.model_copy(update={"name": name}),
+    ):
+        yield
+
+
+@pytest.fixture
+def gateway(stub_server, patched_registry):
+    """Fixture running a gateway on a free localhost port."""
+    with LLMGateway(LLMService(cache=ResponseCache()), port=0).start() as running:
+        yield running
+
+
+def test_client_sends_through_gateway(gateway, stub_server):
+    """Test that the client answers like LLMService.send_llm_request."""
+    client = GatewayClient(gateway.address)
+    messages = [{"role": "user", "content": "Hello"}]
+
+    assert client.health()
+    assert client.send_llm_request("stub-model", messages) == "Stub response."
+    assert stub_server.requests[0]["messages"] == messages
+
+
+def test_clients_share_the_gateway_cache(gateway, stub_server):
+    """Test that separate clients are served from one response cache."""
+    messages = [{"role": "user", "content": "Same prompt"}]
+
+    first = GatewayClient(gateway.address).send("stub-model", messages)
+    second = GatewayClient(gateway.address).send("stub-model", messages)
+
+    assert first.ok and not first.cached
+    assert second.cached
+    assert len(stub_server.requests) == 1
+
+
+def test_client_reuses_one_connection(gateway):
+    """Test that a client keeps its connection to the gateway alive."""
+    client = GatewayClient(gateway.address)
+    client.send_llm_request("stub-model", [{"role": "user", "content": "a"}])
+    connection = client._local.connection
+
+    client.send_llm_request("stub-model", [{"role": "user", "content": "b"}])
+
+    assert client._local.connection is connection
+
+
+def test_gateway_returns_errors_and_rejects_bad_requests(gateway, stub_server):
+    """Test that provider errors pass through and invalid bodies get a 400."""
+    stub_server.error_statuses = [400]
+    result = GatewayClient(gateway.address).send("stub-model", [])
+    assert result.error and result.status_code == 400
+
+    host, port = gateway.address.removeprefix("http://").split(":")
+    connection = http.client.HTTPConnection(host, int(port))
+    connection.request("POST", "/v1/requests", body=json.dumps({"messages": []}))
+    response = connection.getresponse()
+    assert response.status == 400
+    assert "model_name" in json.loads(response.read())["error"]
+
+
+def test_gateway_over_unix_socket(stub_server, patched_registry, tmp_path):
+    """Test that the gateway serves clients on a Unix socket."""
+    socket_path = str(tmp_path / "gateway.sock")
+    with LLMGateway(socket_path=socket_path).start() as gateway:
+        client = GatewayClient(gateway.address)
+        results = client.send_llm_requests(
+            [("stub-model", [{"role": "user", "content": str(i)}]) for i in range(4)]
+        )
+    assert [r.content for r in results] == ["Stub response."] * 4
+    assert not (tmp_path / "gateway.sock").exists()
+
+
+def test_unreachable_gateway_is_an_error_response(tmp_path):
+    """Test that a missing gateway does not raise."""
+    client = GatewayClient(f"unix://{tmp_path / 'missing.sock'}")
+
+    assert not client.health()
+    result = client.send("stub-model", [])
+    assert result.error is not None and result.error.startswith("Gateway error")
+
+
+def test_client_sends_images_as_data_urls(gateway, stub_server):
+    """Test that ImageSources are encoded for the gateway instead of failing."""
+    image = b"\x89PNG\r\n\x1a\n" + bytes(range(64))
+    message = build_image_message("What is this?", [image])
+
+    result = GatewayClient(gateway.address).send("stub-model", [message])
+
+    assert result.ok
+    url = stub_server.requests[0]["messages"][0]["content"][1]["image_url"]["url"]
+    assert url == f"data:image/png;base64,{base64.b64encode(image).decode()}"
+
+
+def test_unserialisable_messages_are_an_error_response(gateway, stub_server):
+    """Test that a message JSON cannot represent does not raise."""
+    messages = [{"role": "user", "content": object()}]
+
+    result = GatewayClient(gateway.address).send("stub-model", messages)
+
+    assert result.error is not None
+    assert stub_server.requests == []
+
+
+def test_metrics_come_from_the_gateway_service(stub_server, patched_registry):
+    """Test that /metrics renders the metrics of the service it runs."""
+    metrics = LLMMetrics()
+    llm_service = LLMService(metrics=metrics)
+    with LLMGateway(llm_service, port=0).start() as gateway:
+        GatewayClient(gateway.address).send_llm_request("metered", [])
+        host, port = gateway.address.removeprefix("http://").split(":")
+        connection = http.client.HTTPConnection(host, int(port))
+        connection.request("GET", "/metrics")
+        body = connection.getresponse().read().decode()
+
+    assert body == metrics.render()
+    assert 'model="metered"' in body
+
+
+class _ScriptedHandler(socketserver.StreamRequestHandler):
+    """Answers requests as scripted: keep the connection, close it or drop."""
+
+    def handle(self):
+        while self.server.script:
+            headers = b""
+            while not headers.endswith(b"\r\n\r\n"):
+                headers += self.rfile.read(1)
+            length = int(headers.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            self.rfile.read(length)
+            self.server.received += 1
+            action = self.server.script.pop(0)
+            if action == "drop":
+                return
+            body = LLMResponse(model_name="m", content="ok").model_dump_json()
+            self.wfile.write(
+                b"HTTP/1.1 200 OK\r\nContent-Length: "
+                + str(len(body)).encode()
+                + b"\r\n\r\n"
+                + body.encode()
+            )
+            if action == "close":
+                return
+
+
+@pytest.fixture
+def scripted_server():
+    """Fixture serving requests as its `script` of actions says."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _ScriptedHandler)
+    server.daemon_threads = True
+    server.received = 0
+    server.script = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_replaces_a_connection_the_gateway_closed(scripted_server):
+    """Test that a stale kept-alive connection is dropped before sending."""
+    scripted_server.script = ["close", "close"]
+    host, port = scripted_server.server_address
+    client = GatewayClient(f"http://{host}:{port}")
+
+    assert client.send("m", []).content == "ok"
+    time.sleep(0.05)
+    assert client.send("m", []).content == "ok"
+    assert scripted_server.received == 2
+
+
+def test_client_does_not_resend_a_request_the_gateway_read(scripted_server):
+    """Test that a request dropped after it was sent is not sent twice."""
+    scripted_server.script = ["keep", "drop", "close"]
+    host, port = scripted_server.server_address
+    client = GatewayClient(f"http://{host}:{port}")
+
+    assert client.send("m", []).content == "ok"
+    result = client.send("m", [])
+
+    assert result.error is not None and result.error.startswith("Gateway error")
+    assert scripted_server.received == 2
+
+
+def test_gateway_requires_a_valid_content_length(gateway):
+    """Test that a missing or invalid Content-Length is an error, not a crash."""
+    host, port = gateway.address.removeprefix("http://").split(":")
+    statuses = []
+    for header in (b"", b"Content-Length: lots\r\n", b"Content-Length: -1\r\n"):
+        with socket.create_connection((host, int(port))) as sock:
+            sock.sendall(
+                b"POST /v1/requests HTTP/1.1\r\nHost: x\r\n" + header + b"\r\n"
+            )
+            response = sock.makefile("rb")
+            statuses.append(int(response.readline().split()[1]))
+
+    assert statuses == [411, 400, 400]
@@ -0,0 +1,125 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.async_service import AsyncLLMService
+from src.llm.hedging import HedgePolicy, LatencyTracker
+from src.llm.service import LLMService
+
+
+def test_latency_tracker_percentile_and_window():
+    """Test nearest-rank percentiles over a bounded window."""
+    tracker = LatencyTracker(window=10)
+    for latency in range(1, 21):
+        tracker.record("model", float(latency))
+
+    assert tracker.count("model") == 10
+    assert tracker.percentile("model", 50) == 15
+    assert tracker.percentile("model", 100) == 20
+    assert tracker.percentile("other", 50) is None
+
+
+def test_hedge_delay_uses_default_until_enough_samples():
+    """Test that the percentile only drives the delay after min_samples."""
+    policy = HedgePolicy(backups={"a": "b"}, min_samples=5, default_delay=3)
+    for _ in range(4):
+        policy.tracker.record("a", 0.5)
+    assert policy.hedge_delay("a") == 3
+    policy.tracker.record("a", 0.5)
+    assert policy.hedge_delay("a") == 0.5
+
+
+def test_hedge_stats_rate():
+    """Test that outcomes are counted per primary model."""
+    policy = HedgePolicy(backups={"a": "b"})
+    policy.record_outcome("a", hedged=False, backup_won=False)
+    policy.record_outcome("a", hedged=True, backup_won=True)
+    policy.record_outcome("a", hedged=True, backup_won=None)
+
+    stats = policy.stats("a")
+    assert stats.requests == 3
+    assert stats.hedged == 2
+    assert stats.primary_wins == 1
+    assert stats.backup_wins == 1
+    assert stats.failures == 1
+
+
+@pytest.fixture
+def two_models(stub_server, stub_llm_config):
+    """Fixture registering a primary and a backup model on the stand-in."""
+    configs = {
+        "primary": stub_llm_config.model_copy(update={"name": "primary-model"}),
+        "backup": stub_llm_config.model_copy(update={"name": "backup-model"}),
+    }
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        side_effect=configs.__getitem__,
+    ):
+        yield stub_server
+
+
+def test_service_hedges_slow_primary(two_models):
+    """Test that a slow primary is beaten by the hedged backup."""
+    two_models.model_delays = {"primary-model": 1.0}
+    policy = HedgePolicy(backups={"primary": "backup"}, default_delay=0.05)
+    llm_service = LLMService(hedge_policy=policy, coalesce_requests=False)
+
+    result = llm_service.send_llm_requests([("primary", [])])[0]
+
+    assert result.ok
+    assert result.model_name == "backup"
+    assert policy.stats("primary").backup_wins == 1
+    assert policy.stats("primary").hedged == 1
+
+
+def test_service_does_not_hedge_fast_primary(two_models):
+    """Test that a primary answering within the delay is not hedged."""
+    policy = HedgePolicy(backups={"primary": "backup"}, default_delay=1.0)
+    llm_service = LLMService(hedge_policy=policy)
+
+    result = llm_service.send_llm_requests([("primary", [])])[0]
+
+    assert result.model_name == "primary"
+    assert [r["model"] for r in two_models.requests] == ["primary-model"]
+    assert policy.stats("primary").hedge_rate == 0
+    assert policy.tracker.count("primary") == 1
+
+
+def test_time_queued_for_a_thread_does_not_fire_backups(two_models):
+    """Test that the hedge delay counts from when the primary starts."""
+    two_models.model_delays = {"primary-model": 0.3}
+    policy = HedgePolicy(backups={"primary": "backup"}, default_delay=0.5)
+    llm_service = LLMService(
+        hedge_policy=policy, coalesce_requests=False, hedge_workers=4
+    )
+
+    results = llm_service.send_llm_requests([("primary", [])] * 16, max_workers=16)
+
+    assert all(result.model_name == "primary" for result in results)
+    assert policy.stats("primary").hedged == 0
+
+
+def test_failed_hedges_are_not_counted_as_wins(two_models):
+    """Test that a call neither side answers is recorded as a failure."""
+    two_models.error_statuses = [400, 400]
+    policy = HedgePolicy(backups={"primary": "backup"}, default_delay=0.05)
+    llm_service = LLMService(hedge_policy=policy, coalesce_requests=False)
+
+    assert not llm_service.send_llm_requests([("primary", [])])[0].ok
+
+    stats = policy.stats("primary")
+    assert (stats.primary_wins, stats.backup_wins, stats.failures) == (0, 0, 1)
+
+
+def test_async_service_hedges_slow_primary(two_models):
+    """Test async hedging returns the backup and cancels the slow primary."""
+    two_models.model_delays = {"primary-model": 1.0}
+    policy = HedgePolicy(backups={"primary": "backup"}, default_delay=0.05)
+
+    async def run():
+        async with AsyncLLMService(hedge_policy=policy) as service:
+            return await service.send_llm_request("primary", [])
+
+    assert asyncio.run(run()) == "Stub response."
+    assert policy.stats("primary").backup_wins == 1
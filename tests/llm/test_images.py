@@ -0,0 +1,130 @@
+import io
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.images import ImagePreprocessor, _tile_boxes, process_image
+from src.llm.multimodal import ImageSource
+from src.models.image_preset import ImagePreset
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _decoded_size(source: ImageSource) -> tuple[int, int]:
+    with source._buffer() as buffer:
+        return Image.open(io.BytesIO(bytes(buffer))).size
+
+
+@pytest.fixture
+def preprocessor(tmp_path):
+    """Fixture preparing images on threads with a cache under tmp_path."""
+    with ThreadPoolExecutor() as executor:
+        yield ImagePreprocessor(cache_dir=tmp_path / "cache", executor=executor)
+
+
+def test_tile_boxes_cover_image_with_overlap():
+    """Test that tiles cover every pixel and never exceed the tile size."""
+    boxes = _tile_boxes(3000, 1000, tile_size=1200, overlap=100)
+
+    assert len(boxes) == 3
+    assert all(r - left <= 1200 and b - t <= 1200 for left, t, r, b in boxes)
+    assert boxes[0][0] == 0
+    assert boxes[-1][2] == 3000
+    assert boxes[1][0] < boxes[0][2]
+    assert _tile_boxes(500, 400, tile_size=1200, overlap=100) == [(0, 0, 500, 400)]
+
+
+def test_prepare_downscales_and_recompresses(preprocessor):
+    """Test that large pages shrink to max_side and small ones are kept."""
+    preset = ImagePreset(max_side=1000, format="JPEG", quality=70)
+
+    large, small = preprocessor.prepare([_png(4000, 3000), _png(300, 200)], preset)
+
+    assert [_decoded_size(s) for s in large] == [(1000, 750)]
+    assert [_decoded_size(s) for s in small] == [(300, 200)]
+    assert large[0].mime_type == "image/jpeg"
+
+
+def test_prepare_tiles_dense_pages(preprocessor):
+    """Test that a tile size splits the resized page into tiles."""
+    preset = ImagePreset(max_side=2000, tile_size=1000, tile_overlap=0)
+
+    (tiles,) = preprocessor.prepare([_png(2000, 2000)], preset)
+
+    assert [_decoded_size(t) for t in tiles] == [(1000, 1000)] * 4
+
+
+def test_prepare_reuses_cached_results(tmp_path):
+    """Test that a second run is served from the content-hashed cache."""
+    page = tmp_path / "page.png"
+    page.write_bytes(_png(1200, 800))
+    preset = ImagePreset(max_side=600)
+    with (
+        ThreadPoolExecutor() as executor,
+        patch("src.llm.images.process_image", wraps=process_image) as mock_process,
+    ):
+        preprocessor = ImagePreprocessor(
+            cache_dir=tmp_path / "cache", executor=executor
+        )
+        (first,) = preprocessor.prepare([page], preset)
+        (second,) = preprocessor.prepare([page], preset)
+        assert mock_process.call_count == 1
+
+        preprocessor.prepare([page], ImagePreset(max_side=300))
+        assert mock_process.call_count == 2
+
+    assert isinstance(second[0].source, Path)
+    assert second[0].sha256() == first[0].sha256()
+    assert _decoded_size(second[0]) == (600, 400)
+
+
+def test_prepare_without_cache_keeps_results_in_memory():
+    """Test preparing images without a cache directory."""
+    with ThreadPoolExecutor() as executor:
+        preprocessor = ImagePreprocessor(executor=executor)
+        (prepared,) = preprocessor.prepare([_png(800, 800)], ImagePreset(max_side=400))
+
+    assert isinstance(prepared[0].source, memoryview)
+    assert _decoded_size(prepared[0]) == (400, 400)
+
+
+def test_build_message_uses_model_preset(preprocessor):
+    """Test that models get their own preset and unknown presets pass through."""
+    page = _png(4000, 4000)
+
+    mini = preprocessor.build_message("gpt-4.1-mini", "Prices?", [page])
+    full = preprocessor.build_message("gpt-4.1", "Prices?", [page])
+    raw = preprocessor.prepare_for_model("gemini-flash-2.5", [page])
+
+    mini_images = [p["image_url"]["url"] for p in mini["content"][1:]]
+    full_images = [p["image_url"]["url"] for p in full["content"][1:]]
+    assert [_decoded_size(s) for s in mini_images] == [(1536, 1536)]
+    assert [_decoded_size(s) for s in full_images] == [(1600, 1600)] * 4
+    assert bytes(raw[0][0].source) == page
+
+
+def test_process_pool_end_to_end(tmp_path):
+    """Test the default process pool with file inputs."""
+    page = tmp_path / "page.png"
+    page.write_bytes(_png(900, 300))
+    with ImagePreprocessor(max_workers=2) as preprocessor:
+        (prepared,) = preprocessor.prepare([page], ImagePreset(max_side=300))
+
+    assert _decoded_size(prepared[0]) == (300, 100)
+
+
+def test_missing_pillow_raises_helpful_error():
+    """Test that a missing optional dependency is reported on construction."""
+    with (
+        patch("src.llm.images.find_spec", return_value=None),
+        pytest.raises(ImportError, match="ai-starter\\[images\\]"),
+    ):
+        ImagePreprocessor()
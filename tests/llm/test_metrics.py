@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+import requests
+
+from src.llm.metrics import LLMMetrics, MetricsRegistry
+from src.llm.service import LLMService
+from src.llm.transport import HTTPTransport
+
+
+def test_counter_renders_labels_and_escapes_values():
+    """Test that counters render one line per label set with escaped values."""
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "Calls.", ("model",))
+    counter.inc('a"b')
+    counter.inc('a"b', amount=2)
+
+    assert counter.value('a"b') == 3
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP calls_total Calls.", "# TYPE calls_total counter"]
+    assert 'calls_total{model="a\\"b"} 3.0' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test that histogram buckets count every observation at or below them."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    output = registry.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in output
+    assert 'latency_seconds_bucket{le="1.0"} 2' in output
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in output
+    assert "latency_seconds_sum 5.55" in output
+    assert "latency_seconds_count 3" in output
+    assert histogram.count() == 3
+
+
+def test_write_to_file(tmp_path):
+    """Test that metrics can be written for the textfile collector."""
+    registry = MetricsRegistry()
+    registry.counter("writes_total", "Writes.").inc()
+    path = tmp_path / "llm.prom"
+
+    registry.write_to_file(str(path))
+
+    assert path.read_text() == registry.render()
+    assert [p.name for p in tmp_path.iterdir()] == ["llm.prom"]
+
+
+def test_http_server_serves_metrics():
+    """Test that the exporter serves the metrics on /metrics only."""
+    registry = MetricsRegistry()
+    registry.counter("served_total", "Served.").inc()
+    server = registry.start_http_server(0)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        response = requests.get(f"{base_url}/metrics", timeout=5)
+        assert response.status_code == 200
+        assert "served_total 1.0" in response.text
+        assert requests.get(f"{base_url}/other", timeout=5).status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_service_records_request_breakdown(stub_server, stub_llm_config):
+    """Test that a request records every phase of the hot path and usage."""
+    metrics = LLMMetrics()
+    llm_service = LLMService(metrics=metrics)
+    messages = [{"role": "user", "content": "Hello"}]
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        for _ in range(2):
+            llm_service.send_llm_request("stub-model", messages)
+
+    for histogram in (
+        metrics.payload_build_seconds,
+        metrics.connect_seconds,
+        metrics.time_to_first_byte_seconds,
+        metrics.download_seconds,
+        metrics.json_decode_seconds,
+        metrics.request_seconds,
+    ):
+        assert histogram.count("stub-model") == 2
+    assert metrics.requests.value("stub-model", "ok") == 2
+    assert metrics.tokens.value("stub-model", "prompt") == 10
+    assert metrics.tokens.value("stub-model", "completion") == 6
+    assert metrics.cost.value("stub-model") == 0.0002
+
+
+def test_transport_reports_connect_time_only_for_new_connections(stub_server):
+    """Test that connect time is measured on a new connection and 0 on reuse."""
+    transport = HTTPTransport()
+    transport.post(stub_server.url, json={"messages": []}, timeout=5)
+    assert transport.last_connect_seconds > 0
+
+    transport.post(stub_server.url, json={"messages": []}, timeout=5)
+    assert transport.last_connect_seconds == 0
+    transport.close()
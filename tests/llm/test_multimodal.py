@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import json
+import os
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.async_service import AsyncLLMService
+from src.llm.cache import payload_cache_key
+from src.llm.multimodal import (
+    ImageSource,
+    StreamingJSONBody,
+    build_image_message,
+    contains_images,
+)
+from src.llm.service import LLMService
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+def _data_url(data: bytes, mime_type: str = "image/png") -> str:
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
+
+
+@pytest.fixture
+def patched_registry(stub_llm_config):
+    """Fixture routing every model name to the local stand-in server."""
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        yield
+
+
+def test_image_source_encodes_in_chunks():
+    """Test that chunked encoding matches one-shot base64 for any chunk size."""
+    source = ImageSource(data=PNG)
+    for chunk_size in (1, 5, 300, 10_000):
+        chunks = list(source.iter_data_url(chunk_size))
+        assert b"".join(chunks).decode() == _data_url(PNG)
+    assert len(source) == len(_data_url(PNG))
+
+
+def test_image_source_from_file_guesses_mime_type(tmp_path):
+    """Test file-backed sources by suffix, falling back to the image header."""
+    jpeg = tmp_path / "page.jpg"
+    jpeg.write_bytes(b"\xff\xd8\xff" + b"\x00" * 10)
+    unnamed = tmp_path / "page"
+    unnamed.write_bytes(PNG)
+    empty = tmp_path / "empty.png"
+    empty.write_bytes(b"")
+
+    assert ImageSource(path=jpeg).mime_type == "image/jpeg"
+    assert ImageSource(path=unnamed).mime_type == "image/png"
+    assert b"".join(ImageSource(path=unnamed).iter_data_url()).decode() == (
+        _data_url(PNG)
+    )
+    assert b"".join(ImageSource(path=empty).iter_data_url()) == (
+        b"data:image/png;base64,"
+    )
+    with pytest.raises(ValueError):
+        ImageSource()
+
+
+def test_streaming_body_matches_materialised_json():
+    """Test that the streamed body is the JSON of the materialised payload."""
+    message = build_image_message("Read the prices", [PNG, PNG], detail="high")
+    payload = {"model": "m", "messages": [message], "note": "pretend 0:1"}
+    body = StreamingJSONBody(payload, chunk_size=64)
+
+    encoded = b"".join(body)
+    decoded = json.loads(encoded)
+    parts = decoded["messages"][0]["content"]
+    assert parts[0] == {"type": "text", "text": "Read the prices"}
+    assert parts[1]["image_url"] == {"url": _data_url(PNG), "detail": "high"}
+    assert decoded["note"] == "pretend 0:1"
+    assert len(body) == len(encoded)
+    assert b"".join(body) == encoded
+
+
+def test_contains_images_and_cache_key():
+    """Test image detection and that cache keys hash image contents."""
+    plain = [{"role": "user", "content": "Hello"}]
+    with_image = [build_image_message(None, [PNG])]
+    assert not contains_images(plain)
+    assert contains_images(with_image)
+
+    key = payload_cache_key({"messages": with_image})
+    assert key == payload_cache_key({"messages": [build_image_message(None, [PNG])]})
+    assert key != payload_cache_key(
+        {"messages": [build_image_message(None, [PNG + b"\x00"])]}
+    )
+
+
+def test_streaming_large_file_keeps_memory_flat(tmp_path):
+    """Test that encoding an 8 MB page never holds more than a few chunks."""
+    page = tmp_path / "page.png"
+    page.write_bytes(os.urandom(8 * 1024 * 1024))
+    body = StreamingJSONBody({"messages": [build_image_message("Hi", [page])]})
+
+    tracemalloc.start()
+    try:
+        total = sum(len(chunk) for chunk in body)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert total == len(body)
+    assert peak < 2 * 1024 * 1024
+
+
+def test_service_streams_image_payload(stub_server, patched_registry, tmp_path):
+    """Test that the sync service sends images with a Content-Length body."""
+    page = tmp_path / "page.png"
+    page.write_bytes(PNG)
+    messages = [build_image_message("Read the prices", [page])]
+
+    content = LLMService().send_llm_request("stub-model", messages)
+
+    assert content == "Stub response."
+    parts = stub_server.requests[0]["messages"][0]["content"]
+    assert parts[1]["image_url"]["url"] == _data_url(PNG)
+
+
+def test_async_service_streams_image_payload(stub_server, patched_registry):
+    """Test that the async service sends images with a Content-Length body."""
+    messages = [build_image_message("Read the prices", [PNG])]
+
+    async def run():
+        async with AsyncLLMService() as service:
+            return await service.send_llm_request("stub-model", messages)
+
+    assert asyncio.run(run()) == "Stub response."
+    parts = stub_server.requests[0]["messages"][0]["content"]
+    assert parts[1]["image_url"]["url"] == _data_url(PNG)
@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+from src.llm.metrics import LLMMetrics
+from src.llm.prompt_cache import (
+    apply_cache_hints,
+    cached_prompt_tokens,
+    mark_cacheable,
+)
+from src.llm.registry import LLMRegistry
+from src.llm.service import LLMService
+from src.models.llm_config import LLMConfig
+
+SYSTEM_PROMPT = "You extract discounts from catalog pages. " * 50
+
+
+def _config(**fields) -> LLMConfig:
+    return LLMConfig(name="m", provider="p", **fields)
+
+
+def test_unmarked_messages_pass_through_unchanged():
+    """Test that nothing is copied when no message is marked."""
+    messages = [{"role": "user", "content": "Hello"}]
+    assert apply_cache_hints(messages, _config(prompt_caching="cache_control")) is (
+        messages
+    )
+
+
+def test_cache_control_breakpoints_on_latest_marked_messages():
+    """Test that only the most recent marked messages get breakpoints."""
+    messages = [
+        mark_cacheable({"role": "system", "content": "rules"}),
+        mark_cacheable({"role": "user", "content": "examples"}),
+        {"role": "user", "content": "question"},
+    ]
+    config = _config(prompt_caching="cache_control", max_cache_breakpoints=1)
+
+    prepared = apply_cache_hints(messages, config)
+
+    assert prepared[0] == {"role": "system", "content": "rules"}
+    assert prepared[1] == {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": "examples", "cache_control": {"type": "ephemeral"}}
+        ],
+    }
+    assert prepared[2] is messages[2]
+    assert "cacheable" in messages[0]
+
+
+def test_cache_control_on_last_part_of_multipart_message():
+    """Test that list content gets the breakpoint on its last part only."""
+    parts = [{"type": "text", "text": "a"}, {"type": "text", "text": "b"}]
+    message = mark_cacheable({"role": "user", "content": parts})
+
+    (prepared,) = apply_cache_hints([message], _config(prompt_caching="cache_control"))
+
+    assert "cache_control" not in prepared["content"][0]
+    assert prepared["content"][1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in parts[1]
+
+
+def test_automatic_caching_only_strips_markers():
+    """Test that providers caching on their own get no hints."""
+    message = mark_cacheable({"role": "system", "content": "rules"})
+    for config in (_config(prompt_caching="automatic"), _config()):
+        assert apply_cache_hints([message], config) == [
+            {"role": "system", "content": "rules"}
+        ]
+
+
+def test_cached_prompt_tokens():
+    """Test parsing cached-token counts from the supported usage shapes."""
+    assert cached_prompt_tokens(None) is None
+    assert cached_prompt_tokens({"prompt_tokens": 10}) is None
+    assert cached_prompt_tokens({"prompt_tokens_details": {"cached_tokens": 7}}) == 7
+    assert cached_prompt_tokens({"cache_read_input_tokens": 3}) == 3
+
+
+def test_registry_prompt_caching_flags():
+    """Test that registry models declare how their provider caches prompts."""
+    assert LLMRegistry.get_model_config("gpt-4.1").prompt_caching == "automatic"
+    gemini = LLMRegistry.get_model_config("gemini-flash-2.5")
+    assert gemini.prompt_caching == "cache_control"
+    assert gemini.max_cache_breakpoints == 1
+
+
+def test_service_reports_prompt_cache_hit_rate(stub_server, stub_llm_config):
+    """Test that repeated prefixes hit the stand-in's cache and are reported."""
+    config = stub_llm_config.model_copy(update={"prompt_caching": "cache_control"})
+    metrics = LLMMetrics()
+    llm_service = LLMService(metrics=metrics)
+    with patch("src.llm.registry.LLMRegistry.get_model_config", return_value=config):
+        for question in ("Page 1?", "Page 2?", "Page 3?"):
+            messages = [
+                mark_cacheable({"role": "system", "content": SYSTEM_PROMPT}),
+                {"role": "user", "content": question},
+            ]
+            assert llm_service.send_llm_request("stub-model", messages)
+
+    sent = stub_server.requests[0]["messages"]
+    assert sent[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert "cacheable" not in sent[0]
+    hit_rate = metrics.prompt_cache_hit_rate("stub-model")
+    assert hit_rate is not None and 0.5 < hit_rate < 1
+    stats = LLMRegistry.get_model_stats("stub-model")
+    assert stats.prompt_cache_hit_rate == hit_rate
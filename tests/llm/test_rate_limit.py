@@ -0,0 +1,229 @@
+import asyncio
+import time
+from email.utils import formatdate
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.llm.async_service import AsyncLLMService
+from src.llm.rate_limit import (
+    RateLimiter,
+    RateLimiterRegistry,
+    RetryPolicy,
+    TokenBucket,
+    parse_reset_header,
+    parse_retry_after,
+)
+from src.llm.service import LLMService
+from src.models.llm_config import LLMConfig
+
+
+def test_token_bucket_takes_until_empty():
+    """Test that a bucket grants its capacity, then reports the wait."""
+    bucket = TokenBucket(capacity=2, refill_per_second=1)
+    assert bucket.try_take(1) == 0
+    assert bucket.try_take(1) == 0
+    assert bucket.try_take(1) == pytest.approx(1, abs=0.01)
+
+
+def test_token_bucket_caps_oversized_requests_and_gives_back():
+    """Test oversized requests wait for a full bucket and unused tokens return."""
+    bucket = TokenBucket(capacity=10, refill_per_second=1)
+    assert bucket.try_take(50) == 0
+    assert bucket.try_take(5) > 0
+    bucket.give_back(5)
+    assert bucket.try_take(5) == 0
+
+
+def test_unlimited_bucket_never_waits():
+    """Test that a bucket without capacity never limits."""
+    bucket = TokenBucket(capacity=None, refill_per_second=0)
+    assert all(bucket.try_take(1000) == 0 for _ in range(100))
+
+
+def test_rate_limiter_enforces_requests_per_minute():
+    """Test that the request budget limits try_acquire."""
+    limiter = RateLimiter(requests_per_minute=2)
+    assert limiter.try_acquire(100) == 0
+    assert limiter.try_acquire(100) == 0
+    assert limiter.try_acquire(100) > 0
+
+
+def test_rate_limiter_token_shortfall_returns_request():
+    """Test that a token-limited acquire does not consume the request budget."""
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=100)
+    assert limiter.try_acquire(100) == 0
+    assert limiter.try_acquire(100) > 0
+    limiter.settle(reserved_tokens=100, used_tokens=10)
+    assert limiter.try_acquire(50) == 0
+
+
+def test_rate_limiter_release_returns_whole_reservation():
+    """Test that releasing an unused reservation frees request and tokens."""
+    limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=100)
+    assert limiter.try_acquire(100) == 0
+    limiter.release(100)
+    assert limiter.try_acquire(100) == 0
+
+
+def test_rate_limiter_pause_and_headers():
+    """Test that pauses and exhausted rate-limit headers block acquisition."""
+    limiter = RateLimiter()
+    limiter.update_from_headers(
+        {"x-ratelimit-remaining": "5", "x-ratelimit-reset": "10"}
+    )
+    assert limiter.try_acquire(1) == 0
+
+    limiter.update_from_headers(
+        {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"}
+    )
+    assert 1.9 < limiter.try_acquire(1) <= 2
+
+
+def test_rate_limiter_registry_shares_by_provider_and_key():
+    """Test that models on the same provider and key share one limiter."""
+    first = LLMConfig(name="a", provider="openai", requests_per_minute=10)
+    second = LLMConfig(name="b", provider="openai")
+    other = LLMConfig(name="c", provider="google")
+
+    limiter = RateLimiterRegistry.get_rate_limiter(first)
+    assert RateLimiterRegistry.get_rate_limiter(second) is limiter
+    assert RateLimiterRegistry.get_rate_limiter(other) is not limiter
+    assert limiter.requests.capacity == 10
+
+
+def test_parse_retry_after():
+    """Test Retry-After parsing in seconds and HTTP-date form."""
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    date = formatdate(time.time() + 30, usegmt=True)
+    assert 28 < parse_retry_after(date) <= 30
+
+
+def test_parse_reset_header():
+    """Test parsing of duration, seconds and epoch reset headers."""
+    assert parse_reset_header("6m0s") == 360
+    assert parse_reset_header("250ms") == pytest.approx(0.25)
+    assert parse_reset_header("12") == 12
+    assert 9 < parse_reset_header(str(int((time.time() + 10) * 1000))) <= 10
+    assert parse_reset_header("never") is None
+
+
+def test_retry_policy_backoff_and_retry_after():
+    """Test jittered backoff bounds and preference for Retry-After."""
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    for attempt in range(6):
+        assert 0 <= policy.backoff(attempt) <= min(5, 2**attempt)
+    assert policy.delay(0, {"retry-after": "2"}) == 2
+    assert policy.delay(0, {"retry-after": "100"}) == 5
+
+
+@pytest.fixture
+def patched_registry(stub_llm_config):
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        yield stub_llm_config
+
+
+def test_service_retries_after_429_and_pauses_limiter(stub_server, patched_registry):
+    """Test that a 429 is retried after Retry-After and pauses the key."""
+    stub_server.error_statuses = [429]
+    stub_server.error_headers = {"Retry-After": "0.1"}
+    start = time.monotonic()
+
+    result = LLMService().send_llm_request("stub-model", [])
+
+    assert result == "Stub response."
+    assert len(stub_server.requests) == 2
+    assert time.monotonic() - start >= 0.1
+
+
+def test_service_retries_server_errors_until_exhausted(stub_server, patched_registry):
+    """Test that transient errors are retried at most max_retries times."""
+    stub_server.error_statuses = [503, 502, 500]
+    llm_service = LLMService(retry_policy=RetryPolicy(max_retries=2, base_delay=0.01))
+
+    assert llm_service.send_llm_request("stub-model", []) is None
+    assert len(stub_server.requests) == 3
+
+
+def test_service_does_not_retry_client_errors(stub_server, patched_registry):
+    """Test that non-retryable statuses fail immediately."""
+    stub_server.error_statuses = [400]
+
+    assert LLMService().send_llm_request("stub-model", []) is None
+    assert len(stub_server.requests) == 1
+
+
+def test_failed_connections_return_their_reservation(patched_registry):
+    """Test that both services settle a failed attempt as using no tokens."""
+    patched_registry.endpoint = "http://127.0.0.1:1/unreachable"
+    limiter = MagicMock()
+    limiter.acquire.return_value = True
+    limiter.acquire_async = AsyncMock(return_value=True)
+    policy = RetryPolicy(max_retries=2, base_delay=0.01)
+
+    async def send_async():
+        async with AsyncLLMService(retry_policy=policy) as service:
+            return await service.send_llm_request("stub-model", [])
+
+    with patch(
+        "src.llm.rate_limit.RateLimiterRegistry.get_rate_limiter",
+        return_value=limiter,
+    ):
+        assert (
+            LLMService(retry_policy=policy).send_llm_request("stub-model", []) is None
+        )
+        sync_settles = limiter.settle.call_args_list
+        limiter.reset_mock()
+        assert asyncio.run(send_async()) is None
+        async_settles = limiter.settle.call_args_list
+
+    reserved = limiter.acquire_async.call_args.args[0]
+    assert [c.args for c in sync_settles] == [(reserved, 0)] * 3
+    assert [c.args for c in async_settles] == [(reserved, 0)] * 3
+
+
+def test_unexpected_errors_return_their_reservation(patched_registry):
+    """Test that an attempt failing in an unforeseen way settles as unused."""
+    limiter = MagicMock()
+    limiter.acquire.return_value = True
+    llm_service = LLMService()
+
+    with (
+        patch(
+            "src.llm.rate_limit.RateLimiterRegistry.get_rate_limiter",
+            return_value=limiter,
+        ),
+        patch.object(llm_service.transport, "post", side_effect=ValueError("boom")),
+    ):
+        assert llm_service.send_llm_request("stub-model", []) is None
+
+    reserved = limiter.acquire.call_args.args[0]
+    assert [c.args for c in limiter.settle.call_args_list] == [(reserved, 0)]
+
+
+def test_cancelled_async_request_returns_its_reservation(stub_server, patched_registry):
+    """Test that cancelling an in-flight request settles it as unused."""
+    stub_server.delay = 1.0
+    config = patched_registry.model_copy(
+        update={"tokens_per_minute": 6000, "max_tokens": 1000}
+    )
+    limiter = RateLimiterRegistry.get_rate_limiter(config)
+
+    async def cancel():
+        async with AsyncLLMService() as service:
+            task = asyncio.create_task(service.send_llm_request("stub-model", []))
+            while not stub_server.requests:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    with patch("src.llm.registry.LLMRegistry.get_model_config", return_value=config):
+        asyncio.run(cancel())
+
+    assert limiter.tokens.try_take(5900) == 0
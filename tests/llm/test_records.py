@@ -0,0 +1,88 @@
+import json
+from unittest.mock import patch
+
+from pydantic import BaseModel
+
+from src.llm.records import JSONRecordParser, iter_records
+from src.llm.service import LLMService
+
+
+class Discount(BaseModel):
+    product: str
+    percent: float
+
+
+DISCOUNTS = [
+    {"product": 'Cheese "Gouda" {aged}', "percent": 20},
+    {"product": "Milk \\ 1L [fresh]", "percent": 15.5},
+    {"product": "Bread", "percent": 10},
+]
+
+
+def _pieces(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_records_complete_as_their_closing_brace_arrives():
+    """Test that each record is emitted by the delta that closes it."""
+    text = "```json\n" + json.dumps(DISCOUNTS) + "\n```"
+    parser = JSONRecordParser(Discount)
+    closing = len("```json\n[") + len(json.dumps(DISCOUNTS[0]))
+
+    assert parser.feed(text[: closing - 1]) == []
+    assert parser.feed(text[closing - 1 : closing]) == [Discount(**DISCOUNTS[0])]
+    assert parser.feed(text[closing:]) == [Discount(**d) for d in DISCOUNTS[1:]]
+    assert parser.done
+
+
+def test_records_survive_any_split():
+    """Test that escapes, quotes and brackets split across deltas are handled."""
+    text = 'Here you go: {"discounts": ' + json.dumps(DISCOUNTS) + "} Done."
+    expected = [Discount(**d) for d in DISCOUNTS]
+    for size in (1, 2, 3, 7, len(text)):
+        assert list(iter_records(_pieces(text, size), Discount)) == expected
+
+
+def test_brackets_before_the_array_are_skipped():
+    """Test that bracketed prose ahead of the array does not end parsing."""
+    text = "Here are the [2] records, as [ promised ]: " + json.dumps(DISCOUNTS[:2])
+    expected = [Discount(**d) for d in DISCOUNTS[:2]]
+    for size in (1, 2, 5, len(text)):
+        parser = JSONRecordParser(Discount)
+        records = [r for piece in _pieces(text, size) for r in parser.feed(piece)]
+        assert records == expected
+        assert parser.done
+
+
+def test_invalid_records_are_skipped():
+    """Test that a record failing validation does not stop the stream."""
+    text = '[{"product": "A", "percent": "lots"}, {"product": "B", "percent": 5}]'
+    parser = JSONRecordParser(Discount)
+
+    records = parser.feed(text)
+
+    assert records == [Discount(product="B", percent=5)]
+    assert parser.errors == ['{"product": "A", "percent": "lots"}']
+
+
+def test_parser_buffers_only_the_open_record():
+    """Test that completed records are dropped from the buffer."""
+    parser = JSONRecordParser(Discount)
+    parser.feed("[" + ", ".join(json.dumps(d) for d in DISCOUNTS * 100) + ', {"pro')
+    assert parser._buffer == '{"pro'
+
+
+def test_stream_records_from_service(stub_server, stub_llm_config):
+    """Test records parsed from a live stream, with usage still reported."""
+    stub_server.response_content = json.dumps(DISCOUNTS)
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        stream = LLMService().stream_llm_request(
+            "stub-model", [{"role": "user", "content": "List the discounts"}]
+        )
+
+    assert stream is not None
+    assert list(stream.records(Discount)) == [Discount(**d) for d in DISCOUNTS]
+    assert stream.usage is not None
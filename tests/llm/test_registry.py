@@ -3,7 +3,7 @@ import os
 import json  # Import json
 from unittest.mock import patch
 
-from src.llm.registry import LLMRegistry
+from src.llm.registry import LazyModelConfigs, LLMRegistry
 from src.models.llm_config import LLMConfig
 
 
@@ -34,3 +34,100 @@ def test_get_model_config_not_found():
         ValueError, match=f"Model {non_existent_model} not found. Available models: .*"
     ):
         LLMRegistry.get_model_config(non_existent_model)
+
+
+def record(model_name, latency, cost, count=3, ok=True):
+    for _ in range(count):
+        LLMRegistry.record_request(
+            model_name,
+            latency,
+            ok,
+            {"prompt_tokens": 900, "completion_tokens": 100, "cost": cost},
+        )
+
+
+def test_get_model_stats_records_requests():
+    """Test that recorded requests show up in the model's stats."""
+    record("gpt-4.1", latency=2.0, cost=0.01)
+    stats = LLMRegistry.get_model_stats("gpt-4.1")
+    assert stats.requests == 3
+    assert stats.p50_latency == 2.0
+    assert stats.cost_per_1k_tokens == pytest.approx(0.01)
+
+
+def test_select_model_by_latency_and_cost():
+    """Test picking the fastest and the cheapest model."""
+    record("gpt-4.1", latency=1.0, cost=0.02)
+    record("gpt-4.1-mini", latency=2.0, cost=0.004)
+    record("gemini-flash-2.5", latency=3.0, cost=0.001)
+
+    assert LLMRegistry.select_model("latency") == "gpt-4.1"
+    assert LLMRegistry.select_model("cost") == "gemini-flash-2.5"
+    assert LLMRegistry.select_model("cost", max_p95_latency=2.5) == "gpt-4.1-mini"
+    assert (
+        LLMRegistry.select_model(
+            "latency", candidates=["gpt-4.1-mini", "gemini-flash-2.5"]
+        )
+        == "gpt-4.1-mini"
+    )
+
+
+def test_select_model_constraints_exclude_unreliable_models():
+    """Test that error-rate and sample constraints are applied."""
+    record("gpt-4.1", latency=1.0, cost=0.02)
+    record("gpt-4.1", latency=1.0, cost=0.02, count=3, ok=False)
+    record("gpt-4.1-mini", latency=2.0, cost=0.004, count=1)
+
+    assert LLMRegistry.select_model("latency", max_error_rate=0.6) == "gpt-4.1"
+    with pytest.raises(ValueError, match="No model meets the constraints"):
+        LLMRegistry.select_model("latency", max_error_rate=0.1, min_requests=2)
+
+
+def test_stats_round_trip_through_file(tmp_path):
+    """Test that saved stats warm up selection after a restart."""
+    path = str(tmp_path / "stats.json")
+    record("gpt-4.1-mini", latency=2.0, cost=0.004)
+    LLMRegistry.save_stats(path)
+    LLMRegistry.clear_stats()
+    assert LLMRegistry.get_model_stats("gpt-4.1-mini").requests == 0
+
+    LLMRegistry.load_stats(path)
+    assert LLMRegistry.get_model_stats("gpt-4.1-mini").requests == 3
+    assert LLMRegistry.select_model("latency") == "gpt-4.1-mini"
+    LLMRegistry.load_stats(str(tmp_path / "missing.json"))
+
+
+def test_service_feeds_registry_stats(stub_server, stub_llm_config):
+    """Test that LLMService records outcomes under the requested model name."""
+    from src.llm.service import LLMService
+
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        LLMService().send_llm_request("stub-model", [])
+
+    stats = LLMRegistry.get_model_stats("stub-model")
+    assert stats.requests == 1
+    assert stats.error_rate == 0
+    assert stats.cost_per_1k_tokens == pytest.approx(0.0001 / 8 * 1000)
+
+
+def test_lazy_model_configs_build_on_first_access():
+    """Test that factories run once, on first access, and keep their order."""
+    calls = []
+
+    def build():
+        calls.append("lazy")
+        return LLMConfig(name="lazy/model", provider="lazy")
+
+    configs = LazyModelConfigs({"lazy": build})
+    configs["eager"] = LLMConfig(name="eager/model", provider="eager")
+    assert calls == []
+    assert list(configs) == ["lazy", "eager"]
+
+    assert configs["lazy"] is configs["lazy"]
+    assert calls == ["lazy"]
+    assert configs["eager"].provider == "eager"
+    del configs["lazy"]
+    assert len(configs) == 1
@@ -0,0 +1,140 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.rate_limit import RateLimiterRegistry
+from src.llm.scheduler import Priority, RequestScheduler
+from src.llm.service import LLMService
+
+
+def _messages(text: str) -> list[dict]:
+    return [{"role": "user", "content": text}]
+
+
+def _sent_texts(stub_server) -> list[str]:
+    return [request["messages"][0]["content"] for request in stub_server.requests]
+
+
+@pytest.fixture
+def patched_registry(stub_llm_config):
+    """Fixture resolving every model name to the stub configuration."""
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        side_effect=lambda name: stub_llm_config.model_copy(update={"name": name}),
+    ):
+        yield
+
+
+def test_interactive_requests_jump_the_bulk_queue(stub_server, patched_registry):
+    """Test that queued interactive requests are dispatched before bulk ones."""
+    stub_server.delay = 0.2
+    with RequestScheduler(LLMService(), max_workers=1) as scheduler:
+        scheduler.submit("stub-model", _messages("blocker"))
+        time.sleep(0.05)
+        bulk = scheduler.submit("stub-model", _messages("bulk"))
+        interactive = scheduler.submit(
+            "stub-model", _messages("interactive"), Priority.INTERACTIVE
+        )
+        assert interactive.result(timeout=5).ok
+        assert bulk.result(timeout=5).ok
+
+    assert _sent_texts(stub_server) == ["blocker", "interactive", "bulk"]
+
+
+def test_cancelled_queued_requests_are_not_sent(stub_server, patched_registry):
+    """Test that a request cancelled while queued is dropped, not sent."""
+    stub_server.delay = 0.2
+    with RequestScheduler(LLMService(), max_workers=1) as scheduler:
+        first = scheduler.submit("stub-model", _messages("first"))
+        time.sleep(0.05)
+        second = scheduler.submit("stub-model", _messages("second"))
+
+        assert second.cancel()
+        assert first.result(timeout=5).ok
+
+    assert _sent_texts(stub_server) == ["first"]
+    assert scheduler.pending() == 0
+
+
+def test_aged_bulk_requests_are_not_starved(stub_server, patched_registry):
+    """Test that bulk requests past max_bulk_wait go before interactive ones."""
+    stub_server.delay = 0.2
+    with RequestScheduler(LLMService(), max_workers=1, max_bulk_wait=0) as scheduler:
+        scheduler.submit("stub-model", _messages("blocker"))
+        time.sleep(0.05)
+        scheduler.submit("stub-model", _messages("bulk"))
+        scheduler.submit("stub-model", _messages("interactive"), Priority.INTERACTIVE)
+
+    assert _sent_texts(stub_server) == ["blocker", "bulk", "interactive"]
+
+
+def test_scheduled_request_reserves_budget_once(stub_server, stub_llm_config):
+    """Test that the service does not reserve a scheduled request twice."""
+    # One request per minute: a second reservation would block for a minute
+    config = stub_llm_config.model_copy(update={"requests_per_minute": 1})
+    with (
+        patch("src.llm.registry.LLMRegistry.get_model_config", return_value=config),
+        RequestScheduler(LLMService()) as scheduler,
+    ):
+        started_at = time.perf_counter()
+        response = scheduler.submit("stub-model", _messages("Hello")).result(timeout=5)
+
+    assert response.ok
+    assert time.perf_counter() - started_at < 5
+
+
+def test_exhausted_provider_does_not_block_other_providers(
+    stub_server, stub_llm_config
+):
+    """Test that requests for a provider with budget pass one without it."""
+    configs = {
+        "throttled": stub_llm_config.model_copy(
+            update={"name": "throttled", "api_key_env": "THROTTLED_KEY"}
+        ),
+        "free": stub_llm_config.model_copy(
+            update={"name": "free", "api_key_env": "FREE_KEY"}
+        ),
+    }
+    throttled = RateLimiterRegistry.get_rate_limiter(
+        configs["throttled"].model_copy(update={"requests_per_minute": 60})
+    )
+    throttled.requests.try_take(60)
+
+    with (
+        patch(
+            "src.llm.registry.LLMRegistry.get_model_config",
+            side_effect=configs.__getitem__,
+        ),
+        RequestScheduler(LLMService()) as scheduler,
+    ):
+        slow = scheduler.submit("throttled", _messages("throttled"))
+        fast = scheduler.submit("free", _messages("free"))
+        assert fast.result(timeout=5).ok
+        assert not slow.done()
+        assert scheduler.pending() == 1
+        assert slow.result(timeout=5).ok
+
+    assert _sent_texts(stub_server) == ["free", "throttled"]
+
+
+def test_unknown_model_resolves_with_error():
+    """Test that an unknown model fails its future instead of raising."""
+    with (
+        patch(
+            "src.llm.registry.LLMRegistry.get_model_config",
+            side_effect=ValueError("Model not found"),
+        ),
+        RequestScheduler(LLMService()) as scheduler,
+    ):
+        response = scheduler.submit("missing", _messages("Hello")).result(timeout=5)
+
+    assert response.error == "Model not found"
+
+
+def test_submit_after_close_raises():
+    """Test that a closed scheduler rejects new requests."""
+    scheduler = RequestScheduler(LLMService())
+    scheduler.close()
+    with pytest.raises(RuntimeError):
+        scheduler.submit("gpt-4.1-mini", _messages("Hello"))
@@ -0,0 +1,197 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.llm.semantic_cache import (  # noqa: E402
+    HashingEmbedder,
+    SemanticCache,
+    split_prompt,
+)
+from src.llm.service import LLMService  # noqa: E402
+from src.models.llm_response import LLMResponse  # noqa: E402
+
+
+def make_response(content: str) -> LLMResponse:
+    return LLMResponse(model_name="test-model", content=content)
+
+
+def user(text: str) -> list[dict]:
+    return [{"role": "user", "content": text}]
+
+
+@pytest.fixture
+def patched_registry(stub_llm_config):
+    """Fixture resolving every model name to the stub configuration."""
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        side_effect=lambda name: stub_llm_config.model_copy(update={"name": name}),
+    ):
+        yield
+
+
+def test_split_prompt_embeds_the_last_message_within_its_scope():
+    """Test that context and numbers scope a prompt and images skip it."""
+    image = {"type": "image_url", "image_url": {"url": "data:image/png;base64,"}}
+    parts = [{"type": "text", "text": "Hi"}]
+    system = {"role": "system", "content": "Be brief."}
+    scope, text = split_prompt("m", [system, *user("Buy 3 apples")])
+
+    assert text == "Buy 3 apples"
+    assert split_prompt("m", [system, *user("Get 3 apples")])[0] == scope
+    assert split_prompt("m", [system, *user("Buy 7 apples")])[0] != scope
+    assert split_prompt("m", user("Buy 3 apples"))[0] != scope
+    assert split_prompt("other", [system, *user("Buy 3 apples")])[0] != scope
+    assert split_prompt("m", [{"role": "user", "content": parts}])[1] == "Hi"
+    assert split_prompt("m", [{"role": "user", "content": [*parts, image]}]) is None
+    assert split_prompt("m", []) is None
+
+
+def test_hashing_embedder_ignores_case_and_spacing():
+    """Test that formatting-only differences embed identically."""
+    vectors = HashingEmbedder().embed(["Summarise  this text.", "summarise this text"])
+
+    assert vectors.shape == (2, 256)
+    np.testing.assert_array_equal(vectors[0], vectors[1])
+
+
+def test_similar_prompt_hits_and_unrelated_misses():
+    """Test that reworded prompts are answered and unrelated ones are not."""
+    cache = SemanticCache(HashingEmbedder(), threshold=0.8)
+    cache.set("m", user("What is the capital of France?"), make_response("Paris"))
+
+    assert cache.get("m", user("what is the capital of  France")).content == "Paris"
+    assert cache.get("m", user("What is the capital city of France?")) is not None
+    assert cache.get("m", user("Write a haiku about autumn leaves")) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_per_model_threshold_and_isolation():
+    """Test that thresholds apply per model and models never share entries."""
+    cache = SemanticCache(
+        HashingEmbedder(), threshold=0.8, thresholds={"strict": 0.999}
+    )
+    for model_name in ("loose", "strict"):
+        cache.set(
+            model_name,
+            user("What is the capital of France?"),
+            make_response(model_name),
+        )
+    reworded = user("What is the capital city of France?")
+
+    assert cache.get("loose", reworded).content == "loose"
+    assert cache.get("strict", reworded) is None
+    assert cache.get("other", user("What is the capital of France?")) is None
+
+
+def test_batch_lookup():
+    """Test that one lookup answers each request from its own model."""
+    cache = SemanticCache(HashingEmbedder())
+    cache.set("a", user("first prompt"), make_response("A"))
+    cache.set("b", user("second prompt"), make_response("B"))
+
+    results = cache.lookup(
+        [
+            ("a", user("First prompt")),
+            ("b", user("second  prompt")),
+            ("a", user("third")),
+        ]
+    )
+
+    assert [r.content if r else None for r in results] == ["A", "B", None]
+
+
+def test_least_recently_used_entry_is_evicted():
+    """Test that the cache stays bounded and keeps recently used entries."""
+    cache = SemanticCache(HashingEmbedder(), max_entries=2)
+    cache.set("m", user("alpha"), make_response("A"))
+    cache.set("m", user("bravo"), make_response("B"))
+    with patch("src.llm.semantic_cache.time.time", return_value=time.time() + 1):
+        assert cache.get("m", user("alpha")) is not None
+    with patch("src.llm.semantic_cache.time.time", return_value=time.time() + 2):
+        cache.set("m", user("charlie"), make_response("C"))
+
+    assert len(cache) == 2
+    assert cache.get("m", user("bravo")) is None
+    assert cache.get("m", user("alpha")).content == "A"
+
+
+def test_expired_entries_are_not_returned():
+    """Test that entries older than the TTL miss."""
+    cache = SemanticCache(HashingEmbedder(), ttl=10)
+    with patch("src.llm.semantic_cache.time.time", return_value=1000.0):
+        cache.set("m", user("hello"), make_response("Hi"))
+    with patch("src.llm.semantic_cache.time.time", return_value=1011.0):
+        assert cache.get("m", user("hello")) is None
+
+
+def test_cache_persists_in_memory_mapped_file(tmp_path):
+    """Test that a reopened cache answers from the vectors on disk."""
+    cache = SemanticCache(HashingEmbedder(), path=str(tmp_path), max_entries=16)
+    cache.set("m", user("persist me"), make_response("Saved"))
+    cache.close()
+
+    reopened = SemanticCache(HashingEmbedder(), path=str(tmp_path), max_entries=16)
+
+    assert reopened.get("m", user("Persist me")).content == "Saved"
+    assert (tmp_path / "vectors.npy").exists()
+    reopened.close()
+
+    resized = SemanticCache(HashingEmbedder(), path=str(tmp_path), max_entries=32)
+    assert len(resized) == 0
+    resized.close()
+
+
+def test_prompts_differing_in_numbers_or_context_miss():
+    """Test that near-identical prompts with another meaning are not reused."""
+    cache = SemanticCache(HashingEmbedder())
+    system = {"role": "system", "content": "Extract the offers. " * 200}
+    cache.set("m", [system, *user("Page 1: Milk 1.99 -20%")], make_response("Milk"))
+    question = "Tom is {} years old and I have {} apples. How many apples do I have?"
+    cache.set("m", user(question.format(30, 3)), make_response("3"))
+    cache.set("m", [system, *user("Translate: good morning")], make_response("Hi"))
+
+    assert cache.get("m", [system, *user("Page 2: Bread 3.49 -10%")]) is None
+    assert cache.get("m", user(question.format(30, 7))) is None
+    assert cache.get("m", user("Translate: good morning")) is None
+    assert cache.get("m", user(question.format(30, 3))).content == "3"
+
+
+def test_lookup_scores_only_the_prompts_scope():
+    """Test that lookups among 100k entries of other scopes stay sub-ms."""
+    cache = SemanticCache(HashingEmbedder(64), max_entries=100_000)
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((100_000, 64)).astype(np.float32)
+    cache._vectors[:] = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scopes = [split_prompt(f"m{k}", user("Tell me a joke"))[0] for k in range(1000)]
+    for slot in range(100_000):
+        cache._index(slot, scopes[slot % 1000])
+    cache._count = 100_000
+    batch = [(f"m{k}", user("Tell me a joke")) for k in range(64)]
+
+    single, many = [], []
+    for _ in range(5):
+        started_at = time.perf_counter()
+        cache.get("m0", user("Tell me a joke"))
+        single.append(time.perf_counter() - started_at)
+        started_at = time.perf_counter()
+        cache.lookup(batch)
+        many.append(time.perf_counter() - started_at)
+
+    assert min(single) < 0.001
+    assert min(many) / len(batch) < 0.001
+
+
+def test_service_answers_similar_prompts_from_cache(stub_server, patched_registry):
+    """Test that LLMService serves a reworded prompt without a request."""
+    llm_service = LLMService(semantic_cache=SemanticCache(HashingEmbedder()))
+
+    first = llm_service.send_llm_request("stub-model", user("Tell me a joke"))
+    second = llm_service.send_llm_requests([("stub-model", user("tell me a joke!"))])
+
+    assert first == "Stub response."
+    assert second[0].cached and second[0].content == "Stub response."
+    assert len(stub_server.requests) == 1
+    assert llm_service.metrics.semantic_cache_hits.value("stub-model") >= 1
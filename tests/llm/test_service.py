@@ -1,5 +1,6 @@
 import pytest
 import os
+from datetime import timedelta
 from unittest.mock import patch, MagicMock
 
 from src.llm.service import LLMService
@@ -29,7 +30,7 @@ def llm_service():
 
 @patch("src.llm.registry.LLMRegistry.get_model_config")
 @patch("os.getenv")
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_send_llm_request_success(
     mock_post, mock_getenv, mock_get_model_config, llm_service, mock_llm_config
 ):
@@ -39,6 +40,7 @@ def test_send_llm_request_success(
 
     mock_response = MagicMock()
     mock_response.status_code = 200
+    mock_response.elapsed = timedelta(milliseconds=5)
     mock_response.json.return_value = {
         "choices": [{"message": {"content": "Generated response."}}],
         "usage": {"prompt_tokens": 10, "completion_tokens": 20, "cost": 0.001},
@@ -70,7 +72,7 @@ def test_send_llm_request_success(
             "handle_rate_limits": True,
             "usage": {"include": True},
         },
-        timeout=60,
+        timeout=(10.0, 60.0),
     )
     assert response_content == "Generated response."
 
@@ -89,7 +91,7 @@ def test_send_llm_request_invalid_model(mock_get_model_config, llm_service):
 
 @patch("src.llm.registry.LLMRegistry.get_model_config")
 @patch("os.getenv")
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_send_llm_request_http_error(
     mock_post, mock_getenv, mock_get_model_config, llm_service, mock_llm_config
 ):
@@ -110,7 +112,7 @@ def test_send_llm_request_http_error(
 
 @patch("src.llm.registry.LLMRegistry.get_model_config")
 @patch("os.getenv")
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_send_llm_request_unexpected_error(
     mock_post, mock_getenv, mock_get_model_config, llm_service, mock_llm_config
 ):
@@ -131,7 +133,7 @@ def test_send_llm_request_unexpected_error(
 
 @patch("src.llm.registry.LLMRegistry.get_model_config")
 @patch("os.getenv")
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_send_llm_request_no_content_in_response(
     mock_post, mock_getenv, mock_get_model_config, llm_service, mock_llm_config
 ):
@@ -141,6 +143,7 @@ def test_send_llm_request_no_content_in_response(
 
     mock_response = MagicMock()
     mock_response.status_code = 200
+    mock_response.elapsed = timedelta(milliseconds=5)
     mock_response.json.return_value = {
         "some_other_key": "value",
         "usage": {"prompt_tokens": 10, "completion_tokens": 20, "cost": 0.001},
@@ -213,3 +216,61 @@ def test__extract_content_from_response_no_content(llm_service):
     response_json = {"some_key": "some_value"}
     content = llm_service._extract_content_from_response(response_json)
     assert content is None
+
+
+def test_send_llm_requests_preserves_order_and_isolates_failures(
+    stub_server, stub_llm_config, llm_service
+):
+    """Test that a batch returns ordered results and keeps going past failures."""
+
+    def get_model_config(model_name):
+        if model_name == "invalid-model":
+            raise ValueError("Model invalid-model not found.")
+        return stub_llm_config
+
+    batch = [
+        ("stub-model", [{"role": "user", "content": "first"}]),
+        ("invalid-model", [{"role": "user", "content": "second"}]),
+        ("stub-model", [{"role": "user", "content": "third"}]),
+    ]
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        side_effect=get_model_config,
+    ):
+        results = llm_service.send_llm_requests(batch, max_workers=2)
+
+    assert [r.model_name for r in results] == [
+        "stub-model",
+        "invalid-model",
+        "stub-model",
+    ]
+    assert [r.ok for r in results] == [True, False, True]
+    assert results[0].content == "Stub response."
+    assert results[0].usage == {
+        "prompt_tokens": 5,
+        "completion_tokens": 3,
+        "cost": 0.0001,
+    }
+    assert "not found" in results[1].error
+    assert len(stub_server.requests) == 2
+
+
+def test_send_llm_requests_bounds_concurrency(
+    stub_server, stub_llm_config, llm_service
+):
+    """Test that the batch never exceeds max_workers requests in flight."""
+    stub_server.delay = 0.05
+    batch = [("stub-model", [{"role": "user", "content": str(i)}]) for i in range(12)]
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        results = llm_service.send_llm_requests(batch, max_workers=3)
+
+    assert all(r.ok for r in results)
+    assert stub_server.max_in_flight <= 3
+
+
+def test_send_llm_requests_empty_batch(llm_service):
+    """Test that an empty batch returns no results."""
+    assert llm_service.send_llm_requests([]) == []
@@ -0,0 +1,219 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.async_service import AsyncLLMService
+from src.llm.service import LLMService
+from src.llm.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    """Test that concurrent calls with one key run the function once."""
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(flight.do, "key", slow)
+        started.wait()
+        followers = [executor.submit(flight.do, "key", slow) for _ in range(4)]
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert results[0] == ("result", False)
+    assert all(r == ("result", True) for r in results[1:])
+
+
+def test_single_flight_runs_again_after_completion():
+    """Test that a finished call is not reused by later callers."""
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == (1, False)
+    assert flight.do("key", lambda: 2) == (2, False)
+
+
+def test_single_flight_propagates_errors():
+    """Test that the leader's exception is raised to the caller."""
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "ok") == ("ok", False)
+
+
+def test_single_flight_follower_stops_waiting_at_its_timeout():
+    """Test that a duplicate caller gives up without cancelling the call."""
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.3)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(flight.do, "key", slow)
+        started.wait()
+        started_at = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            flight.do("key", slow, timeout=0.05)
+        assert time.perf_counter() - started_at < 0.2
+        assert leader.result() == ("result", False)
+
+
+def test_async_single_flight_coalesces_and_survives_waiter_cancel():
+    """Test async coalescing, and that one cancelled waiter spares the rest."""
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        flight = AsyncSingleFlight()
+        first = asyncio.create_task(flight.do("key", slow))
+        second = asyncio.create_task(flight.do("key", slow))
+        third = asyncio.create_task(flight.do("key", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, await third, first.cancelled()
+
+    second, third, first_cancelled = asyncio.run(run())
+    assert len(calls) == 1
+    assert first_cancelled
+    assert second == ("result", True)
+    assert third == ("result", True)
+
+
+def test_service_coalesces_identical_in_flight_requests(stub_server, stub_llm_config):
+    """Test that identical concurrent batch jobs reach the server once."""
+    stub_server.delay = 0.1
+    messages = [{"role": "user", "content": "Give me a pet name"}]
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        results = LLMService().send_llm_requests([("stub-model", messages)] * 6)
+
+    assert all(r.content == "Stub response." for r in results)
+    assert len(stub_server.requests) == 1
+
+
+def test_service_without_coalescing_sends_every_request(stub_server, stub_llm_config):
+    """Test that coalescing can be disabled."""
+    stub_server.delay = 0.05
+    messages = [{"role": "user", "content": "Give me a pet name"}]
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        LLMService(coalesce_requests=False).send_llm_requests(
+            [("stub-model", messages)] * 3
+        )
+
+    assert len(stub_server.requests) == 3
+
+
+def test_async_service_coalesces_identical_in_flight_requests(
+    stub_server, stub_llm_config
+):
+    """Test that identical concurrent async requests reach the server once."""
+    stub_server.delay = 0.1
+    messages = [{"role": "user", "content": "Give me a pet name"}]
+
+    async def run():
+        async with AsyncLLMService() as service:
+            return await service.gather([("stub-model", messages)] * 6)
+
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        results = asyncio.run(run())
+
+    assert results == ["Stub response."] * 6
+    assert len(stub_server.requests) == 1
+
+
+def test_async_single_flight_follower_stops_waiting_at_its_timeout():
+    """Test that an async duplicate caller gives up, sparing the leader."""
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "result"
+
+    async def run():
+        flight = AsyncSingleFlight()
+        leader = asyncio.create_task(flight.do("key", slow))
+        await asyncio.sleep(0)
+        with pytest.raises(TimeoutError):
+            await flight.do("key", slow, timeout=0.05)
+        return await leader
+
+    assert asyncio.run(run()) == ("result", False)
+
+
+def test_service_follower_keeps_its_own_deadline(stub_server, stub_llm_config):
+    """Test that a coalesced caller returns at its deadline, not the leader's."""
+    stub_server.delay = 1.0
+    messages = [{"role": "user", "content": "Give me a pet name"}]
+    llm_service = LLMService()
+    with (
+        patch(
+            "src.llm.registry.LLMRegistry.get_model_config",
+            return_value=stub_llm_config,
+        ),
+        ThreadPoolExecutor(max_workers=1) as executor,
+    ):
+        leader = executor.submit(
+            llm_service.send_llm_requests, [("stub-model", messages)]
+        )
+        while not stub_server.requests:
+            time.sleep(0.01)
+        started_at = time.perf_counter()
+        follower = llm_service.send_llm_requests(
+            [("stub-model", messages)], timeout=0.3
+        )[0]
+        elapsed = time.perf_counter() - started_at
+
+        assert follower.deadline_exceeded
+        assert elapsed < 0.8
+        assert leader.result()[0].content == "Stub response."
+    assert len(stub_server.requests) == 1
+
+
+def test_service_follower_outlives_leader_deadline(stub_server, stub_llm_config):
+    """Test that a caller with time left resends when the leader timed out."""
+    stub_server.delay = 0.4
+    messages = [{"role": "user", "content": "Give me a pet name"}]
+    llm_service = LLMService()
+    with (
+        patch(
+            "src.llm.registry.LLMRegistry.get_model_config",
+            return_value=stub_llm_config,
+        ),
+        ThreadPoolExecutor(max_workers=1) as executor,
+    ):
+        leader = executor.submit(
+            llm_service.send_llm_requests, [("stub-model", messages)], 8, 0.2
+        )
+        while not stub_server.requests:
+            time.sleep(0.01)
+        follower = llm_service.send_llm_requests([("stub-model", messages)])[0]
+
+        assert leader.result()[0].deadline_exceeded
+    assert follower.content == "Stub response."
+    assert len(stub_server.requests) >= 2
@@ -0,0 +1,39 @@
+import pytest
+
+from src.llm.stats import ModelStats, percentile
+
+
+def test_percentile_nearest_rank():
+    """Test nearest-rank percentiles."""
+    assert percentile([3, 1, 2, 4], 50) == 2
+    assert percentile([3, 1, 2, 4], 95) == 4
+    assert percentile([], 50) is None
+
+
+def test_model_stats_snapshot():
+    """Test latency, throughput, cost and error rate over the window."""
+    stats = ModelStats("model")
+    stats.record(
+        1.0, True, {"prompt_tokens": 400, "completion_tokens": 100, "cost": 0.01}
+    )
+    stats.record(
+        3.0, True, {"total_tokens": 500, "completion_tokens": 300, "cost": 0.01}
+    )
+    stats.record(10.0, False)
+
+    snapshot = stats.snapshot()
+    assert snapshot.requests == 3
+    assert snapshot.error_rate == pytest.approx(1 / 3)
+    assert snapshot.p50_latency == 1.0
+    assert snapshot.p95_latency == 3.0
+    assert snapshot.tokens_per_second == pytest.approx(400 / 4)
+    assert snapshot.cost_per_1k_tokens == pytest.approx(0.02)
+
+
+def test_model_stats_window_is_bounded():
+    """Test that only the most recent requests are kept."""
+    stats = ModelStats("model", window=2)
+    for latency in (1.0, 2.0, 3.0):
+        stats.record(latency, True)
+    assert [s.latency for s in stats.samples()] == [2.0, 3.0]
+    assert stats.snapshot().cost_per_1k_tokens is None
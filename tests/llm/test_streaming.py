@@ -0,0 +1,94 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.llm.service import LLMService
+from src.llm.streaming import parse_sse_events
+
+
+@pytest.fixture
+def llm_service():
+    """Fixture to provide an LLMService instance."""
+    return LLMService()
+
+
+def test_parse_sse_events_skips_comments_and_stops_at_done():
+    """Test SSE parsing of data events, keep-alive comments and [DONE]."""
+    lines = [
+        ": OPENROUTER PROCESSING",
+        "",
+        'data: {"choices": [{"delta": {"content": "Hi"}}]}',
+        "",
+        "data: [DONE]",
+        'data: {"never": "reached"}',
+    ]
+    events = list(parse_sse_events(lines))
+    assert events == [{"choices": [{"delta": {"content": "Hi"}}]}]
+
+
+def test_stream_llm_request_yields_deltas(stub_server, stub_llm_config, llm_service):
+    """Test streaming deltas, usage and timing stats against the stand-in."""
+    stub_server.response_content = "one two three"
+    stub_server.chunk_delay = 0.02
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        stream = llm_service.stream_llm_request(
+            "stub-model", [{"role": "user", "content": "Count"}]
+        )
+
+    assert stream is not None
+    assert stream.time_to_first_token is None
+    deltas = list(stream)
+
+    assert deltas == ["one ", "two ", "three "]
+    assert stream.content == "one two three "
+    assert stream.finished
+    assert stream.error is None
+    assert stream.usage == {"prompt_tokens": 5, "completion_tokens": 3, "cost": 0.0001}
+    assert stream.time_to_first_token > 0
+    assert stream.tokens_per_second > 0
+    assert stub_server.requests[0]["stream"] is True
+
+
+def test_stream_llm_request_invalid_model(llm_service):
+    """Test that an unknown model returns None instead of a stream."""
+    assert llm_service.stream_llm_request("invalid-model", []) is None
+
+
+def test_stream_llm_request_connection_error(stub_llm_config, llm_service):
+    """Test that a failed connection returns None instead of a stream."""
+    stub_llm_config.endpoint = "http://127.0.0.1:1/unreachable"
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        assert llm_service.stream_llm_request("stub-model", []) is None
+
+
+def test_stream_llm_request_settles_limiter(stub_server, stub_llm_config, llm_service):
+    """Test that streams reserve rate-limit budget and settle it when done."""
+    limiter = MagicMock()
+    limiter.acquire.return_value = True
+    with (
+        patch(
+            "src.llm.registry.LLMRegistry.get_model_config",
+            return_value=stub_llm_config,
+        ),
+        patch(
+            "src.llm.rate_limit.RateLimiterRegistry.get_rate_limiter",
+            return_value=limiter,
+        ),
+    ):
+        stream = llm_service.stream_llm_request("stub-model", [])
+        list(stream)
+        reserved = limiter.acquire.call_args.args[0]
+        limiter.settle.assert_called_once_with(reserved, 8)
+
+        stub_server.error_statuses = [500]
+        limiter.reset_mock()
+        with patch("requests.Response.close", autospec=True) as close:
+            assert llm_service.stream_llm_request("stub-model", []) is None
+        close.assert_called_once()
+        limiter.settle.assert_called_once_with(reserved, 0)
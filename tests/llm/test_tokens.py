@@ -0,0 +1,104 @@
+from src.llm.tokens import (
+    MIN_COMPLETION_TOKENS,
+    TRUNCATION_MARKER,
+    count_text_tokens,
+    estimate_tokens,
+    fit_context_window,
+    truncate_messages,
+)
+from src.models.llm_config import LLMConfig
+
+
+def _config(context_window: int | None, max_tokens: int = 4000) -> LLMConfig:
+    return LLMConfig(
+        name="m", provider="p", max_tokens=max_tokens, context_window=context_window
+    )
+
+
+def test_estimate_tokens_text_messages():
+    """Test the estimate for plain text messages."""
+    messages = [
+        {"role": "system", "content": "x" * 40},
+        {"role": "user", "content": "y" * 8},
+    ]
+    assert estimate_tokens(messages) == 4 + 10 + 4 + 2
+
+
+def test_estimate_tokens_multimodal_parts():
+    """Test that text parts are counted and other parts get a flat cost."""
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "z" * 20},
+                {"type": "image_url", "image_url": {"url": "data:..."}},
+            ],
+        }
+    ]
+    assert estimate_tokens(messages) == 4 + 5 + 85
+
+
+def test_count_text_tokens_counts_punctuation():
+    """Test that punctuation marks cost a token each, unlike plain words."""
+    assert count_text_tokens("Hello world") == 2
+    assert count_text_tokens('{"a": [1, 2]}') == 11
+    assert count_text_tokens("") == 0
+
+
+def test_truncate_messages_drops_oldest_turns_first():
+    """Test that whole turns go, never leaving a reply without its question."""
+    messages = [
+        {"role": "system", "content": "rules"},
+        {"role": "user", "content": "a" * 400},
+        {"role": "assistant", "content": "b" * 400},
+        {"role": "user", "content": "c" * 400},
+        {"role": "assistant", "content": "d" * 40},
+        {"role": "user", "content": "question"},
+    ]
+
+    trimmed = truncate_messages(messages, 150)
+
+    assert trimmed == [messages[0], *messages[3:]]
+    assert [m["role"] for m in truncate_messages(messages, 120)] == [
+        "system",
+        "user",
+    ]
+    assert truncate_messages(messages, 1000) is messages
+
+
+def test_truncate_messages_cuts_the_middle_of_a_long_message():
+    """Test that a single oversized message keeps its head and tail."""
+    text = " ".join(f"w{i}" for i in range(2000))
+    messages = [{"role": "user", "content": text}]
+
+    trimmed = truncate_messages(messages, 500)
+
+    content = trimmed[0]["content"]
+    assert TRUNCATION_MARKER in content
+    assert content.startswith("w0 w1") and content.endswith("w1998 w1999")
+    assert estimate_tokens(trimmed) <= 500
+
+
+def test_fit_context_window_sizes_max_tokens():
+    """Test that max_tokens shrinks to the room the prompt leaves."""
+    messages = [{"role": "user", "content": "x" * 4000}]
+
+    assert fit_context_window(messages, _config(None)) == (messages, 4000)
+    assert fit_context_window(messages, _config(100_000)) == (messages, 4000)
+    fitted, max_tokens = fit_context_window(messages, _config(4000))
+    assert fitted is messages
+    assert max_tokens == int(4000 * 0.95) - 1004
+
+
+def test_fit_context_window_truncates_to_keep_a_completion_budget():
+    """Test that the prompt is trimmed when too little room would be left."""
+    messages = [
+        {"role": "user", "content": "x" * 8000},
+        {"role": "user", "content": "question"},
+    ]
+
+    fitted, max_tokens = fit_context_window(messages, _config(2000))
+
+    assert fitted == [messages[1]]
+    assert max_tokens == int(2000 * 0.95) - 6
+    assert max_tokens >= MIN_COMPLETION_TOKENS
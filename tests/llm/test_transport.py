@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+from src.llm.service import LLMService
+from src.llm.transport import HTTPTransport
+
+
+def test_transport_reuses_connection(stub_server):
+    """Test that sequential posts share a single keep-alive connection."""
+    transport = HTTPTransport()
+    for _ in range(5):
+        response = transport.post(stub_server.url, json={"messages": []}, timeout=5)
+        assert response.status_code == 200
+
+    assert len(stub_server.requests) == 5
+    assert stub_server.connection_count == 1
+    transport.close()
+
+
+def test_service_reuses_connection_across_requests(stub_server, stub_llm_config):
+    """Test that LLMService sends all requests over its pooled transport."""
+    llm_service = LLMService()
+    messages = [{"role": "user", "content": "Hello"}]
+    with patch(
+        "src.llm.registry.LLMRegistry.get_model_config",
+        return_value=stub_llm_config,
+    ):
+        results = [
+            llm_service.send_llm_request("stub-model", messages) for _ in range(3)
+        ]
+
+    assert results == ["Stub response."] * 3
+    assert stub_server.connection_count == 1
+
+
+def test_warm_up_opens_connection_used_by_first_request(stub_server):
+    """Test that warm-up opens a connection the first real request reuses."""
+    transport = HTTPTransport()
+    transport.warm_up([stub_server.url, stub_server.url])
+
+    assert len(stub_server.client_ports) == 1
+    transport.post(stub_server.url, json={"messages": []}, timeout=5)
+    assert stub_server.connection_count == 1
+
+
+def test_warm_up_ignores_unreachable_endpoint():
+    """Test that warm-up failures are logged and swallowed."""
+    transport = HTTPTransport()
+    transport.warm_up(["http://127.0.0.1:1/unreachable"], timeout=0.5)
+
+
+def test_endpoint_pool_size_override(stub_server):
+    """Test that per-endpoint pool sizes mount a dedicated adapter."""
+    transport = HTTPTransport(pool_maxsize=2, endpoint_pool_sizes={stub_server.url: 32})
+    adapter = transport.session.get_adapter(stub_server.url)
+    assert adapter._pool_maxsize == 32
+    assert transport.session.get_adapter("https://example.com")._pool_maxsize == 2
+
+
+def test_service_warm_up_uses_registry_endpoints():
+    """Test that LLMService.warm_up targets every registry endpoint."""
+    transport = HTTPTransport()
+    with patch.object(transport, "warm_up") as mock_warm_up:
+        LLMService(transport=transport).warm_up()
+
+    endpoints = list(mock_warm_up.call_args.args[0])
+    assert endpoints
+    assert all(e.startswith("https://") for e in endpoints)
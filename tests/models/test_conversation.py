@@ -0,0 +1,85 @@
+from src.llm.registry import LLMRegistry
+from src.llm.service import LLMService
+from src.llm.tokens import estimate_tokens
+from src.models.conversation import SUMMARY_PREFIX, Conversation
+
+
+def test_conversation_counts_tokens_incrementally():
+    """Test that the running total matches a full recount."""
+    conversation = Conversation(system="You are terse.")
+    conversation.add_user("Hello there")
+    conversation.add_assistant("Hi.")
+    conversation.extend([{"role": "user", "content": "How are you today?"}])
+
+    assert len(conversation) == 4
+    assert conversation.tokens == estimate_tokens(conversation.messages)
+
+
+def test_conversation_interns_roles():
+    """Test that equal roles share one string object."""
+    conversation = Conversation()
+    conversation.add("".join(["us", "er"]), "a")
+    conversation.add_user("b")
+
+    first, second = conversation.messages
+    assert first["role"] is second["role"]
+
+
+def test_conversation_drops_oldest_messages_over_budget():
+    """Test that the system prompt and last message survive windowing."""
+    conversation = Conversation(system="System prompt.", max_tokens=40)
+    messages = conversation.messages
+    for turn in range(10):
+        conversation.add_user(f"Question number {turn} about something")
+        conversation.add_assistant(f"Answer number {turn}")
+
+    assert conversation.messages is messages, "the list is trimmed in place"
+    assert conversation.tokens <= 40
+    assert conversation.tokens == estimate_tokens(messages)
+    assert messages[0]["content"] == "System prompt."
+    assert messages[-1]["content"] == "Answer number 9"
+    assert conversation.dropped == 20 + 1 - len(messages)
+
+
+def test_conversation_drops_whole_turns():
+    """Test that the kept history never starts with an orphaned reply."""
+    for budget in range(30, 120, 7):
+        conversation = Conversation(system="System prompt.", max_tokens=budget)
+        for turn in range(6):
+            conversation.add_user(f"Question {turn} " + "word " * (turn % 3))
+            conversation.add_assistant(f"Answer {turn} " + "word " * (turn % 4))
+            roles = [m["role"] for m in conversation.messages]
+            assert roles == ["system"] + ["user", "assistant"] * (len(roles) // 2)
+        assert conversation.tokens == estimate_tokens(conversation.messages)
+
+
+def test_conversation_folds_dropped_messages_into_a_summary():
+    """Test that dropped messages are summarised after the system prompt."""
+    seen = []
+
+    def summarize(dropped):
+        seen.append([m["content"] for m in dropped])
+        return f"{len(dropped)} messages"
+
+    conversation = Conversation(system="Sys.", max_tokens=40, summarize=summarize)
+    for turn in range(6):
+        conversation.add_user(f"Question number {turn} about something")
+
+    summary = conversation.messages[1]
+    assert summary["role"] == "system"
+    assert summary["content"].startswith(SUMMARY_PREFIX)
+    assert len([m for m in conversation.messages if m["role"] == "system"]) == 2
+    assert seen[-1][0].startswith(SUMMARY_PREFIX), "the old summary is folded in"
+    assert conversation.tokens <= 40
+    assert conversation.tokens == estimate_tokens(conversation.messages)
+
+
+def test_conversation_feeds_the_payload_without_copying():
+    """Test that the payload sends the conversation's own list."""
+    conversation = Conversation(system="Sys.")
+    conversation.add_user("Hi")
+    model_config = LLMRegistry.get_model_config("gpt-4.1-mini")
+
+    payload = LLMService()._prepare_llm_payload(model_config, conversation.messages)
+
+    assert payload["messages"] is conversation.messages
@@ -0,0 +1,38 @@
+import pytest
+from pydantic import ValidationError
+
+from src.llm.registry import LLMRegistry
+from src.models.image_preset import ImagePreset
+
+
+def test_image_preset_defaults():
+    """Test that the default preset downscales without tiling."""
+    preset = ImagePreset()
+    assert preset.max_side == 2048
+    assert preset.format == "JPEG"
+    assert preset.tile_size is None
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"quality": 0},
+        {"max_side": 0},
+        {"format": "BMP"},
+        {"tile_size": -1},
+        {"tile_size": 64, "tile_overlap": 64},
+    ],
+)
+def test_image_preset_rejects_invalid_values(fields):
+    """Test that out-of-range preset values are rejected."""
+    with pytest.raises(ValidationError):
+        ImagePreset(**fields)
+
+
+def test_vision_models_have_distinct_presets():
+    """Test that the vision models are configured with different presets."""
+    full = LLMRegistry.get_model_config("gpt-4.1").image_preset
+    mini = LLMRegistry.get_model_config("gpt-4.1-mini").image_preset
+    assert full is not None and mini is not None
+    assert full.max_side > mini.max_side
+    assert full.tile_size is not None
@@ -61,3 +61,4 @@ def test_llm_config_optional_fields_default():
     assert config.api_key_env == "TEST_API_KEY"
     assert config.max_tokens == 20000
     assert config.temperature == 0.1
+    assert config.cache_responses is True
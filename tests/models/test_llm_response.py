@@ -0,0 +1,15 @@
+from src.models.llm_response import LLMResponse
+
+
+def test_llm_response_ok():
+    """Test that a response with content and no error is ok."""
+    response = LLMResponse(model_name="test-model", content="Hi", usage={"cost": 0.1})
+    assert response.ok
+    assert response.usage == {"cost": 0.1}
+
+
+def test_llm_response_error_not_ok():
+    """Test that a response carrying an error is not ok."""
+    response = LLMResponse(model_name="test-model", error="HTTP Error")
+    assert not response.ok
+    assert response.content is None
@@ -0,0 +1,68 @@
+import json
+import logging
+from unittest.mock import patch
+
+from src.utils.logging import SamplingFilter, flush_logging, setup_logging
+
+
+def _record(msg: str, *args: object) -> logging.LogRecord:
+    return logging.LogRecord("noisy", logging.INFO, "", 0, msg, args, None)
+
+
+def test_setup_logging_is_idempotent(tmp_path):
+    """Test that repeated setup neither duplicates handlers nor lines."""
+    log_file = str(tmp_path / "app.log")
+    first = setup_logging("idempotent", log_file=log_file)
+    second = setup_logging("idempotent", log_file=log_file)
+
+    second.info("Hello %s", "world")
+    flush_logging()
+
+    assert first is second
+    assert len(second.handlers) == 1
+    lines = (tmp_path / "app.log").read_text().splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith("idempotent - INFO - Hello world")
+
+
+def test_log_files_only_receive_their_loggers(tmp_path):
+    """Test that a shared writer keeps each logger in its own file."""
+    setup_logging("first_file", log_file=str(tmp_path / "first.log"))
+    setup_logging("second_file", log_file=str(tmp_path / "second.log"))
+
+    logging.getLogger("first_file").info("one")
+    logging.getLogger("second_file").info("two")
+    flush_logging()
+
+    assert (tmp_path / "first.log").read_text().rstrip().endswith("one")
+    assert (tmp_path / "second.log").read_text().rstrip().endswith("two")
+
+
+def test_json_format_includes_extra_fields(tmp_path):
+    """Test JSON lines with the message, level and `extra` fields."""
+    logger = setup_logging(
+        "structured", log_file=str(tmp_path / "app.log"), json_format=True
+    )
+
+    logger.warning("Retrying %s", "gpt-4.1", extra={"attempt": 2})
+    flush_logging()
+
+    entry = json.loads((tmp_path / "app.log").read_text())
+    assert entry["logger"] == "structured"
+    assert entry["level"] == "WARNING"
+    assert entry["message"] == "Retrying gpt-4.1"
+    assert entry["attempt"] == 2
+
+
+def test_sampling_filter_limits_each_template():
+    """Test the burst, the refill and the suppressed count per template."""
+    sampler = SamplingFilter(rate=1, burst=2)
+    with patch("src.utils.logging.time.monotonic", return_value=100.0):
+        passed = [sampler.filter(_record("Cache hit for %s", i)) for i in range(5)]
+        assert sampler.filter(_record("Another template"))
+    assert passed == [True, True, False, False, False]
+
+    with patch("src.utils.logging.time.monotonic", return_value=101.0):
+        record = _record("Cache hit for %s", 5)
+        assert sampler.filter(record)
+    assert record.suppressed == 3